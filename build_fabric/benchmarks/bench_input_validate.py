@@ -0,0 +1,80 @@
+"""Benchmarks the input_validate svc_intf filter (input_svc_intf_validate) on generated service_interface.yml inputs of 1k, 10k and 100k interfaces.
+There are about 40 interfaces per leaf (so the number of leafs grows with the interfaces), a mix of single and dual-homed access, trunk and layer3 ports.
+Also times a repeat call of the filter (as done by the assert fail_msg or the next playbook run) that is got from the result cache.
+Run from the build_fabric directory using "python benchmarks/bench_input_validate.py"
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+
+# Result cache is in a temp directory so it starts empty and does not touch the real cache
+os.environ['INPUT_VALIDATE_CACHE'] = os.path.join(tempfile.mkdtemp(), 'input_validate_cache.json')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'filter_plugins'))
+from input_validate import FilterModule
+
+DEV_NAME = {'spine': 'DC1-N9K-SPINE', 'border': 'DC1-N9K-BORDER', 'leaf': 'DC1-N9K-LEAF'}
+NUM_INTF = {'spine': '1,64', 'border': '1,128', 'leaf': '1,128'}
+ADV = {'single_homed': {'first_intf': 1, 'last_intf': 60, 'first_lp': 11, 'last_lp': 20},
+       'dual_homed': {'first_intf': 61, 'last_intf': 120, 'first_po': 1, 'last_po': 100}}
+
+
+# Tenants with 400 VLANs (VLAN 301 to 400 also on borders) that the interfaces use
+def gen_tenants():
+    tenants = []
+    for tnt_num in range(4):
+        vlans = [{'num': vl, 'name': 'vl' + str(vl), 'create_on_border': vl > 300} for vl in range(tnt_num * 100 + 1, tnt_num * 100 + 101)]
+        tenants.append({'tenant_name': 'TNT' + str(tnt_num), 'l3_tenant': True, 'vlans': vlans})
+    return tenants
+
+
+# Interfaces spread round-robin across the leafs, dual-homed only use the odd numbered leafs. Switch is a list (as in service_interface.yml),
+# every 10th interface is also on the leaf 2 on (same odd/even so dual-homed are still on odd leafs)
+def gen_svc_intf(num_intf, seed=1):
+    rnd = random.Random(seed)
+    num_leaf = max(2, num_intf // 40 + num_intf // 40 % 2)
+    svc_intf = {'single_homed': [], 'dual_homed': []}
+    for idx in range(num_intf):
+        homed = 'single_homed' if idx % 2 == 0 else 'dual_homed'
+        leaf_num = (idx % num_leaf) + 1
+        if homed == 'dual_homed' and leaf_num % 2 == 0:
+            leaf_num -= 1
+        switch = [DEV_NAME['leaf'] + '%02d' % leaf_num]
+        if idx % 10 == 0 and leaf_num + 2 <= num_leaf:
+            switch.append(DEV_NAME['leaf'] + '%02d' % (leaf_num + 2))
+        intf = {'descr': 'SRV{} eth1'.format(idx), 'switch': switch}
+        intf_type = rnd.choice(['access', 'stp_trunk', 'layer3'] if homed == 'single_homed' else ['access', 'stp_trunk', 'non_stp_trunk'])
+        if intf_type == 'access':
+            intf.update({'type': 'access', 'ip_vlan': rnd.randint(1, 400)})
+        elif intf_type == 'layer3':
+            intf.update({'type': 'layer3', 'tenant': 'TNT' + str(rnd.randint(0, 3)), 'ip_vlan': '10.{}.{}.1/30'.format(idx // 256 % 256, idx % 256)})
+        else:
+            first_vl = rnd.randint(1, 380)
+            intf.update({'type': intf_type, 'ip_vlan': '{},{}-{},{}'.format(first_vl, first_vl + 2, first_vl + 8, first_vl + 12)})
+        svc_intf[homed].append(intf)
+    return svc_intf, {'num_spine': 4, 'num_border': 4, 'num_leaf': num_leaf}
+
+
+def main():
+    validate = FilterModule().svc_intf
+    cached_validate = FilterModule().filters()['input_svc_intf_validate']
+    tenants = gen_tenants()
+    print('{:>11} {:>10} {:>16} {:>12}'.format('interfaces', 'time (ms)', 'per intf (us)', 'cached (ms)'))
+    for num_intf in [1000, 10000, 100000]:
+        svc_intf, network_size = gen_svc_intf(num_intf)
+        runs = []
+        for i in range(3):
+            start = time.perf_counter()
+            validate(svc_intf, ADV, network_size, tenants, DEV_NAME, NUM_INTF)
+            runs.append(time.perf_counter() - start)
+        cached_validate(svc_intf, ADV, network_size, tenants, DEV_NAME, NUM_INTF)
+        start = time.perf_counter()
+        cached_validate(svc_intf, ADV, network_size, tenants, DEV_NAME, NUM_INTF)
+        cached = time.perf_counter() - start
+        print('{:>11} {:>10.1f} {:>16.2f} {:>12.1f}'.format(num_intf, min(runs) * 1000, min(runs) / num_intf * 1000000, cached * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Benchmarks the inv_from_vars address engine (create_ip) from 10 to 4,000 devices.
+The time per device should stay flat as the fabric grows, showing the addressing scales linearly.
+Run from the build_fabric directory using "python benchmarks/bench_inv_addr.py" (needs Ansible installed)
+"""
+
+import os
+import timeit
+import importlib.util
+
+# Loads the inventory plugin straight from its file as it is not part of an installed package
+path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'inventory_plugins', 'inv_from_vars.py')
+spec = importlib.util.spec_from_file_location('inv_from_vars', path)
+inv_from_vars = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(inv_from_vars)
+
+
+# Creates a plugin object with a data model big enough for the number of devices (4 spines, 4 borders and the rest leafs)
+def build_plugin(num_dev):
+    inv = inv_from_vars.InventoryModule()
+    inv.network_size = {'num_spine': 4, 'num_border': 4, 'num_leaf': num_dev - 8}
+    inv.device_name = {'spine': 'DC1-N9K-SPINE', 'border': 'DC1-N9K-BORDER', 'leaf': 'DC1-N9K-LEAF'}
+    inv.addr = {'lp_net': '10.0.0.0/32', 'mgmt_net': '10.128.0.0/16', 'mlag_net': '10.255.0.0/16'}
+    inv.bse_intf = {'lp_fmt': 'loopback'}
+    inv.lp = {'rtr': {'num': 1, 'descr': 'LP > Routing protocol RID and peerings'},
+              'vtep': {'num': 2, 'descr': 'LP > VTEP Tunnels (PIP) and MLAG (VIP)'},
+              'bgw': {'num': 3, 'descr': 'LP > BGW anycast address'}}
+    inv.addr_incre = {'spine_ip': 11, 'border_ip': 16, 'leaf_ip': 100, 'border_vtep_lp': 36, 'leaf_vtep_lp': 10000,
+                      'border_mlag_lp': 56, 'leaf_mlag_lp': 20000, 'border_bgw_lp': 58, 'mlag_leaf_ip': 10, 'mlag_border_ip': 0}
+    return inv
+
+
+def main():
+    print('{:>8} {:>12} {:>16}'.format('devices', 'total (ms)', 'per device (us)'))
+    for num_dev in [10, 100, 500, 1000, 2000, 4000]:
+        inv = build_plugin(num_dev)
+        loops = max(1, 4000 // num_dev)
+        total = min(timeit.repeat(inv.create_ip, number=loops, repeat=5)) / loops
+        print('{:>8} {:>12.2f} {:>16.2f}'.format(num_dev, total * 1000, total / num_dev * 1000000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Benchmarks building 1 to 10 fabrics with inv_from_vars, one after the other against in parallel (build_fabrics).
+In parallel the time should stay near that of a single fabric (as long as there are enough CPUs) rather than growing with the number of fabrics.
+Run from the build_fabric directory using "python benchmarks/bench_inv_fabrics.py" (needs Ansible installed)
+"""
+
+import os
+import sys
+import time
+import yaml
+import shutil
+import tempfile
+import multiprocessing
+import importlib.util
+
+# Loads the inventory plugin straight from its file, is added to sys.modules so the worker processes can find build_inventory
+BUILD_FABRIC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+spec = importlib.util.spec_from_file_location('inv_from_vars', os.path.join(BUILD_FABRIC, 'inventory_plugins', 'inv_from_vars.py'))
+inv_from_vars = importlib.util.module_from_spec(spec)
+sys.modules['inv_from_vars'] = inv_from_vars
+spec.loader.exec_module(inv_from_vars)
+
+VAR_FILES = ['ansible.yml', 'base.yml', 'fabric.yml']
+VAR_DICTS = {'ansible': ['device_type'], 'base': ['device_name', 'addr'],
+             'fabric': ['network_size', 'num_intf', 'bse_intf', 'lp', 'mlag', 'addr_incre']}
+
+
+# Copies the vars for each fabric with its own device names and a big fabric size (16 spines, 4 borders, 400 leafs)
+def create_vars(tmp_dir, num_fbc):
+    fabric_paths = []
+    for fbc_num in range(1, num_fbc + 1):
+        vars_dir = os.path.join(tmp_dir, 'DC' + str(fbc_num))
+        os.makedirs(vars_dir)
+        for var_file in VAR_FILES:
+            with open(os.path.join(BUILD_FABRIC, 'vars', var_file)) as file_content:
+                var_data = yaml.load(file_content, Loader=yaml.FullLoader)
+            if var_file == 'base.yml':
+                var_data['bse']['device_name'] = {dev_type: 'DC{}-N9K-{}'.format(fbc_num, dev_type.upper()) for dev_type in ['spine', 'border', 'leaf']}
+                var_data['bse']['addr'].update({'mgmt_net': '10.10.0.0/16', 'mlag_net': '10.255.0.0/16'})
+            elif var_file == 'fabric.yml':
+                var_data['fbc']['network_size'] = {'num_spine': 16, 'num_border': 4, 'num_leaf': 400}
+                var_data['fbc']['adv']['bse_intf'].update({'sp_to_lf': 1, 'sp_to_bdr': 401})
+                var_data['fbc']['adv']['addr_incre'].update({'spine_ip': 100, 'border_ip': 200, 'leaf_ip': 300, 'border_vtep_lp': 800, 'leaf_vtep_lp': 900,
+                                                             'border_mlag_lp': 1400, 'leaf_mlag_lp': 1500, 'border_bgw_lp': 1800, 'mlag_leaf_ip': 10,
+                                                             'mlag_border_ip': 0})
+            with open(os.path.join(vars_dir, var_file), 'w') as file_content:
+                yaml.dump(var_data, file_content)
+        fabric_paths.append(([os.path.join(vars_dir, var_file) for var_file in VAR_FILES], VAR_DICTS, False, 'DC' + str(fbc_num)))
+    return fabric_paths
+
+
+def main():
+    print('{} CPUs'.format(multiprocessing.cpu_count()))
+    print('{:>8} {:>15} {:>15}'.format('fabrics', 'serial (ms)', 'parallel (ms)'))
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for num_fbc in [1, 2, 5, 10]:
+            fabric_args = create_vars(os.path.join(tmp_dir, str(num_fbc)), num_fbc)
+            start = time.perf_counter()
+            for args in fabric_args:
+                inv_from_vars.build_inventory(*args)
+            serial = time.perf_counter() - start
+            start = time.perf_counter()
+            inv_from_vars.build_fabrics(fabric_args)
+            parallel = time.perf_counter() - start
+            print('{:>8} {:>15.1f} {:>15.1f}'.format(num_fbc, serial * 1000, parallel * 1000))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Measures the peak RSS of 'ansible-inventory --list' with the full and compact (compact_intf) fabric interface host_vars.
+Every spine has an interface per leaf and border, so is run with 4, 16 and 64 spines (and 128 leafs, 4 borders).
+Run from the build_fabric directory using "python benchmarks/bench_inv_rss.py" (needs ansible-inventory in the PATH)
+"""
+
+import os
+import sys
+import yaml
+import shutil
+import tempfile
+import subprocess
+
+BUILD_FABRIC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+# Runs the command in a child python process so the peak RSS (ru_maxrss) of only that one command is measured
+RSS_WRAPPER = ('import resource, subprocess, sys; subprocess.run(sys.argv[1:], stdout=subprocess.DEVNULL, check=True); '
+               'print(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)')
+
+
+# Copies the vars with the fabric size changed and address ranges big enough to hold all the devices
+def create_vars(tmp_dir, num_spine, num_leaf, num_border):
+    os.makedirs(os.path.join(tmp_dir, 'vars'))
+    for var_file in ['ansible.yml', 'base.yml', 'fabric.yml']:
+        with open(os.path.join(BUILD_FABRIC, 'vars', var_file)) as file_content:
+            var_data = yaml.load(file_content, Loader=yaml.FullLoader)
+        if var_file == 'base.yml':
+            var_data['bse']['addr'].update({'mgmt_net': '10.10.0.0/16', 'mlag_net': '10.255.0.0/16'})
+        elif var_file == 'fabric.yml':
+            var_data['fbc']['network_size'] = {'num_spine': num_spine, 'num_border': num_border, 'num_leaf': num_leaf}
+            var_data['fbc']['adv']['bse_intf'].update({'sp_to_lf': 1, 'sp_to_bdr': num_leaf + 1})
+            var_data['fbc']['adv']['addr_incre'] = {'spine_ip': 100, 'border_ip': 200, 'leaf_ip': 300, 'border_vtep_lp': 600, 'leaf_vtep_lp': 700,
+                                                    'border_mlag_lp': 1000, 'leaf_mlag_lp': 1100, 'border_bgw_lp': 1300, 'mlag_leaf_ip': 10,
+                                                    'mlag_border_ip': 0}
+        with open(os.path.join(tmp_dir, 'vars', var_file), 'w') as file_content:
+            yaml.dump(var_data, file_content)
+
+
+# Inventory config file with caching disabled so every run builds the inventory
+def create_cfg(tmp_dir, compact):
+    with open(os.path.join(BUILD_FABRIC, 'inv_from_vars_cfg.yml')) as file_content:
+        cfg = yaml.load(file_content, Loader=yaml.FullLoader)
+    cfg.update({'cache': False, 'compact_intf': compact})
+    with open(os.path.join(tmp_dir, 'inv_from_vars_cfg.yml'), 'w') as file_content:
+        yaml.dump(cfg, file_content)
+
+
+def peak_rss(tmp_dir):
+    env = dict(os.environ, ANSIBLE_INVENTORY_PLUGINS=os.path.join(BUILD_FABRIC, 'inventory_plugins'))
+    cmd = [sys.executable, '-c', RSS_WRAPPER, 'ansible-inventory', '-i', 'inv_from_vars_cfg.yml', '--list']
+    output = subprocess.run(cmd, cwd=tmp_dir, env=env, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, check=True)
+    return int(output.stdout) / 1024            # ru_maxrss is in KB on Linux
+
+
+def main():
+    print('{:>7} {:>7} {:>15} {:>18}'.format('spines', 'hosts', 'full RSS (MB)', 'compact RSS (MB)'))
+    for num_spine in [4, 16, 64]:
+        rss = []
+        for compact in [False, True]:
+            tmp_dir = tempfile.mkdtemp()
+            try:
+                create_vars(tmp_dir, num_spine, 128, 4)
+                create_cfg(tmp_dir, compact)
+                rss.append(peak_rss(tmp_dir))
+            finally:
+                shutil.rmtree(tmp_dir)
+        print('{:>7} {:>7} {:>15.1f} {:>18.1f}'.format(num_spine, num_spine + 132, rss[0], rss[1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Benchmarks the IP overlap check (input_ip_overlap_validate) using PrefixIndex against checking every pair of prefixes with ipaddress.
+Generates 1k, 10k and 100k SVIs (/24) and layer3 interfaces (/30) spread over 10 tenants with no overlaps, so every prefix has to be compared.
+The pairwise check is only run up to 10k prefixes as it grows with the square of the number of prefixes.
+Run from the build_fabric directory using "python benchmarks/bench_ip_overlap.py"
+"""
+
+import os
+import sys
+import time
+import tempfile
+import ipaddress
+from itertools import combinations
+
+os.environ['INPUT_VALIDATE_CACHE'] = os.path.join(tempfile.mkdtemp(), 'input_validate_cache.json')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'filter_plugins'))
+from input_validate import FilterModule
+
+ADDR = {'lp_net': '192.168.100.0/32', 'mgmt_net': '10.10.108.0/24', 'mlag_net': '10.255.255.0/28', 'srv_ospf_net': '10.255.255.16/28'}
+
+
+# Half are SVIs in 20.x.x.0/24 and half layer3 interfaces in 30.x.x.x/30, the tenant is the prefix number modulo 10
+def gen_prefixes(num_pfx):
+    tenants = [{'tenant_name': 'TNT' + str(tnt_num), 'vlans': []} for tnt_num in range(10)]
+    svc_intf = {'single_homed': []}
+    for idx in range(num_pfx // 2):
+        tenants[idx % 10]['vlans'].append({'num': idx, 'ip_addr': '20.{}.{}.1/24'.format(idx // 256 % 256, idx % 256)})
+        svc_intf['single_homed'].append({'descr': 'L3 ' + str(idx), 'type': 'layer3', 'tenant': 'TNT' + str(idx % 10), 'switch': ['DC1-N9K-LEAF01'],
+                                         'ip_vlan': '30.{}.{}.{}/30'.format(idx // 16384 % 256, idx // 64 % 256, idx % 64 * 4 + 1)})
+    return tenants, svc_intf
+
+
+# How it would be done without the index, every prefix in a VRF is compared with every other one
+def pairwise(tenants, svc_intf):
+    per_vrf = {}
+    for tnt in tenants:
+        for vl in tnt['vlans']:
+            per_vrf.setdefault(tnt['tenant_name'], []).append(ipaddress.IPv4Interface(vl['ip_addr']).network)
+    for intf in svc_intf['single_homed']:
+        per_vrf.setdefault(intf['tenant'], []).append(ipaddress.IPv4Interface(intf['ip_vlan']).network)
+    return [(pfx1, pfx2) for pfxs in per_vrf.values() for pfx1, pfx2 in combinations(pfxs, 2) if pfx1.overlaps(pfx2)]
+
+
+def best_of(func, *args):
+    runs = []
+    for i in range(3):
+        start = time.perf_counter()
+        func(*args)
+        runs.append(time.perf_counter() - start)
+    return min(runs) * 1000
+
+
+def main():
+    validate = FilterModule().ip_overlap
+    print('{:>9} {:>15} {:>17}'.format('prefixes', 'pairwise (ms)', 'PrefixIndex (ms)'))
+    for num_pfx in [1000, 10000, 100000]:
+        tenants, svc_intf = gen_prefixes(num_pfx)
+        assert validate(tenants, svc_intf, [], ADDR) == "'IP overlap unittest pass'"
+        pair_time = '{:.1f}'.format(best_of(pairwise, tenants, svc_intf)) if num_pfx <= 10000 else '-'
+        print('{:>9} {:>15} {:>17.1f}'.format(num_pfx, pair_time, best_of(validate, tenants, svc_intf, [], ADDR)))
+
+
+if __name__ == '__main__':
+    main()
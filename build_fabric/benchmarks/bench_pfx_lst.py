@@ -0,0 +1,57 @@
+"""Benchmarks the prefix-list optimiser (optimise_pfx_lst, used by svc_rtr_dm if adv.optimise_pl is True) with 1k, 10k and 50k prefixes.
+The prefix-list is /25s of consecutive /24s (so the siblings can be joined), every 10th prefix is a repeat of an earlier one (shadowed) and
+every 100th is a deny. The shadowed entries are also found by checking every entry against all the ones before it to compare with the trie,
+this is only run up to 10k prefixes as it grows with the square of the number of prefixes.
+Run from the build_fabric directory using "python benchmarks/bench_pfx_lst.py"
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'roles', 'services', 'filter_plugins'))
+from format_dm import optimise_pfx_lst, pfx_range
+
+
+def gen_pfx_lst(num_pfx):
+    pfx_lst = []
+    for idx in range(num_pfx):
+        if idx % 10 == 9:
+            pfx = pfx_lst[idx // 2][3]
+        else:
+            pfx = '10.{}.{}.{}/25'.format(idx // 512 % 256, idx // 2 % 256, idx % 2 * 128)
+        pfx_lst.append(('PL_BENCH', (idx + 1) * 5, 'deny' if idx % 100 == 99 else 'permit', pfx))
+    return pfx_lst
+
+
+# How the shadowed entries would be found without the trie, each entry is compared with every entry before it
+def pairwise_shadow(pfx_lst):
+    earlier, kept = [], []
+    for pl_name, seq, action, pfx in pfx_lst:
+        net, length, ge, le = pfx_range(pfx)
+        if not any(length >= ern_len and net >> (32 - ern_len) << (32 - ern_len) == ern_net and ern_ge <= ge and le <= ern_le
+                   for ern_net, ern_len, ern_ge, ern_le in earlier):
+            kept.append(pfx)
+        earlier.append((net, length, ge, le))
+    return kept
+
+
+def best_of(func, *args):
+    runs = []
+    for i in range(3):
+        start = time.perf_counter()
+        func(*args)
+        runs.append(time.perf_counter() - start)
+    return min(runs) * 1000
+
+
+def main():
+    print('{:>9} {:>15} {:>15} {:>15}'.format('prefixes', 'pairwise (ms)', 'optimise (ms)', 'entries after'))
+    for num_pfx in [1000, 10000, 50000]:
+        pfx_lst = gen_pfx_lst(num_pfx)
+        pair_time = '{:.1f}'.format(best_of(pairwise_shadow, pfx_lst)) if num_pfx <= 10000 else '-'
+        print('{:>9} {:>15} {:>15.1f} {:>15}'.format(num_pfx, pair_time, best_of(optimise_pfx_lst, pfx_lst), len(optimise_pfx_lst(pfx_lst))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Benchmarks render_fabric.py (all the templates loaded once into a shared environment and the devices rendered across a process pool) against
+rendering the same config the way the playbook does, with 10, 100 and 500 devices (the example spines and borders plus copies of the example leafs).
+In the playbook every template task reads and compiles the template again for every device and the devices data-model is loaded for each task.
+Only that part of the playbook path is timed (in this process), Ansible's own per-task and per-host cost is on top of this so is the best case.
+Both create all the config snippets and config.cfg of every device and the files are checked to be the same.
+Run from the build_fabric directory using "python benchmarks/bench_render_fabric.py"
+"""
+
+import os
+import sys
+import copy
+import time
+import shutil
+import tempfile
+import multiprocessing
+from jinja2 import Environment
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import render_fabric
+from render_fabric import RENDER, load_vars, load_inventory, setup, render_all, host_context, assemble, finalize, ipaddr, ipmath
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+# The example fabric with the leafs replaced by num_hosts minus the spines and borders leafs, odd leafs are copies of LEAF01 and even of LEAF02
+def gen_fabric(num_hosts):
+    play_vars = load_vars(os.path.join(BASE_DIR, 'vars'))
+    groups, host_vars = load_inventory(os.path.join(BASE_DIR, 'vars'), os.path.join(BASE_DIR, 'inv_from_vars_cfg.yml'))
+    leaf_name = play_vars['bse']['device_name']['leaf']
+    leaf_grp = leaf_name.split('-')[-1].lower()
+    orig_leafs = groups[leaf_grp]
+    other = [host for host in groups['all'] if host not in orig_leafs]
+    groups[leaf_grp] = [leaf_name + '%02d' % num for num in range(1, num_hosts - len(other) + 1)]
+    for num, host in enumerate(groups[leaf_grp]):
+        host_vars[host] = copy.deepcopy(host_vars[orig_leafs[num % 2]])
+    groups['all'] = other + groups[leaf_grp]
+    return play_vars, groups, host_vars
+
+
+# How the playbook renders each device, each template task reads and compiles the template and loads the data-model
+def playbook_path(hosts):
+    for host in hosts:
+        config_dir = os.path.join(RENDER['dir_path'], host, 'config')
+        if not os.path.isdir(config_dir):
+            os.makedirs(config_dir)
+        snippets = host_context(host)[1]
+        for snippet, tmpl in snippets:
+            host_ctx = host_context(host)[0]
+            env = Environment(trim_blocks=True, keep_trailing_newline=True, finalize=finalize)
+            env.filters.update({'ipaddr': ipaddr, 'ipmath': ipmath})
+            tmpl_file = RENDER['envs'][host_ctx['ansible_network_os']].get_template(tmpl).filename
+            with open(tmpl_file) as file_content:
+                output = env.from_string(file_content.read()).render(host_ctx)
+            with open(os.path.join(config_dir, snippet + '.conf'), 'w') as file_content:
+                file_content.write(output)
+        assemble(config_dir)
+
+
+def read_configs(dir_path, hosts):
+    configs = {}
+    for host in hosts:
+        for file_name in sorted(os.listdir(os.path.join(dir_path, host, 'config'))):
+            with open(os.path.join(dir_path, host, 'config', file_name)) as file_content:
+                configs[(host, file_name)] = file_content.read()
+    return configs
+
+
+def main():
+    tmp_dir = tempfile.mkdtemp()
+    cache_dir = os.path.join(tmp_dir, 'j2_cache')
+    print('{:>7} {:>15} {:>13} {:>20} {:>9}'.format('hosts', 'playbook (ms)', 'render (ms)', 'render cached (ms)', 'speedup'))
+    try:
+        for num_hosts in [10, 100, 500]:
+            play_vars, groups, host_vars = gen_fabric(num_hosts)
+            # The data-models are created once (by svc_dm in the playbook) and used by both so are not included in the times
+            svc_dm_store = render_fabric.FormatDm().svc_dm_compile(play_vars['svc_tnt'], play_vars['svc_intf'], play_vars.get('svc_rtr'),
+                                                                   play_vars['fbc'], groups['all'], os.path.join(tmp_dir, 'svc_dm'))
+            pb_dir, rdr_dir = os.path.join(tmp_dir, 'playbook'), os.path.join(tmp_dir, 'render')
+            setup(play_vars, groups, host_vars, pb_dir, cache_dir, svc_dm_store)
+            start = time.perf_counter()
+            playbook_path(groups['all'])
+            pb_time = time.perf_counter() - start
+            # render_fabric, first with an empty bytecode cache (templates compiled) then a second run using the cache
+            times = []
+            for run in range(2):
+                RENDER.clear()
+                if run == 0:
+                    shutil.rmtree(cache_dir, ignore_errors=True)
+                start = time.perf_counter()
+                setup(play_vars, groups, host_vars, rdr_dir, cache_dir, svc_dm_store)
+                render_all(groups['all'])
+                times.append(time.perf_counter() - start)
+            assert read_configs(pb_dir, groups['all']) == read_configs(rdr_dir, groups['all'])
+            print('{:>7} {:>15.1f} {:>13.1f} {:>20.1f} {:>8.1f}x'.format(num_hosts, pb_time * 1000, times[0] * 1000, times[1] * 1000, pb_time / times[1]))
+    finally:
+        shutil.rmtree(tmp_dir)
+    print('({} CPUs)'.format(multiprocessing.cpu_count()))
+
+
+if __name__ == '__main__':
+    main()
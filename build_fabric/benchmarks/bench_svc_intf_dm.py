@@ -0,0 +1,61 @@
+"""Benchmarks creating the per-device service_interface data-models (create_svc_intf_dm) for every leaf, as done by the svc_intf role.
+Compares every device going through all the interfaces against creating the per-switch index (create_svc_intf_idx) once and each device using it.
+There are 48 ports per leaf, half single-homed and half dual-homed (dual-homed are only defined on the odd numbered leafs as they go on both MLAG peers).
+Each device gets its own copy of the interfaces beforehand (as Ansible templates the variables for each host), this is not included in the times.
+Run from the build_fabric directory using "python benchmarks/bench_svc_intf_dm.py"
+"""
+
+import os
+import sys
+import copy
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'roles', 'services', 'filter_plugins'))
+from format_dm import FilterModule
+
+LEAF_NAME = 'DC1-N9K-LEAF'
+ADV = {'single_homed': {'first_intf': 1, 'last_intf': 24, 'first_lp': 11, 'last_lp': 20},
+       'dual_homed': {'first_intf': 25, 'last_intf': 48, 'first_po': 25, 'last_po': 48}}
+BSE_INTF = {'intf_fmt': 'Ethernet1/', 'lp_fmt': 'loopback', 'ec_fmt': 'port-channel'}
+
+
+# 24 single-homed ports on every leaf and 24 dual-homed ports per MLAG pair, a mix of access, trunk and layer3 ports
+def gen_svc_intf(num_leaf, num_port):
+    svc_intf = {'single_homed': [], 'dual_homed': []}
+    for leaf_num in range(1, num_leaf + 1):
+        switch = LEAF_NAME + '%02d' % leaf_num
+        for port in range(num_port // 2):
+            if port % 3 == 0:
+                intf = {'type': 'layer3', 'tenant': 'BLU', 'ip_vlan': '10.{}.{}.1/30'.format(leaf_num, port * 4)}
+            else:
+                intf = {'type': 'access' if port % 3 == 1 else 'stp_trunk', 'ip_vlan': '10,20-22,30' if port % 3 == 2 else 10}
+            intf.update({'descr': 'SH {} port {}'.format(switch, port), 'switch': [switch]})
+            svc_intf['single_homed'].append(intf)
+            if leaf_num % 2 == 1:
+                svc_intf['dual_homed'].append({'descr': 'DH {} port {}'.format(switch, port), 'type': 'stp_trunk' if port % 2 else 'access',
+                                               'ip_vlan': '10,20-22,30' if port % 2 else 20, 'switch': [switch]})
+    return svc_intf
+
+
+def main():
+    dm = FilterModule()
+    print('{:>7} {:>12} {:>14} {:>12} {:>10}'.format('leafs', 'interfaces', 'all intf (ms)', 'index (ms)', 'speedup'))
+    for num_leaf in [10, 50, 200]:
+        svc_intf = gen_svc_intf(num_leaf, 48)
+        hosts = [LEAF_NAME + '%02d' % leaf_num for leaf_num in range(1, num_leaf + 1)]
+        # All interfaces, each device goes through all of them (the data-model changes the interfaces so each device needs its own copy)
+        host_copies = [copy.deepcopy(svc_intf) for host in hosts]
+        start = time.perf_counter()
+        all_intf = [dm.svc_intf_dm(host_svc_intf, host, ADV, BSE_INTF) for host, host_svc_intf in zip(hosts, host_copies)]
+        all_time = time.perf_counter() - start
+        # Index, created once (run_once) and then each device just looks up its own interfaces
+        start = time.perf_counter()
+        svc_intf_idx = dm.svc_intf_idx(svc_intf)
+        index = [dm.svc_intf_dm(svc_intf_idx, host, ADV, BSE_INTF) for host in hosts]
+        idx_time = time.perf_counter() - start
+        assert all_intf == index
+        print('{:>7} {:>12} {:>14.1f} {:>12.1f} {:>9.1f}x'.format(num_leaf, num_leaf * 48, all_time * 1000, idx_time * 1000, all_time / idx_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Benchmarks creating the per-device service_routing data-models for every leaf, as done by the svc_rtr role.
+Compares every device going through all the groups, peers, tenants, OSPF processes and static routes (build_svc_rtr_dm with all of the input,
+how create_svc_rtr_dm worked before the index) against creating the per-switch index (create_svc_rtr_idx) once and each device using it.
+The peers are in groups of 10 and spread over the MLAG pairs, every switch also has a BGP network and redist, an OSPF interface and a static route.
+Creating the data-model changes its input so each device needs its own copy. Without the index that is a copy of all the input (Ansible templates
+the variables for each host), with the index it is just the devices part of the index (svc_rtr_host_dm copies it). Both copies are included in the times.
+Run from the build_fabric directory using "python benchmarks/bench_svc_rtr_dm.py"
+"""
+
+import os
+import sys
+import copy
+import time
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'roles', 'services', 'filter_plugins'))
+from format_dm import FilterModule
+
+LEAF_NAME = 'DC1-N9K-LEAF'
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+ADV = yaml.safe_load(open(os.path.join(BASE_DIR, 'vars', 'service_routing.yml')))['svc_rtr']['adv']
+FBC = yaml.safe_load(open(os.path.join(BASE_DIR, 'vars', 'fabric.yml')))['fbc']
+
+
+def gen_svc_rtr(num_leaf, num_peer):
+    hosts = [LEAF_NAME + '%02d' % leaf_num for leaf_num in range(1, num_leaf + 1)]
+    bgp_grps, bgp_tnt, ospf, static_route = ([] for i in range(4))
+    for peer_num in range(num_peer):
+        if peer_num % 10 == 0:
+            bgp_grps.append({'name': 'GRP{}'.format(peer_num // 10), 'tenant': ['BLU'], 'peer': [],
+                             'inbound': {'allow': 'default'}, 'outbound': {'med': {50: ['10.20.10.0/24']}, 'allow': 'any'}})
+        pair = peer_num % (num_leaf // 2) * 2
+        bgp_grps[-1]['peer'].append({'name': 'PEER{}'.format(peer_num), 'remote_as': 65000 + peer_num, 'peer_ip': '10.{}.{}.1'.format(peer_num // 256, peer_num % 256),
+                                     'description': 'peer {}'.format(peer_num), 'switch': hosts[pair:pair + 2], 'inbound': {'allow': ['172.16.{}.0/24'.format(peer_num % 256)]}})
+    bgp_tnt.append({'name': 'BLU', 'network': [{'switch': [host], 'prefix': ['10.{}.0.0/16'.format(num)]} for num, host in enumerate(hosts)],
+                    'redist': [{'type': 'connected', 'switch': [host], 'allow': ['10.{}.1.0/24'.format(num)]} for num, host in enumerate(hosts)]})
+    bgp_tnt.append({'name': 'GRN'})
+    ospf.append({'process': 99, 'tenant': 'BLU', 'rid': [], 'interface': [{'name': ['Vlan10'], 'area': '0.0.0.0', 'switch': [host]} for host in hosts]})
+    static_route.append({'tenant': ['BLU'], 'route': [{'prefix': ['192.168.{}.0/24'.format(num)], 'gateway': '10.1.1.1', 'switch': [host]}
+                                                      for num, host in enumerate(hosts)]})
+    return hosts, (bgp_grps, bgp_tnt, ospf, static_route)
+
+
+def main():
+    dm = FilterModule()
+    print('{:>7} {:>7} {:>14} {:>12} {:>10}'.format('leafs', 'peers', 'all rtr (ms)', 'index (ms)', 'speedup'))
+    for num_leaf, num_peer in [(10, 500), (50, 500), (100, 500), (100, 2000)]:
+        hosts, svc_rtr = gen_svc_rtr(num_leaf, num_peer)
+        # All of the input, each device gets its own copy and goes through all of it
+        start = time.perf_counter()
+        all_rtr = [dm.build_svc_rtr_dm(host, *copy.deepcopy(svc_rtr), ADV, FBC) for host in hosts]
+        all_time = time.perf_counter() - start
+        # Index, created once (run_once) and then each device just uses its own groups, peers, etc
+        start = time.perf_counter()
+        svc_rtr_idx = dm.svc_rtr_idx(*svc_rtr)
+        index = [dm.svc_rtr_host_dm(svc_rtr_idx, host, ADV, FBC) for host in hosts]
+        idx_time = time.perf_counter() - start
+        assert all_rtr == index
+        print('{:>7} {:>7} {:>14.1f} {:>12.1f} {:>9.1f}x'.format(num_leaf, num_peer, all_time * 1000, idx_time * 1000, all_time / idx_time))
+
+
+if __name__ == '__main__':
+    main()
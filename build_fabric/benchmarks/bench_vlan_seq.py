@@ -0,0 +1,61 @@
+"""Benchmarks vlan_seq (used by create_svc_intf_dm on every trunk of every device and by create_svc_tnt_dm) against expanding every VLAN.
+Each device has 48 trunks, half allow all VLANs (1-4094) and the rest use one of 10 lists of ranges, so most calls are for a string already seen.
+Shows the range merge with the cache (as used) and without it (cache cleared before each call) to show what each part saves.
+Run from the build_fabric directory using "python benchmarks/bench_vlan_seq.py"
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'roles', 'services', 'filter_plugins'))
+from format_dm import FilterModule, vlan_ranges
+
+TRUNKS = ['1-4094'] * 5 + ['{}-{},{},{}-{}'.format(num * 300 + 1, num * 300 + 250, num * 300 + 260, num * 300 + 270, num * 300 + 299)
+                          for num in range(5)]
+
+
+# How it was done before, every range is expanded into VLANs that are sorted and regrouped into sequential lists
+def expand_vlan_seq(vlans):
+    vlan_list, vlan_seq_lists, vlan_seq = ([] for i in range(3))
+    for vl in vlans.split(','):
+        if '-' in vl:
+            vlan_list.extend(range(int(vl.split('-')[0]), int(vl.split('-')[1]) + 1))
+        else:
+            vlan_list.append(int(vl))
+    for vlan in sorted(vlan_list):
+        if vlan_seq_lists and vlan_seq_lists[-1][-1] == vlan - 1:
+            vlan_seq_lists[-1].append(vlan)
+        else:
+            vlan_seq_lists.append([vlan])
+    for vlan in vlan_seq_lists:
+        vlan_seq.append(str(vlan[0]) if len(vlan) == 1 else '{}-{}'.format(vlan[0], vlan[-1]))
+    return ','.join(vlan_seq)
+
+
+def uncached_vlan_seq(vlans):
+    vlan_ranges.cache_clear()
+    return vlan_ranges(vlans)
+
+
+def run(func, num_hosts):
+    start = time.perf_counter()
+    for host in range(num_hosts):
+        for trunk in range(48):
+            func(TRUNKS[trunk % len(TRUNKS)])
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    vlan_seq = FilterModule().vlan_seq
+    for trunk in TRUNKS:
+        assert expand_vlan_seq(trunk) == vlan_seq(trunk)
+    print('{:>7} {:>8} {:>15} {:>18} {:>16}'.format('hosts', 'trunks', 'expanded (ms)', 'ranges (ms)', 'cached (ms)'))
+    for num_hosts in [10, 100, 500]:
+        vlan_ranges.cache_clear()
+        print('{:>7} {:>8} {:>15.1f} {:>18.1f} {:>16.1f}'.format(num_hosts, num_hosts * 48, run(expand_vlan_seq, num_hosts),
+                                                             run(uncached_vlan_seq, num_hosts), run(vlan_seq, num_hosts)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Benchmarks the trunk VLAN checks (duplicates and VLANs missing from the switch) using VlanSet against expanding every range into a list of VLANs.
+Each trunk allows 4094 VLANs, either as one range (1-4094) or as 40 ranges of about 100 VLANs, so VlanSet only grows with the number of ranges.
+Run from the build_fabric directory using "python benchmarks/bench_vlan_set.py"
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+os.environ['INPUT_VALIDATE_CACHE'] = os.path.join(tempfile.mkdtemp(), 'input_validate_cache.json')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'filter_plugins'))
+from input_validate import VlanSet
+
+TRUNKS = {'1 range': '1-4094',
+          '40 ranges': ','.join('{}-{}'.format(first, min(first + 99, 4094)) for first in range(1, 4095, 100))}
+TENANT_VLANS = list(range(1, 4095))
+
+
+# How it was done before VlanSet, every range is expanded into a list of VLANs that is made into sets to find duplicates and missing VLANs
+def expand_trunks(trunks, tenant_vlans):
+    all_vlans = set()
+    for trunk in trunks:
+        list_intf_vlans = []
+        for vlan in trunk.split(','):
+            first, last = vlan.split('-') if '-' in vlan else (vlan, vlan)
+            list_intf_vlans.extend(range(int(first), int(last) + 1))
+        assert len(set(list_intf_vlans)) == len(list_intf_vlans)
+        all_vlans.update(list_intf_vlans)
+    return all_vlans - set(tenant_vlans)
+
+
+def vlan_set_trunks(trunks, tenant_vlans):
+    all_ranges = []
+    for trunk in trunks:
+        trunk_ranges = []
+        for vlan in trunk.split(','):
+            first, last = vlan.split('-') if '-' in vlan else (vlan, vlan)
+            trunk_ranges.append((int(first), int(last)))
+        trunk_vlans = VlanSet(trunk_ranges)
+        assert len(trunk_vlans.dup) == 0
+        all_ranges.extend(trunk_vlans.ranges)
+    return VlanSet(all_ranges) - VlanSet((vl, vl) for vl in tenant_vlans)
+
+
+def best_of(func, *args):
+    runs = []
+    for i in range(3):
+        start = time.perf_counter()
+        func(*args)
+        runs.append(time.perf_counter() - start)
+    return min(runs) * 1000
+
+
+def main():
+    print('{:>10} {:>7} {:>15} {:>14}'.format('trunk', 'trunks', 'expanded (ms)', 'VlanSet (ms)'))
+    for name, trunk in TRUNKS.items():
+        for num_trunk in [10, 100, 1000]:
+            trunks = [trunk] * num_trunk
+            print('{:>10} {:>7} {:>15.1f} {:>14.1f}'.format(name, num_trunk, best_of(expand_trunks, trunks, TENANT_VLANS),
+                                                          best_of(vlan_set_trunks, trunks, TENANT_VLANS)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+'''
+Works out the minimal config changes (delta) to get from the config last deployed to a device to the newly built config.cfg, so only the changes
+are merged rather than the whole config replaced. Both configs are parsed into hierarchical trees (sections split over many snippets, such as
+router bgp, are joined) and compared line by line within each section. Removed lines are negated ('no' in their section, in reverse order so
+dependants go first) and added lines (with all of their section) are added in config order.
+If the delta cant safely be done with a merge the mode is replace and the reason why is given, such as no config has been deployed yet or a
+removed line cant just be negated (a feature, physical interface or a line that is already a 'no' command).
+'''
+
+import os
+
+# The config last successfully deployed to the device is saved as this file in ans.state_dir/hostname
+DEPLOYED_CFG = 'deployed_config.cfg'
+# Removing these disrupts the device or removes more than the line (feature removes all its config, vrf member all the interfaces L3 config)
+UNSAFE_RM = ['feature ', 'version ', 'boot ', 'vdc ', 'hardware ', 'system ', 'username ', 'crypto ', 'nv overlay', 'license ', 'vrf member ']
+PHYSICAL_INTF = ['interface Ethernet', 'interface mgmt']
+
+
+class FilterModule(object):
+    def filters(self):
+        return {
+            'config_delta': self.config_delta
+        }
+
+    # TREE: Each line is a key with a dict of its child lines, comments and blank lines are ignored and repeated sections are joined
+    def parse_config(self, config):
+        tree = {}
+        parents = [(-1, tree)]
+        for line in config.splitlines():
+            if line.strip() == '' or line.strip().startswith('!'):
+                continue
+            indent = len(line) - len(line.lstrip())
+            while parents[-1][0] >= indent:
+                parents.pop()
+            parents.append((indent, parents[-1][1].setdefault(line.strip(), {})))
+        return tree
+
+    # COMPARE: Lists of the removed and added lines, each is the lines parents (section), the line and its child lines
+    def compare_tree(self, old, new, parents, removed, added):
+        for line, children in old.items():
+            if line not in new:
+                removed.append((parents, line, children))
+            else:
+                self.compare_tree(children, new[line], parents + [line], removed, added)
+        for line, children in new.items():
+            if line not in old:
+                added.append((parents, line, children))
+
+    # UNSAFE: Returns why a removed line cant be negated in a merge (None if it can be)
+    def unsafe_remove(self, parents, line, children, added):
+        sect_added = [add_line for add_parents, add_line, add_children in added if add_parents == parents]
+        if line.startswith('no '):
+            # Negating a 'no' line is only known if the positive command replaces it (such as 'no shutdown' to 'shutdown')
+            if not any(add_line.startswith(line[3:]) for add_line in sect_added):
+                return "'{}' removed".format(line)
+        elif any(line.startswith(unsafe) for unsafe in UNSAFE_RM):
+            return "'{}' removed".format(line)
+        elif len(parents) == 0 and len(children) != 0 and any(line.startswith(intf) and '.' not in line for intf in PHYSICAL_INTF):
+            return "physical interface '{}' removed".format(line)
+
+    def emit_section(self, line, children, indent, delta):
+        delta.append('  ' * indent + line)
+        for child_line, child_children in children.items():
+            self.emit_section(child_line, child_children, indent + 1, delta)
+
+###################################### CONFIG DELTA: Compares the new config to the last deployed ######################################
+# Compares dir_path/hostname/config/config.cfg to the last deployed, returns the deploy mode, reason for it and the delta (merge) config
+
+    def config_delta(self, dir_path, hostname, state_dir=None):
+        # 1. LOAD: The previous config is the one saved by the last deploy, if there is none the config has to be replaced
+        if not state_dir:
+            return {'mode': 'replace', 'reason': 'no state_dir to get the last deployed config from', 'delta': '', 'added': 0, 'removed': 0}
+        try:
+            with open(os.path.join(os.path.expanduser(state_dir), hostname, DEPLOYED_CFG)) as file_content:
+                old = self.parse_config(file_content.read())
+        except (IOError, OSError):
+            return {'mode': 'replace', 'reason': 'no config has been deployed yet', 'delta': '', 'added': 0, 'removed': 0}
+        with open(os.path.join(os.path.expanduser(dir_path), hostname, 'config', 'config.cfg')) as file_content:
+            new = self.parse_config(file_content.read())
+
+        # 2. COMPARE: Removed lines replaced by their negative or positive (such as 'shutdown' to 'no shutdown') dont need removing
+        removed, added = [], []
+        self.compare_tree(old, new, [], removed, added)
+        delta, context = [], None
+        for parents, line, children in reversed(removed):
+            if any(add_parents == parents and add_line == 'no ' + line for add_parents, add_line, add_children in added):
+                continue
+            reason = self.unsafe_remove(parents, line, children, added)
+            if reason != None:
+                return {'mode': 'replace', 'reason': reason, 'delta': '', 'added': len(added), 'removed': len(removed)}
+            if line.startswith('no '):
+                continue
+            # 3. REMOVE: The parents are only repeated if the line is in a different section to the last one
+            if parents != context:
+                delta.extend('  ' * indent + parent for indent, parent in enumerate(parents))
+                context = parents
+            delta.append('  ' * len(parents) + 'no ' + line)
+        # 4. ADD: Lines added with all of their child lines, so the next line always needs its parents again
+        for parents, line, children in added:
+            if parents != context:
+                delta.extend('  ' * indent + parent for indent, parent in enumerate(parents))
+            self.emit_section(line, children, len(parents), delta)
+            context = parents if len(children) == 0 else None
+
+        reason = 'no changes' if len(delta) == 0 else '{} lines added and {} removed'.format(len(added), len(removed))
+        return {'mode': 'merge', 'reason': reason, 'delta': ''.join(line + '\n' for line in delta), 'added': len(added), 'removed': len(removed)}
@@ -0,0 +1,38 @@
+'''
+Expands the compact fabric interface host_vars created by the inv_from_vars inventory plugin when 'compact_intf' is set.
+Rather than every host having full dicts of its fabric and MLAG interfaces the inventory holds one shared cabling table
+(fbc_cabling) and a per-host index (intf_idx). The intf_fbc and intf_mlag host_vars are templates that call these filters,
+so the {intf: descr} dict is only created when a template reads it. Same logic as the inventory plugins create_intf.
+'''
+
+class FilterModule(object):
+    def filters(self):
+        return {
+            'fbc_intf': self.fbc_intf,
+            'mlag_intf': self.mlag_intf
+        }
+
+    # FBC: Spines have an uplink to every leaf and border, leafs and borders have an uplink to every spine
+    def fbc_intf(self, cbl, intf_idx):
+        dev_type, num = intf_idx['role'], intf_idx['num']
+        intf = {}
+        if dev_type == 'spine':
+            for peer_type, local, remote in [('leaf', 'sp_to_lf', 'lf_to_sp'), ('border', 'sp_to_bdr', 'bdr_to_sp')]:
+                for peer_num in range(1, cbl['num'][peer_type] + 1):
+                    intf[cbl['intf_fmt'] + str(cbl[local] + peer_num - 1)] = ('UPLINK > ' + cbl['name'][peer_type] + "{:02d} ".format(peer_num) +
+                                                                              cbl['intf_short'] + str(num + cbl[remote] - 1))
+        else:
+            local, remote = ('lf_to_sp', 'sp_to_lf') if dev_type == 'leaf' else ('bdr_to_sp', 'sp_to_bdr')
+            for sp_num in range(1, cbl['num']['spine'] + 1):
+                intf[cbl['intf_fmt'] + str(cbl[local] + sp_num - 1)] = ('UPLINK > ' + cbl['name']['spine'] + "{:02d} ".format(sp_num) +
+                                                                       cbl['intf_short'] + str(num + cbl[remote] - 1))
+        return intf
+
+    # MLAG: Peer-link Port-Channel and member interfaces. Odd numbered devices peer with the next device, even numbered with the previous
+    def mlag_intf(self, cbl, intf_idx):
+        dev_type, num = intf_idx['role'], intf_idx['num']
+        peer = cbl['name'][dev_type] + "{:02d} ".format(num + 1 if num % 2 != 0 else num - 1)
+        mlag_ports = [(cbl['ec_fmt'] + str(cbl['peer_po']), cbl['ec_short'] + str(cbl['peer_po']))]
+        for intf_num in str(cbl['mlag_peer']).split('-'):
+            mlag_ports.append((cbl['intf_fmt'] + intf_num, cbl['intf_short'] + intf_num))
+        return {intf: 'MLAG peer-link > ' + peer + intf_short for intf, intf_short in mlag_ports}
@@ -48,96 +48,406 @@ svc_intf.intf.single_homed: Ensures are enough free ports in the range (range mi
 svc_intf.intf.dual_homed: Ensures are enough free ports in the range (range minus conflicting static assignments) for number of interfaces defined
 svc_intf.intf.dual_homed: Ensures are enough free port-channels in the range (range minus conflicting static assignments) for number of port-channels defined
 -svc_intf.intf.homed: Make sure that are not more defined interfaces (single and dual_homed) than there are actual interfaces on the switch
+
+-IP overlaps (per VRF) using base.yml, services_tenant.yml, services_interface.yml and service_routing.yml
+bse.addr: Ensures the address ranges do not overlap each other (mgmt_net is in the management VRF, the others in the default VRF)
+svc_tnt.tnt.vlans.ip_addr: Ensures SVI subnets do not overlap any other SVI, layer3 or loopback subnet in the same tenant
+svc_intf.intf.single_homed.ip_vlan: Ensures layer3 and loopback subnets do not overlap any other subnet in the same tenant (default VRF if no tenant)
+svc_rtr.static_route.route.prefix: Ensures static routes are not for all or part of a connected subnet in the same tenant
+
+Results are cached (see memoise) so the assert 'that' and 'fail_msg' do not both run the validation and unchanged files are not re-validated.
+input_validate_all runs all of the above at once (in parallel processes) and returns one report of all the errors in the order of the files.
 """
 
+import os
 import re
+import sys
+import json
+import hashlib
+import tempfile
+import subprocess
+import multiprocessing
 import ipaddress
+from bisect import bisect_right
 from collections import defaultdict
 
 
+############  Compiled rules used by all the validate methods ############
+# Regexes are compiled once when the filter plugin is loaded. The tests only return True or False (no exceptions) and the
+# error message is only formatted if the test fails, so each record is checked in a single pass with no cost for the messages
+RE_DEV_NAME = re.compile(r'-[a-zA-Z0-9_]+$')
+RE_DEV_NUM = re.compile(r'^(.*?)(\d+)$')
+RE_PASSWORD = re.compile(r'^.{25,}$')
+RE_NUM_SPINE = re.compile('[1-4]')
+RE_NUM_LEAF = re.compile('^([2468]|10)$')
+RE_NUM_BORDER = re.compile('^[024]$')
+RE_NUM_INTF = re.compile(r'^\d,\d{1,3}$')
+RE_MAC = re.compile(r'([0-9A-Fa-f]{4}\.){2}[0-9A-Fa-f]{4}')
+RE_MLAG_PEER = re.compile('^[0-9]{1,3}-[0-9]{1,3}$')
+RE_VLAN = re.compile(r'^(?:(?:[1-9]\d{0,2}|[1-3]\d{3}|40[0-8]\d|409[0-6]),)*?(?:(?:[1-9]\d{0,2}|[1-3]\d{3}|40[0-8]\d|409[0-6]))$')
+RE_RM_NAME = re.compile(r'vrf\S*as|as\S*vrf')
+RE_PO_MODE = re.compile('^(active|passive|on)$')
+RE_SPACE = re.compile(r'\s')
+RE_INT = re.compile(r'\s*\+?\d+\s*')
+RE_IPV4 = re.compile(r'(0|[1-9]\d{0,2})\.(0|[1-9]\d{0,2})\.(0|[1-9]\d{0,2})\.(0|[1-9]\d{0,2})(?:/(\d{1,2}))?')
+
+def is_int(value):
+    return isinstance(value, int)
+def is_bool(value):
+    return isinstance(value, bool)
+def not_none(value):
+    return value != None
+def no_dup(value):
+    return len(value) == 0
+def str_match(regex):
+    return lambda value: regex.match(str(value)) is not None
+
+# IPv4: The x.x.x.x or x.x.x.x/x format is checked with the regex (and host bits if is a network), anything else (netmask format) is left to ipaddress
+def ipv4_regex(value, network):
+    match = RE_IPV4.fullmatch(value) if isinstance(value, str) else None
+    if match is None:
+        return None
+    octets = [int(octet) for octet in match.group(1, 2, 3, 4)]
+    prefix = int(match.group(5) or 32)
+    if max(octets) > 255 or prefix > 32:
+        return False
+    addr = (octets[0] << 24) | (octets[1] << 16) | (octets[2] << 8) | octets[3]
+    return not network or addr & ((1 << (32 - prefix)) - 1) == 0
+
+def is_ipv4_intf(value):
+    valid = ipv4_regex(value, False)
+    if valid is None:
+        try:
+            ipaddress.IPv4Interface(value)
+            valid = True
+        except (ipaddress.AddressValueError, ipaddress.NetmaskValueError):
+            valid = False
+    return valid
+
+def is_ipv4_net(value):
+    valid = ipv4_regex(value, True)
+    if valid is None:
+        try:
+            ipaddress.IPv4Network(value)
+            valid = True
+        except ValueError:
+            valid = False
+    return valid
+
+# DUPLICATES: List of the values that are seen more than once (in the order they are first duplicated)
+def duplicates(values):
+    seen, dup_seen, dup = set(), set(), []
+    for value in values:
+        if value not in seen:
+            seen.add(value)
+        elif value not in dup_seen:
+            dup_seen.add(value)
+            dup.append(value)
+    return dup
+
+# CHECK: Runs a rule (test, error message) against the value, if it fails the message is formatted with the value and any other fmt arguments
+def check(errors, rule, value, **fmt):
+    if not rule[0](value):
+        errors.append(rule[1].format(value=value, **fmt))
+
+
+############  Interval set used for VLAN ranges ############
+# VLANs are held as sorted, non-overlapping (first, last) ranges so the cost of any operation is the number of ranges, not VLANs.
+# Created from (first, last) ranges (first > last is empty), any VLANs that were in more than one of these ranges are held in dup
+class VlanSet(object):
+    def __init__(self, ranges=()):
+        self.ranges, self.dup = [], []
+        prev_first, prev_last = None, None
+        for first, last in sorted(ranges):
+            if first > last:
+                continue
+            if prev_last is not None and first <= prev_last + 1:
+                if first <= prev_last:
+                    self.dup.append((first, min(last, prev_last)))
+                if last > prev_last:
+                    prev_last = last
+            else:
+                if prev_last is not None:
+                    self.ranges.append((prev_first, prev_last))
+                prev_first, prev_last = first, last
+        if prev_last is not None:
+            self.ranges.append((prev_first, prev_last))
+
+    # UNION: VLANs in either set
+    def __or__(self, other):
+        return VlanSet(self.ranges + other.ranges)
+    union = __or__
+
+    # INTERSECTION: VLANs in both sets, walks through the ranges of both sets in step
+    def __and__(self, other):
+        common, idx, other_idx = [], 0, 0
+        while idx < len(self.ranges) and other_idx < len(other.ranges):
+            first = max(self.ranges[idx][0], other.ranges[other_idx][0])
+            last = min(self.ranges[idx][1], other.ranges[other_idx][1])
+            if first <= last:
+                common.append((first, last))
+            if self.ranges[idx][1] < other.ranges[other_idx][1]:
+                idx += 1
+            else:
+                other_idx += 1
+        return VlanSet(common)
+    intersection = __and__
+
+    # DIFFERENCE: VLANs in this set that are not in the other set
+    def __sub__(self, other):
+        remain, other_idx = [], 0
+        for first, last in self.ranges:
+            while other_idx < len(other.ranges) and other.ranges[other_idx][1] < first:
+                other_idx += 1
+            idx = other_idx
+            while idx < len(other.ranges) and other.ranges[idx][0] <= last:
+                if other.ranges[idx][0] > first:
+                    remain.append((first, other.ranges[idx][0] - 1))
+                first = max(first, other.ranges[idx][1] + 1)
+                idx += 1
+            if first <= last:
+                remain.append((first, last))
+        return VlanSet(remain)
+    difference = __sub__
+
+    # OVERLAP: True if any VLAN is in both sets
+    def overlaps(self, other):
+        return len((self & other).ranges) != 0
+
+    # MEMBERSHIP: Binary search for the range that starts at or before the VLAN
+    def __contains__(self, vlan):
+        idx = bisect_right(self.ranges, (vlan, float('inf'))) - 1
+        return idx >= 0 and vlan <= self.ranges[idx][1]
+
+    def __len__(self):
+        return sum(last - first + 1 for first, last in self.ranges)
+
+    def __iter__(self):
+        for first, last in self.ranges:
+            for vlan in range(first, last + 1):
+                yield vlan
+
+    def __eq__(self, other):
+        return isinstance(other, VlanSet) and self.ranges == other.ranges
+
+    # Same format as a trunk VLAN list in the variable files (10,20-30)
+    def __str__(self):
+        return ','.join(str(first) if first == last else '{}-{}'.format(first, last) for first, last in self.ranges)
+
+
+############  Interval index used for IP overlaps ############
+# IPV4_RANGE: The (first, last) addresses of the network an address/prefix is in, None if it is not valid (is reported by the format checks)
+def ipv4_range(value):
+    match = RE_IPV4.fullmatch(value) if isinstance(value, str) else None
+    if match is not None:
+        octets = [int(octet) for octet in match.group(1, 2, 3, 4)]
+        prefix = int(match.group(5) or 32)
+        if max(octets) > 255 or prefix > 32:
+            return None
+        host_mask = (1 << (32 - prefix)) - 1
+        addr = (octets[0] << 24) | (octets[1] << 16) | (octets[2] << 8) | octets[3]
+        return (addr & ~host_mask, addr | host_mask)
+    try:
+        network = ipaddress.IPv4Interface(value).network
+        return (int(network.network_address), int(network.broadcast_address))
+    except (ipaddress.AddressValueError, ipaddress.NetmaskValueError, TypeError):
+        return None
+
+# Prefixes are added per VRF as either 'connected' (interface subnets and address ranges) or 'route' (static routes). As prefixes are either
+# nested or don't overlap, once sorted by first address (biggest first) one pass with a stack of the prefixes that contain the current one finds
+# every overlap in O(n log n). Connected subnets must not overlap anything, a route is only a conflict if it is within a connected subnet.
+class PrefixIndex(object):
+    def __init__(self):
+        self.prefixes = defaultdict(list)
+
+    def add(self, vrf, value, kind, source):
+        ip_range = ipv4_range(value)
+        if ip_range is not None:
+            self.prefixes[vrf].append((ip_range[0], ip_range[1], value, kind, source))
+
+    # CONFLICTS: Yields (vrf, outer, inner) for each conflict, outer is the prefix that contains (or is the same as) inner
+    def conflicts(self):
+        for vrf in sorted(self.prefixes, key=str):
+            stack = []
+            for pfx in sorted(self.prefixes[vrf], key=lambda pfx: (pfx[0], -pfx[1])):
+                while len(stack) != 0 and stack[-1][1] < pfx[0]:
+                    stack.pop()
+                for outer in stack:
+                    if outer[3] == 'connected' or (pfx[3] == 'connected' and outer[:2] == pfx[:2]):
+                        yield vrf, outer, pfx
+                stack.append(pfx)
+
+
+# Rule tables for each variable file. Rules that compare values got from different parts of the file (interface counts, VRFs and VLANs
+# on switches) are worked out after the single pass through the records so only have the error message
+BSE_RULES = {
+    'device_name': (RE_DEV_NAME.search, "-bse.device_name.{key} '{value}' is not in the correct format. Anything after the last '-' is used for the group name " \
+                                        "so must be letters, digits or underscore"),
+    'addr': (is_ipv4_net, "-bse.addr.{key} '{value}' is not a valid IPv4 network address"),
+    'username': (not_none, "-bse.users.username one of the usernames does not have a value"),
+    'password': (RE_PASSWORD.match, "-bse.users.password is probably not in encypted format as it is less that 25 characters long")
+}
+
+FBC_RULES = {
+    'network_size': (is_int, "-fbc.network_size.{key} '{value}' should be an integrer numerical value"),
+    'num_spine': (str_match(RE_NUM_SPINE), "-fbc.network_size.num_spine is '{value}', valid values are 1 to 4"),
+    'num_leaf': (str_match(RE_NUM_LEAF), "-fbc.network_size.num_leaf is '{value}', valid values are 2, 4, 6, 8 and 10"),
+    'num_border': (str_match(RE_NUM_BORDER), "-fbc.network_size.num_border is '{value}', valid values are 0, 2 and 4"),
+    'num_intf': (str_match(RE_NUM_INTF), "-fbc.num_intf.{key} '{value}' is not a valid, must be a digit, comma and 1 to 3 digits"),
+    'ospf_pro': (not_none, "-fbc.route.ospf.pro does not have a value, this needs to be a string or integrer"),
+    'ospf_area': (is_ipv4_intf, "-fbc.route.ospf.area '{value}' is not a valid dotted decimal area, valid values are 0.0.0.0 to 255.255.255.255"),
+    'as_num': (not_none, "-fbc.route.bgp.as_num does not have a value"),
+    'acast_gw_mac': (RE_MAC.match, "-fbc.acast_gw_mac '{value}' is not valid, can be [0-9], [a-f] or [A-F] in the format xxxx.xxxx.xxxx"),
+    'bse_intf': (is_int, "-fbc.adv.bse_intf.{key} '{value}' should be an integrer numerical value"),
+    'mlag_peer': (str_match(RE_MLAG_PEER), "-fbc.adv.bse_intf.{key} '{value}' should be numerical values in the format xxx-xxx"),
+    'dup_lp': (no_dup, "-fbc.adv.lp {value} is/are duplicated, all loopbacks should be unique"),
+    'mlag': (is_int, "-fbc.adv.mlag.{key} '{value}' should be an integrer numerical value"),
+    'peer_vlan': (str_match(RE_VLAN), "-fbc.adv.mlag.peer_vlan '{value}' is not a valid VLAN number, valid values are 0 to 4096"),
+    'addr_incre': (is_int, "-fbc.adv.addr_incre.{key} '{value}' should be an integrer numerical value"),
+    'dup_incr': (no_dup, "-fbc.adv.addr_incre {value} is/are duplicated, all address increments should be unique")
+}
+
+SVC_TNT_RULES = {
+    'tenant_name': (not_none, "-svc_tnt.tnt.tenant_name One of the tenants does not have a name"),
+    'l3_tenant': (is_bool, "-svc_tnt.tnt.l3_tenant '{tnt}' is not a boolean ({value}), must be True or False"),
+    'vlans': (not_none, "-svc_tnt.tnt.vlans '{tnt}' tenant has no VLANs, must be at least 1 VLAN to create the tenant"),
+    'vl_num': (is_int, "-svc_tnt.tnt.vlans.num '{value}' should be an integrer numerical value"),
+    'vl_name': (not_none, "-svc_tnt.tnt.vlans.name VLAN {num} does not have a name"),
+    'vl_opt': (is_bool, "-svc_tnt.tnt.vlans.{opt} in VLAN {num} is not a boolean ({value}), must be True or False"),
+    'ip_addr': (is_ipv4_intf, "-svc_tnt.tnt.vlans.ip_addr '{value}' is not a valid IPv4 Address/Netmask"),
+    'dup_vl_num': (no_dup, "-svc_tnt.tnt.vlans.num {value} are duplicated, all VLAN numbers should be unique"),
+    'dup_vl_name': (no_dup, "-svc_tnt.tnt.vlans.name {value} are duplicated, all VLAN names should be unique"),
+    'bse_vni': (is_int, "-adv.bse_vni.{opt} '{value}' should be an integrer numerical value"),
+    'rm_name': (RE_RM_NAME.search, "-adv.bgp.ipv4_redist_rm_name format '{value}' is not correct. It must contain 'vrf' and 'as' within its name")
+}
+
+SVC_INTF_RULES = {
+    'homed': (not_none, "-svc_intf.intf.{homed} should not be empty, if it is not used hash out '{homed}'"),
+    'intf_num': (is_int, "-svc_intf.intf.{homed}.intf_num '{value}' should be an integrer numerical value"),
+    'po_num': (is_int, "-svc_intf.intf.dual_homed.po_num '{value}' should be an integrer numerical value"),
+    'po_mode': (RE_PO_MODE.match, "-svc_intf.intf.dual_homed.po_mode '{value}' not a valid Port-Channel mode, options are active, passive or on"),
+    'odd_switch': (lambda switch: int(RE_DEV_NUM.match(switch).group(2)) % 2 != 0, "-svc_intf.intf.dual_homed.switch '{value}' should be an odd numbered MLAG switch"),
+    'ip': (is_ipv4_intf, "-svc_intf.intf.single_homed.ip_vlan {value} is not a valid IPv4 Address/Netmask"),
+    'vlan': (is_int, "-svc_intf.intf.{homed}.ip_vlan VLAN '{value}' should be an integrer numerical value"),
+    'trunk_space': (lambda vlans: RE_SPACE.search(str(vlans)) is None, "-svc_intf.intf.{homed}.ip_vlan '{value}' should not have any whitespaces in it"),
+    'adv': (is_int, "-svc_intf.adv.{homed}.{intf_pos} '{value}' should be an integrer numerical value"),
+    # Only error messages as the checks need values from the whole file
+    'switch': "-svc_intf.intf.{homed}.switch '{value}' is not a valid hostname within the inventory",
+    'dh_layer3': "-svc_intf.intf.dual_homed.type '{descr}' is a Layer3 dual-homed port, it must be single-homed",
+    'trunk_vlan': "-svc_intf.intf.{homed}.ip_vlan VLAN '{value}' should be an integrer numerical value",
+    'dup_trunk': "-svc_intf.intf.{homed}.ip_vlan trunk contains duplicate VLANs {vlans}",
+    'miss_vrf': "-svc_intf.intf.single_homed.tenant VRFs {vrf} are not on {dev_type} switches but are in {dev_type} interface configurations",
+    'miss_vl': "-svc_intf.intf.homed.ip_vlan VLANs {vlan} are not on {dev_type} switches but are in {dev_type} interface configurations",
+    'free_intf': "-svc_intf.intf.{intf_type} Are more defined interfaces ({used}) than free interfaces ({total}) in the {intf_type} reserved range on {switch}",
+    'max_intf': "-svc_intf.intf.homed Are more defined interfaces ({used}) than the maximum number of interfaces ({max_intf}) on {switch}"
+}
+
+IP_OVERLAP_RULES = {
+    'overlap': "-{inner_src} '{inner}' overlaps {outer_src} '{outer}' in VRF {vrf}",
+    'route': "-{inner_src} '{inner}' is within the connected subnet {outer_src} '{outer}' in VRF {vrf}"
+}
+
+
+
+############  Result cache so the same validation is only run once ############
+# The assert 'that' and 'fail_msg' both call the validator and the var files rarely change between playbook runs. Results are stored on disk
+# (INPUT_VALIDATE_CACHE) keyed on a hash of this file, the filter name and its arguments, so any change to the rules or inputs is a new entry.
+# Only the last CACHE_MAX results are kept. The file is re-read on a miss as each Ansible task runs in a different (forked) worker process
+CACHE_FILE = os.path.expanduser(os.environ.get('INPUT_VALIDATE_CACHE', '~/.ansible/tmp/input_validate_cache.json'))
+CACHE_MAX = 32
+with open(__file__, 'rb') as src_file:
+    SRC_HASH = hashlib.sha1(src_file.read()).hexdigest()
+result_cache = {}
+
+def load_cache():
+    try:
+        with open(CACHE_FILE, 'r') as file_content:
+            result_cache.update(json.load(file_content))
+    except (IOError, OSError, ValueError):
+        pass
+
+# Written to a temp file first so a half written cache is never read, if can't be written (read-only home) is just cached in this process
+def save_cache():
+    while len(result_cache) > CACHE_MAX:
+        del result_cache[next(iter(result_cache))]
+    try:
+        if not os.path.isdir(os.path.dirname(CACHE_FILE)):
+            os.makedirs(os.path.dirname(CACHE_FILE))
+        fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(CACHE_FILE))
+        with os.fdopen(fd, 'w') as file_content:
+            json.dump(result_cache, file_content)
+        os.replace(tmp_file, CACHE_FILE)
+    except (IOError, OSError):
+        pass
+
+# Dicts keep the order of the YAML file so keys dont need sorting, if the order changes it is just a cache miss
+def cache_key(name, args):
+    return hashlib.sha1(json.dumps([SRC_HASH, name, args], separators=(',', ':'), default=str).encode()).hexdigest()
+
+def memoise(name, validator):
+    def cached_validator(*args):
+        key = cache_key(name, args)
+        if key not in result_cache:
+            load_cache()
+        if key not in result_cache:
+            result_cache[key] = validator(*args)
+            save_cache()
+        return result_cache[key]
+    return cached_validator
+
+
+
+############  Runs the validators for all the var files at once ############
+# Each validator is run in its own python process (this file run as a script) so the time is that of the slowest file rather than all of them.
+# The arguments and results are passed as JSON (stdin/stdout) so nothing has to be pickled and the Ansible worker is never forked. Results already
+# in the cache are not re-run and new results are only added to the cache (and file) by this process. Runs one after the other if there is only
+# one CPU, and any validator whose process fails is re-run in this process so the error is raised as it normally would be
+VALIDATE_ALL = ['input_bse_validate', 'input_fbc_validate', 'input_svc_tnt_validate', 'input_svc_intf_validate', 'input_ip_overlap_validate']
+
+def run_validators(jobs):
+    validators = FilterModule().validators()
+    if len(jobs) == 1 or multiprocessing.cpu_count() == 1:
+        return [validators[name](*args) for name, args in jobs]
+    procs = []
+    for name, args in jobs:
+        with tempfile.TemporaryFile('w+') as job_file:
+            json.dump([name, args], job_file, default=str)
+            job_file.seek(0)
+            try:
+                procs.append(subprocess.Popen([sys.executable, os.path.abspath(__file__)], stdin=job_file, stdout=subprocess.PIPE,
+                                              stderr=subprocess.DEVNULL))
+            except OSError:
+                procs.append(None)
+    results = []
+    for (name, args), proc in zip(jobs, procs):
+        output = proc.communicate()[0] if proc is not None else None
+        if proc is not None and proc.returncode == 0:
+            results.append(json.loads(output.decode()))
+        else:
+            results.append(validators[name](*args))
+    return results
+
 class FilterModule(object):
     def filters(self):
+        filters = {name: memoise(name, validator) for name, validator in self.validators().items()}
+        filters['input_validate_all'] = self.validate_all
+        return filters
+
+    def validators(self):
         return {
             'input_bse_validate': self.base,
             'input_fbc_validate': self.fabric,
             'input_svc_tnt_validate': self.svc_tnt,
-            'input_svc_intf_validate': self.svc_intf
+            'input_svc_intf_validate': self.svc_intf,
+            'input_ip_overlap_validate': self.ip_overlap
         }
 
-
-
-############  Generic assert functions used by all classes to make it DRY ############
-    # REGEX search matches the specified pattern anywhere within the string
-    def assert_regex_search(self, errors, regex, input_string, error_message):
-        try:
-            assert re.search(regex, input_string), error_message
-        except AssertionError as e:
-            errors.append(str(e))
-    # REGEX match matches the specified pattern at the beginning of the string
-    def assert_regex_match(self, errors, regex, input_string, error_message):
-        try:
-            assert re.match(regex, input_string), error_message
-        except AssertionError as e:
-            errors.append(str(e))
-
-    # =! asserts that the variable does not match the specified value
-    def assert_not_equal(self, errors, variable, input_value, error_message):
-        try:
-            assert variable != input_value, error_message
-        except AssertionError as e:
-            errors.append(str(e))
-    # == asserts that the variable does match the specified value
-    def assert_equal(self, errors, variable, input_value, error_message):
-        try:
-            assert variable == input_value, error_message
-        except AssertionError as e:
-            errors.append(str(e))
-    # <= asserts that the variable is equal to or less than the specified value
-    def assert_equal_less(self, errors, variable, input_value, error_message):
-        try:
-            assert variable <= input_value, error_message
-        except AssertionError as e:
-            errors.append(str(e))
-    # IN asserts that the variable is within the specified value
-    def assert_in(self, errors, variable, input_value, error_message):
-        try:
-            assert variable in input_value, error_message
-        except AssertionError as e:
-            errors.append(str(e))
-
-    # INTEGRER: Asserts that the variable is an integrer (number)
-    def assert_integrer(self, errors, variable, error_message):
-        try:
-            assert isinstance(variable, int), error_message
-        except AssertionError as e:
-            errors.append(str(e))
-    # BOOLEAN: Asserts that the variable is Ture or False
-    def assert_boolean(self, errors, variable, error_message):
-        try:
-            assert isinstance(variable, bool), error_message
-        except AssertionError as e:
-            errors.append(str(e))
-    # IPv4: Asserts that the IPv4 Address or interface address are in the correct format
-    def assert_ipv4(self, errors, variable, error_message):
-        try:
-            ipaddress.IPv4Interface(variable)
-        except ipaddress.AddressValueError:
-            errors.append(error_message)
-        except ipaddress.NetmaskValueError:
-            errors.append(error_message)
-
-    # INTF: Asserts whether is enough free interfaces to accommodate all the defined interfaces
+    # INTF: Checks whether is enough free interfaces (range plus any static interfaces outside of it) to accommodate all the defined interfaces
     def check_used_intfs(self, errors, intf_type, per_dev_used_intf, intf_range):
         for switch, intf in per_dev_used_intf.items():
-            used_intf = len(intf)
-            aval_intf = []
-            for x in intf:                      # Gets only the statically defined interface numbers
-                if x != 'dummy':
-                    aval_intf.append(x)
-            aval_intf.extend(intf_range)           # Adds range of intfs to static intfs
-            total_intf = len(set(aval_intf))    # Removes duplicate intfs to find how many avaiable interfaces from range
-            self.assert_equal_less(errors, used_intf, total_intf, "-svc_intf.intf.{} Are more defined interfaces ({}) than free interfaces ({})" \
-                                   " in the {} reserved range on {}".format(intf_type, used_intf, total_intf, intf_type, switch))
+            total_intf = len(intf_range.union(x for x in intf if x != 'dummy'))
+            if len(intf) > total_intf:
+                errors.append(SVC_INTF_RULES['free_intf'].format(intf_type=intf_type, used=len(intf), total=total_intf, switch=switch))
 
 ############  Validate formatting of variables within the base.yml file ############
     def base(self, device_name, addr, users):
@@ -145,24 +455,14 @@ class FilterModule(object):
 
         # DEVICE_NAME (bse.device_name): Ensures that the device names used match the correct format as is used to create group names
         for dvc, name in device_name.items():
-            self.assert_regex_search(base_errors, '-[a-zA-Z0-9_]+$', name, "-bse.device_name.{} '{}' is not in the correct format. Anything after " \
-                           "the last '-' is used for the group name so must be letters, digits or underscore".format(dvc, name))
-
+            check(base_errors, BSE_RULES['device_name'], name, key=dvc)
         # ADDR (bse.addr): Ensures that the network addresses entered are valid networks (or IP for loopback) with the correct subnet mask
         for name, address in addr.items():
-            try:
-                ipaddress.IPv4Network(address)
-            except ipaddress.AddressValueError:
-                base_errors.append("-bse.addr.{} '{}' is not a valid IPv4 network address".format(name, address))
-            except ipaddress.NetmaskValueError:
-                base_errors.append("-bse.addr.{} '{}' is not a valid IPv4 network address".format(name, address))
-            except ValueError:
-                base_errors.append("-bse.addr.{} '{}' is not a valid IPv4 network address".format(name, address))
-
+            check(base_errors, BSE_RULES['addr'], address, key=name)
         # USERS (bse.users): Ensures that username is present and the password at least 25 characters to make sure is encrypted (not 100% this is correct, may need to disable)
         for user in users:
-            self.assert_not_equal(base_errors, user['username'], None, "-bse.users.username one of the usernames does not have a value")
-            self.assert_regex_match(base_errors, '^.{25,}$', user['password'], "-bse.users.password is probably not in encypted format as it is less that 25 characters long")
+            check(base_errors, BSE_RULES['username'], user['username'])
+            check(base_errors, BSE_RULES['password'], user['password'])
 
         if len(base_errors) == 1:
             return "'base.yml unittest pass'"             # For some reason ansible assert needs the inside quotes
@@ -175,73 +475,38 @@ class FilterModule(object):
 
         # NETWORK_SIZE (fbc.network_size): Ensures they are integers and the number of each type of device is within the limits and constraints
         for dev_type, net_size in network_size.items():
-            self.assert_integrer(fabric_errors, net_size, "-fbc.network_size.{} '{}' should be an integrer numerical value".format(dev_type, net_size))
-        self.assert_regex_match(fabric_errors, '[1-4]', str(network_size['num_spine']),
-                                "-fbc.network_size.num_spine is '{}', valid values are 1 to 4".format(network_size['num_spine']))
-        self.assert_regex_match(fabric_errors, '^([2468]|10)$', str(network_size['num_leaf']),
-                                "-fbc.network_size.num_leaf is '{}', valid values are 2, 4, 6, 8 and 10".format(network_size['num_leaf']))
-        self.assert_regex_match(fabric_errors, '^[024]$', str(network_size['num_border']),
-                                "-fbc.network_size.num_border is '{}', valid values are 0, 2 and 4".format(network_size['num_border']))
-
+            check(fabric_errors, FBC_RULES['network_size'], net_size, key=dev_type)
+        for dev_type in ['num_spine', 'num_leaf', 'num_border']:
+            check(fabric_errors, FBC_RULES[dev_type], network_size[dev_type])
         # NUMBER_INTERFACES (fbc.num_intf): Ensures is one number, then a comma and then upto 3 numbers
         for dev_type, intf in num_intf.items():
-            self.assert_regex_match(fabric_errors, r'^\d,\d{1,3}$', str(intf),
-                                    "-fbc.num_intf.{} '{}' is not a valid, must be a digit, comma and 1 to 3 digits".format(dev_type, intf))
-
+            check(fabric_errors, FBC_RULES['num_intf'], intf, key=dev_type)
         # OSPF (fbc.ospf): Ensures that the OSPF process is present and area in dotted decimal format
-        self.assert_not_equal(fabric_errors, route['ospf']['pro'], None, "-fbc.route.ospf.pro does not have a value, this needs to be a string or integrer")
-        self.assert_ipv4(fabric_errors, route['ospf']['area'],
-                         "-fbc.route.ospf.area '{}' is not a valid dotted decimal area, valid values are 0.0.0.0 to 255.255.255.255".format(route['ospf']['area']))
-
+        check(fabric_errors, FBC_RULES['ospf_pro'], route['ospf']['pro'])
+        check(fabric_errors, FBC_RULES['ospf_area'], route['ospf']['area'])
         # BGP (fbc.bgp.as_num): Ensures that the AS is present, cant make more specific incase is 2-byte or 4-byte ASNs
-        self.assert_not_equal(fabric_errors, route['bgp']['as_num'], None, "-fbc.route.bgp.as_num does not have a value")
-
+        check(fabric_errors, FBC_RULES['as_num'], route['bgp']['as_num'])
         # ACAST_GW_MAC (fbc.acast_gw_mac): Ensures the anycast virtual MAC is a valid mac address
-        self.assert_regex_match(fabric_errors, r'([0-9A-Fa-f]{4}\.){2}[0-9A-Fa-f]{4}', acast_gw_mac,
-                                "-fbc.acast_gw_mac '{}' is not valid, can be [0-9], [a-f] or [A-F] in the format xxxx.xxxx.xxxx".format(acast_gw_mac))
+        check(fabric_errors, FBC_RULES['acast_gw_mac'], acast_gw_mac)
 
         # BSE_INTF (fbc.adv.bse_intf): Ensures that the interface numbers are integrars
         for name, intf in bse_intf.items():
             if '_to_' in name:
-                self.assert_integrer(fabric_errors, intf, "-fbc.adv.bse_intf.{} '{}' should be an integrer numerical value".format(name, intf))
+                check(fabric_errors, FBC_RULES['bse_intf'], intf, key=name)
             elif 'mlag_peer' == name:
-                self.assert_regex_match(fabric_errors, '^[0-9]{1,3}-[0-9]{1,3}$', str(intf),
-                                        "-fbc.adv.bse_intf.{} '{}' should be numerical values in the format xxx-xxx".format(name, intf))
-
+                check(fabric_errors, FBC_RULES['mlag_peer'], intf, key=name)
         # LP (fbc.adv.lp): Ensures all the loopback names are unique, no duplicates
-        dup_lp = []
-        uniq_lp = {}
-        for lp_type in lp.values():
-            loopback = list(lp_type.keys())[0]
-            if loopback not in uniq_lp:
-                uniq_lp[loopback] = 1
-            else:
-                if uniq_lp[loopback] == 1:
-                    dup_lp.append(loopback)
-                uniq_lp[loopback] += 1
-        self.assert_equal(fabric_errors, len(dup_lp), 0, "-fbc.adv.lp {} is/are duplicated, all loopbacks should be unique".format(dup_lp))
+        check(fabric_errors, FBC_RULES['dup_lp'], duplicates(list(lp_type.keys())[0] for lp_type in lp.values()))
 
         # MLAG (fbc.adv.mlag): Ensures all of MLAG paraemters are integers and VLANs within limit
         for mlag_attr, value in mlag.items():
-            self.assert_integrer(fabric_errors, value, "-fbc.adv.mlag.{} '{}' should be an integrer numerical value".format(mlag_attr, value))
-        self.assert_regex_match(fabric_errors, r'^(?:(?:[1-9]\d{0,2}|[1-3]\d{3}|40[0-8]\d|409[0-6]),)*?(?:(?:[1-9]\d{0,2}|[1-3]\d{3}|40[0-8]\d|409[0-6]))$',
-                                  str(mlag['peer_vlan']), "-fbc.adv.mlag.peer_vlan '{}' is not a valid VLAN number, valid values are 0 to 4096".format(mlag['peer_vlan']))
+            check(fabric_errors, FBC_RULES['mlag'], value, key=mlag_attr)
+        check(fabric_errors, FBC_RULES['peer_vlan'], mlag['peer_vlan'])
 
         # ADDR_INCRE (fbc.adv.addr_incre): Ensures all of the IP address increment values used are integers and except for mlag peering are all unique
         for incr_type, incr in addr_incre.items():
-            self.assert_integrer(fabric_errors, incr, "-fbc.adv.addr_incre.{} '{}' should be an integrer numerical value".format(incr_type, incr))
-
-        dup_incr = []
-        uniq_incr = {}
-        for incr_type, incr in addr_incre.items():
-            if not incr_type.startswith('mlag'):
-                if incr not in uniq_incr:
-                    uniq_incr[incr] = 1
-                else:
-                    if uniq_incr[incr] == 1:
-                        dup_incr.append(incr)
-                    uniq_incr[incr] += 1
-        self.assert_equal(fabric_errors, len(dup_incr), 0, "-fbc.adv.addr_incre {} is/are duplicated, all address increments should be unique".format(dup_incr))
+            check(fabric_errors, FBC_RULES['addr_incre'], incr, key=incr_type)
+        check(fabric_errors, FBC_RULES['dup_incr'], duplicates(incr for incr_type, incr in addr_incre.items() if not incr_type.startswith('mlag')))
 
         # The value returned to Ansible Assert module to determine whether failed or not
         if len(fabric_errors) == 1:
@@ -252,74 +517,46 @@ class FilterModule(object):
 
 ############ Validate formatting of variables within the service_tenant.yml file ############
     def svc_tnt(self, svc_tnt, adv):
-        # Used by duplicate VLAN check
-        all_vl_num, all_vl_name, dup_vl_num, dup_vl_name = ([] for i in range(4))
-        uniq_vl_num, uniq_vl_name = ({} for i in range(2))
+        all_vl_num, all_vl_name = ([] for i in range(2))        # Used by duplicate VLAN check
         svc_tnt_errors = ['Check the contents of services_tenant.yml for the following issues:']
 
         for tnt in svc_tnt:
             # TENANT_NAME (svc_tnt.tnt.tenant_name): Ensures all tenants have a name, are no restictions of what is in it
-            self.assert_not_equal(svc_tnt_errors, tnt['tenant_name'], None, "-svc_tnt.tnt.tenant_name One of the tenants does not have a name")
-
+            check(svc_tnt_errors, SVC_TNT_RULES['tenant_name'], tnt['tenant_name'])
             # L3_TENANT (svc_tnt.tnt.l3_tenant): Ensures answer is boolean
-            self.assert_boolean(svc_tnt_errors, tnt['l3_tenant'],
-                                "-svc_tnt.tnt.l3_tenant '{}' is not a boolean ({}), must be True or False".format(tnt['tenant_name'], tnt['l3_tenant']))
-
+            check(svc_tnt_errors, SVC_TNT_RULES['l3_tenant'], tnt['l3_tenant'], tnt=tnt['tenant_name'])
             # VLAN (svc_tnt.tnt.vlans): Ensures vlans are defined, must be at least one
-            try:
-                assert tnt['vlans'] != None, "-svc_tnt.tnt.vlans '{}' tenant has no VLANs, must be at least 1 VLAN to create the tenant".format(tnt['tenant_name'])
-            except AssertionError as e:
-                svc_tnt_errors.append(str(e))
+            if tnt['vlans'] == None:
+                check(svc_tnt_errors, SVC_TNT_RULES['vlans'], tnt['vlans'], tnt=tnt['tenant_name'])
                 return svc_tnt_errors       # Has to exit if this errors as other tests wont run due to it being unbale to loop through the vlans
 
             for vl in tnt['vlans']:
                 all_vl_num.append(vl['num'])
                 all_vl_name.append(vl['name'])
                 # VLAN_NUMBER (svc_tnt.tnt.vlans.num): Ensures all VLANs are numbers
-                self.assert_integrer(svc_tnt_errors, vl['num'], "-svc_tnt.tnt.vlans.num '{}' should be an integrer numerical value".format(vl['num']))
-
+                check(svc_tnt_errors, SVC_TNT_RULES['vl_num'], vl['num'])
                 # VLAN_NAME (svc_tnt.tnt.vlans.name): Ensures all VLANs have a name, are no restrictions of what it is
-                self.assert_not_equal(svc_tnt_errors, vl['name'], None, "-svc_tnt.tnt.vlans.name VLAN {} does not have a name".format(vl['num']))
-
-                # Create dummy default values if these settings arent set in the variable file
-                vl.setdefault('create_on_border', False)
-                vl.setdefault('create_on_leaf', True)
-                vl.setdefault('ipv4_bgp_redist', True)
-                vl.setdefault('ip_addr', '169.254.255.254/16')
+                check(svc_tnt_errors, SVC_TNT_RULES['vl_name'], vl['name'], num=vl['num'])
 
+                # Settings that arent in the variable file are not checked (the defaults are valid). The VLANs are not changed as the other
+                # validators (that can be run at the same time by validate_all) use the same tenants
                 # CREATE_ON_BDR, CREATE_ON_LEAF, REDIST (svc_tnt.tnt.vlans): Ensures answer is boolean
                 for opt in ['create_on_border', 'create_on_leaf', 'ipv4_bgp_redist']:
-                    self.assert_boolean(svc_tnt_errors, vl[opt], "-svc_tnt.tnt.vlans.{} in VLAN {} is not a boolean ({}), must be True or False".format(opt, vl['num'], vl[opt]))
-
+                    if opt in vl:
+                        check(svc_tnt_errors, SVC_TNT_RULES['vl_opt'], vl[opt], opt=opt, num=vl['num'])
                 # IP_ADDR (svc_tnt.tnt.vlans.ip_addr): Ensures that the IP address is of the correct format
-                self.assert_ipv4(svc_tnt_errors, vl['ip_addr'], "-svc_tnt.tnt.vlans.ip_addr '{}' is not a valid IPv4 Address/Netmask".format(vl['ip_addr']))
+                if 'ip_addr' in vl:
+                    check(svc_tnt_errors, SVC_TNT_RULES['ip_addr'], vl['ip_addr'])
 
         # DUPLICATE VLAN NUM/NAME (svc_tnt.tnt.vlans.num/name): Ensures all VLAN numbers and names are unique, no duplicates accross all tenants
-        for vl_num, vl_name in zip(all_vl_num, all_vl_name):
-            # Generates a list of duplicate VLAN numbers
-            if vl_num not in uniq_vl_num:
-                uniq_vl_num[vl_num] = 1
-            elif vl_num in uniq_vl_num:
-                if uniq_vl_num[vl_num] == 1:
-                    dup_vl_num.append(vl_num)
-                uniq_vl_num[vl_num] += 1
-             # Generates a list of duplicate VLAN names
-            if vl_name not in uniq_vl_name:
-                uniq_vl_name[vl_name] = 1
-            elif vl_name in uniq_vl_name:
-                if uniq_vl_name[vl_name] == 1:
-                    dup_vl_name.append(vl_name)
-                uniq_vl_name[vl_name] += 1
-        self.assert_equal(svc_tnt_errors, len(dup_vl_num), 0, "-svc_tnt.tnt.vlans.num {} are duplicated, all VLAN numbers should be unique".format(dup_vl_num))
-        self.assert_equal(svc_tnt_errors, len(dup_vl_name), 0, "-svc_tnt.tnt.vlans.name {} are duplicated, all VLAN names should be unique".format(dup_vl_name))
+        check(svc_tnt_errors, SVC_TNT_RULES['dup_vl_num'], duplicates(all_vl_num))
+        check(svc_tnt_errors, SVC_TNT_RULES['dup_vl_name'], duplicates(all_vl_name))
 
         # BASE_VNI (svc_tnt.adv.bse_vni): Ensures all values are integers
         for opt in ['tnt_vlan', 'l3vni', 'l2vni']:
-            self.assert_integrer(svc_tnt_errors, adv['bse_vni'][opt], "-adv.bse_vni.{} '{}' should be an integrer numerical value".format(opt, adv['bse_vni'][opt]))
-
+            check(svc_tnt_errors, SVC_TNT_RULES['bse_vni'], adv['bse_vni'][opt], opt=opt)
         # RM_NAME (svc_tnt.adv.bgp.ipv4_redist_rm_name): Ensures that it contains both 'vrf' and 'as'
-        self.assert_regex_search(svc_tnt_errors, r'vrf\S*as|as\S*vrf', adv['bgp']['ipv4_redist_rm_name'],
-                                 "-adv.bgp.ipv4_redist_rm_name format '{}' is not correct. It must contain 'vrf' and 'as' within its name".format(adv['bgp']['ipv4_redist_rm_name']))
+        check(svc_tnt_errors, SVC_TNT_RULES['rm_name'], adv['bgp']['ipv4_redist_rm_name'])
 
         # The value returned to Ansible Assert module to determine whether failed or not
         if len(svc_tnt_errors) == 1:
@@ -330,157 +567,139 @@ class FilterModule(object):
 
 ############ Validate formatting of variables within the service_interface.yml file ############
     def svc_intf(self, svc_intf, adv, network_size, tenants, dev_name, num_intf):
-        sh_per_dev_intf, dh_per_dev_intf, per_dev_po, per_dev_intf = (defaultdict(list) for i in range(4))
-        svcintf_vrf_on_lf, svcintf_vl_on_lf, svcintf_vrf_on_bdr, svcintf_vl_on_bdr = ([] for i in range(4))
-        svctnt_vrf_on_lf, svctnt_vl_on_lf, svctnt_vrf_on_bdr, svctnt_vl_on_bdr = ([] for i in range(4))
-        sh_intf, dh_intf, po_intf, all_devices = ([] for i in range(4))
+        sh_per_dev_intf, dh_per_dev_intf, per_dev_po = (defaultdict(list) for i in range(3))
+        svcintf_vrf, svctnt_vrf = ({'leaf': set(), 'border': set()} for i in range(2))
+        svcintf_vl, svctnt_vl = ({'leaf': [], 'border': []} for i in range(2))       # VLAN ranges, made into a VlanSet once all are got
+        sh_intf, dh_intf, po_intf = (set() for i in range(3))
         svc_intf_errors = ['Check the contents of services_interface.yml for the following issues:']
 
-        # Creates a list of all possible devices based on fabric size
+        # Creates a set of all possible devices based on fabric size
+        all_devices = set()
         for dev_type in ['spine', 'leaf', 'border']:
             for dev_id in range(1, network_size['num_' + dev_type ] + 1):
-                all_devices.append(dev_name[dev_type] + str("%02d" % dev_id))
+                all_devices.add(dev_name[dev_type] + str("%02d" % dev_id))
 
-        # Creates lists what VRFs and VLANs are on leafs and borders switches (got from services.tenant.yml)
+        # Creates sets of what VRFs and VLANs are on leafs and borders switches (got from services.tenant.yml). VLANs that are not integers are
+        # reported by the svc_tnt checks and could never match an interface VLAN so are not added. Empty VLANs are also reported by svc_tnt (validate_all
+        # runs it at the same time as this) so are skipped
         for tnt in tenants:
-            for vl in tnt['vlans']:
+            for vl in tnt.get('vlans') or []:
                 if vl.get('create_on_leaf') != False:
-                    svctnt_vrf_on_lf.extend([tnt['tenant_name']])
-                    svctnt_vl_on_lf.extend([vl['num']])
+                    svctnt_vrf['leaf'].add(tnt['tenant_name'])
+                    if is_int(vl['num']):
+                        svctnt_vl['leaf'].append((vl['num'], vl['num']))
                 if vl.get('create_on_border') == True:
-                    svctnt_vrf_on_bdr.extend([tnt['tenant_name']])
-                    svctnt_vl_on_bdr.extend([vl['num']])
-        # Creates lists of what VRFs and VLANs are to be created on leafs and borders switches (got from services_interface.yml
-        def svcinft_vrf(switch, info):
-            if dev_name['leaf'] in switch:
-                svcintf_vrf_on_lf.append(info)
-            elif dev_name['border'] in switch:
-                svcintf_vrf_on_bdr.append(info)
-        def svcinft_vlan(switch, info):
-            if dev_name['leaf'] in switch:
-                svcintf_vl_on_lf.append(info)
-            elif dev_name['border'] in switch:
-                svcintf_vl_on_bdr.append(info)
+                    svctnt_vrf['border'].add(tnt['tenant_name'])
+                    if is_int(vl['num']):
+                        svctnt_vl['border'].append((vl['num'], vl['num']))
 
         for homed, interfaces in svc_intf.items():
             # HOMED (svc_intf.intf.homed): Ensures that single-homed or dual-homed dictionaries are not empty
-            try:
-                assert interfaces != None, "-svc_intf.intf.{0} should not be empty, if it is not used hash out '{0}'".format(homed)
-            except AssertionError as e:
-                svc_intf_errors.append(str(e))
+            if interfaces == None:
+                check(svc_intf_errors, SVC_INTF_RULES['homed'], interfaces, homed=homed)
                 return svc_intf_errors      # Has to exit script here as None type breaks rest of tests as it cant loop none
 
             for intf in interfaces:
+                # Switches can be a list or a single switch. Leaf or border switch types are used to record the VRFs and VLANs the interfaces need on each switch type
+                switches = [intf['switch']] if isinstance(intf['switch'], str) else intf['switch'] or []
+                dev_types = {'leaf' if dev_name['leaf'] in switch else 'border' if dev_name['border'] in switch else None for switch in switches} - {None}
+
                 # INTF_NUM (svc_intf.intf.homed.intf_num): Ensures that intf_num is integrar (also added to a new list to check interface assignment)
                 if intf.get('intf_num') != None:
-                    self.assert_integrer(svc_intf_errors, intf['intf_num'], "-svc_intf.intf.{}.intf_num '{}' should be an integrer numerical value".format(homed, intf['intf_num']))
+                    check(svc_intf_errors, SVC_INTF_RULES['intf_num'], intf['intf_num'], homed=homed)
                 # PO_NUM (svc_intf.intf.dual_homed.po_num): Ensures that po_num is integrar (also added to a new list to check interface assignment)
                 if intf.get('po_num') != None:
-                    self.assert_integrer(svc_intf_errors, intf['po_num'], "-svc_intf.intf.dual_homed.po_num '{}' should be an integrer numerical value".format(intf['po_num']))
-
+                    check(svc_intf_errors, SVC_INTF_RULES['po_num'], intf['po_num'])
                 # PO_MODE (svc_intf.intf.dual_homed.po_mode): Ensures that po_mode is on, active or passive
                 if intf.get('po_mode') != None:
                     if intf.get('po_mode') == True:     # Needed as 'on' in yaml is converted to True
                         intf['po_mode'] = 'on'
-                    self.assert_regex_match(svc_intf_errors, '^(active|passive|on)$', intf['po_mode'],
-                                            "-svc_intf.intf.dual_homed.po_mode '{}' not a valid Port-Channel mode, options are active, passive or on".format(intf['po_mode']))
+                    check(svc_intf_errors, SVC_INTF_RULES['po_mode'], intf['po_mode'])
 
                 #  SWITCH_NAME (svc_intf.intf.homed.switch): Ensures that it is a valid hostname within the inventory and if dual-homed the hostname is odd numbered
-                self.assert_in(svc_intf_errors, intf['switch'], all_devices, "-svc_intf.intf.{}.switch '{}' is not a valid hostname within the inventory".format(homed, intf['switch']))
+                for switch in switches:
+                    if switch not in all_devices:
+                        svc_intf_errors.append(SVC_INTF_RULES['switch'].format(homed=homed, value=switch))
+                    elif homed == 'dual_homed':
+                        check(svc_intf_errors, SVC_INTF_RULES['odd_switch'], switch)
                 if homed == 'dual_homed':
-                    self.assert_not_equal(svc_intf_errors, int(intf['switch'][-2:]) % 2, 0,
-                                          "-svc_intf.intf.dual_homed.switch '{}' should be an odd numbered MLAG switch".format(intf['switch']))
                     # HOMED_TYPE (svc_intf.intf.dual_homed.type): Ensures that it is not a Layer3 port, can only have single-homed Layer 3 ports
-                    self.assert_not_equal(svc_intf_errors, intf['type'], 'layer3',
-                                          "-svc_intf.intf.dual_homed.type '{}' is a Layer3 dual-homed port, it must be single-homed".format(intf['descr']))
+                    if intf['type'] == 'layer3':
+                        svc_intf_errors.append(SVC_INTF_RULES['dh_layer3'].format(descr=intf['descr']))
 
                 # IP (svc_intf.intf.single_homed.ip_vlan): Ensures that the the IP address is in a valid IPv4 format
                 if intf['type'] == 'layer3':
-                    self.assert_ipv4(svc_intf_errors, intf['ip_vlan'], "-svc_intf.intf.single_homed.ip_vlan {} is not a valid IPv4 Address/Netmask".format(intf['ip_vlan']))
-                    svcinft_vrf(intf['switch'], intf.get('tenant'))
+                    check(svc_intf_errors, SVC_INTF_RULES['ip'], intf['ip_vlan'])
+                    for dev_type in dev_types:
+                        svcintf_vrf[dev_type].add(intf.get('tenant'))
 
                 # ACCESS_VLAN (svc_intf.intf.homed.ip_vlan): Ensures all VLANs are integrers (numbers)
                 elif intf['type'] == 'access':
-                    self.assert_integrer(svc_intf_errors, intf['ip_vlan'], "-svc_intf.intf.{}.ip_vlan VLAN '{}' should be an integrer numerical value".format(homed, intf['ip_vlan']))
-                    svcinft_vlan(intf['switch'], intf.get('ip_vlan'))
+                    check(svc_intf_errors, SVC_INTF_RULES['vlan'], intf['ip_vlan'], homed=homed)
+                    for dev_type in dev_types if is_int(intf['ip_vlan']) else []:
+                        svcintf_vl[dev_type].append((intf['ip_vlan'], intf['ip_vlan']))
 
                 # TRUNK_VLAN (svc_intf.intf.homed.ip_vlan): Ensures that there are no whitespaces
                 else:
-                    self.assert_equal(svc_intf_errors, re.search(r'\s', str(intf['ip_vlan'])), None, "-svc_intf.intf.{}.ip_vlan '{}' should not have any whitespaces in it".format(homed, intf['ip_vlan']))
+                    check(svc_intf_errors, SVC_INTF_RULES['trunk_space'], intf['ip_vlan'], homed=homed)
 
                     if ',' in str(intf['ip_vlan']):
-                        list_intf_vlans = []
+                        trunk_ranges = []
                         for vlan in str(intf['ip_vlan']).split(','):
-                            # Ensures that each single VLAN (not ranges) is an integer before getting list of all vlans to check for duplicates
-                            if '-' not in vlan:
-                                try:
-                                    int(vlan)
-                                    svcinft_vlan(intf['switch'], int(vlan))
-                                    list_intf_vlans.append(int(vlan))
-                                except:
-                                    svc_intf_errors.append("-svc_intf.intf.{}.ip_vlan VLAN '{}' should be an integrer numerical value".format(homed, vlan))
-                            # Check first and last VLAN in range are integers before getting list of all vlans to check for duplicates
-                            if '-' in vlan:
-                                try:
-                                    int(vlan.split('-')[0])
-                                    int(vlan.split('-')[1])
-                                    for vl in range(int(vlan.split('-')[0]), int(vlan.split('-')[1]) +1):
-                                        svcinft_vlan(intf['switch'], int(vl))
-                                        list_intf_vlans.append(vl)
-                                except:
-                                    svc_intf_errors.append("-svc_intf.intf.{}.ip_vlan VLAN '{}' should be an integrer numerical value".format(homed, vlan))
-                        # DUPLICATE VLANS: Ensures that are no duplicate VLANs in the allowed trunk vlan list
-                        self.assert_equal(svc_intf_errors, len(set(list_intf_vlans)), len(list_intf_vlans), "-svc_intf.intf.{}.ip_vlan trunk contains duplicate VLANs {}".format(homed, list_intf_vlans))
+                            # Ensures each single VLAN or first and last VLAN in a range are integers, the ranges are not expanded into VLANs
+                            vl_range = vlan.split('-') if '-' in vlan else [vlan, vlan]
+                            if RE_INT.fullmatch(vl_range[0]) and RE_INT.fullmatch(vl_range[1]):
+                                trunk_ranges.append((int(vl_range[0]), int(vl_range[1])))
+                            else:
+                                svc_intf_errors.append(SVC_INTF_RULES['trunk_vlan'].format(homed=homed, value=vlan))
+                        trunk_vlans = VlanSet(trunk_ranges)
+                        for dev_type in dev_types:
+                            svcintf_vl[dev_type].extend(trunk_vlans.ranges)
+                        # DUPLICATE VLANS: Ensures that are no duplicate VLANs (or overlapping ranges) in the allowed trunk vlan list
+                        if len(trunk_vlans.dup) != 0:
+                            svc_intf_errors.append(SVC_INTF_RULES['dup_trunk'].format(homed=homed, vlans=VlanSet(trunk_vlans.dup)))
                     # Ensures single VLANs are integers
                     else:
-                        self.assert_integrer(svc_intf_errors, intf['ip_vlan'], "-svc_intf.intf.{}.ip_vlan VLAN '{}' should be an integrer numerical value".format(homed, intf['ip_vlan']))
-                        svcinft_vlan(intf['switch'], intf.get('ip_vlan'))
-
-                # Gets number of Interfaces per device and any static interface/PO given
-                if homed == 'single_homed':
-                    sh_per_dev_intf[intf['switch']].append(intf.get('intf_num', 'dummy'))
-                elif homed == 'dual_homed':
-                    switch_pair = intf['switch'][:-2]+ "{:02d}".format(int(intf['switch'][-2:]) +1)
-                    dh_per_dev_intf[intf['switch']].append(intf.get('intf_num', 'dummy'))
-                    dh_per_dev_intf[switch_pair].append(intf.get('intf_num', 'dummy'))
-                    per_dev_po[intf['switch']].append(intf.get('po_num', 'dummy'))
-                    per_dev_po[switch_pair].append(intf.get('po_num', 'dummy'))
-
-        # VRF/VLAN: Ensures that the VRF or VLAN of the interfaces being configured on are on the switches they are being configured on
-        miss_vrf_on_lf = set(svcintf_vrf_on_lf) - set(svctnt_vrf_on_lf)
-        miss_vrf_on_bdr = set(svcintf_vrf_on_bdr) - set(svctnt_vrf_on_bdr)
-        miss_vl_on_lf = set(svcintf_vl_on_lf) - set(svctnt_vl_on_lf)
-        miss_vl_on_bdr = set(svcintf_vl_on_bdr) - set(svctnt_vl_on_bdr)
+                        check(svc_intf_errors, SVC_INTF_RULES['vlan'], intf['ip_vlan'], homed=homed)
+                        for dev_type in dev_types if is_int(intf['ip_vlan']) else []:
+                            svcintf_vl[dev_type].append((intf['ip_vlan'], intf['ip_vlan']))
+
+                # Gets number of Interfaces per device and any static interface/PO given. The MLAG pair is only got for valid switches (others are already errors)
+                for switch in switches:
+                    if homed == 'single_homed':
+                        sh_per_dev_intf[switch].append(intf.get('intf_num', 'dummy'))
+                    elif homed == 'dual_homed' and switch in all_devices:
+                        switch_name, switch_num = RE_DEV_NUM.match(switch).groups()
+                        switch_pair = switch_name + "{:02d}".format(int(switch_num) +1)
+                        dh_per_dev_intf[switch].append(intf.get('intf_num', 'dummy'))
+                        dh_per_dev_intf[switch_pair].append(intf.get('intf_num', 'dummy'))
+                        per_dev_po[switch].append(intf.get('po_num', 'dummy'))
+                        per_dev_po[switch_pair].append(intf.get('po_num', 'dummy'))
 
         # VRF_ON_SWITCH (svc_intf.intf.single_homed.tenant): Ensures that the VRF exists on the switch that an interface in that VRF is being configured
-        self.assert_equal(svc_intf_errors, len(miss_vrf_on_lf), 0,
-                        "-svc_intf.intf.single_homed.tenant VRFs {} are not on leaf switches but are in leaf interface configurations".format(list(miss_vrf_on_lf)))
-        self.assert_equal(svc_intf_errors, len(miss_vrf_on_bdr), 0,
-                        "-svc_intf.intf.single_homed.tenant VRFs {} are not on border switches but are in border interface configurations".format(list(miss_vrf_on_bdr)))
-        # VRF_ON_SWITCH (svc_intf.intf.homed.ip_vlan): Ensures that the VLAN exists on the switch that an interface using that VLAN is being configured
-        self.assert_equal(svc_intf_errors, len(miss_vl_on_lf), 0,
-                        "-svc_intf.intf.homed.ip_vlan VLANs {} are not on leaf switches but are in leaf interface configurations".format(list(miss_vl_on_lf)))
-        self.assert_equal(svc_intf_errors, len(miss_vl_on_bdr), 0,
-                        "-svc_intf.intf.homed.ip_vlan VLANs {} are not on border switches but are in border interface configurations".format(list(miss_vl_on_bdr)))
+        for dev_type in ['leaf', 'border']:
+            miss_vrf = svcintf_vrf[dev_type] - svctnt_vrf[dev_type]
+            if len(miss_vrf) != 0:
+                svc_intf_errors.append(SVC_INTF_RULES['miss_vrf'].format(vrf=list(miss_vrf), dev_type=dev_type))
+        # VLAN_ON_SWITCH (svc_intf.intf.homed.ip_vlan): Ensures that the VLAN exists on the switch that an interface using that VLAN is being configured
+        for dev_type in ['leaf', 'border']:
+            miss_vl = VlanSet(svcintf_vl[dev_type]) - VlanSet(svctnt_vl[dev_type])
+            if len(miss_vl.ranges) != 0:
+                svc_intf_errors.append(SVC_INTF_RULES['miss_vl'].format(vlan=miss_vl, dev_type=dev_type))
 
         for homed, intf in adv.items():
             # INTF_RANGE (svc_intf.adv.homed.first/last): Ensures that the reserved interface and Port-Channel ranges are integrers
             for intf_pos, num in intf.items():
-                try:
-                    assert isinstance(num, int), "-svc_intf.adv.{}.{} '{}' should be an integrer numerical value".format(homed, intf_pos, num)
-                except AssertionError as e:
-                    svc_intf_errors.append(str(e))
+                if not is_int(num):
+                    check(svc_intf_errors, SVC_INTF_RULES['adv'], num, homed=homed, intf_pos=intf_pos)
                     return svc_intf_errors          # Has to exit if this errors as other tests wont run due to it being unable to loop through the interfaces
 
-            # Create list of all interfaces in the reserved ranges
+            # Create sets of all interfaces in the reserved ranges
             if homed == 'single_homed':
-                for intf_num in range(intf['first_intf'], intf['last_intf'] + 1):
-                     sh_intf.append(intf_num)
+                sh_intf.update(range(intf['first_intf'], intf['last_intf'] + 1))
             if homed == 'dual_homed':
-                for intf_num in range(intf['first_intf'], intf['last_intf'] + 1):
-                     dh_intf.append(intf_num)
-                for po_num in range(intf['first_po'], intf['last_po'] + 1):
-                     po_intf.append(po_num)
+                dh_intf.update(range(intf['first_intf'], intf['last_intf'] + 1))
+                po_intf.update(range(intf['first_po'], intf['last_po'] + 1))
 
         # SH_INTF_RANGE (svc_intf.intf.single_homed): Ensures are enough free ports in the range (range minus conflicting static assignments) for number of interfaces defined
         self.check_used_intfs(svc_intf_errors, 'single_homed', sh_per_dev_intf, sh_intf)
@@ -489,21 +708,90 @@ class FilterModule(object):
         # PO_INTF_RANGE (svc_intf.intf.dual_homed): Ensures are enough free port-channels in the range (range minus conflicting static assignments) for number of port-channels defined
         self.check_used_intfs(svc_intf_errors, 'port_channel', per_dev_po, po_intf)
 
-        # Combines the SH and DH per device interface dictionaries
-        for d in (sh_per_dev_intf, dh_per_dev_intf):
-            for key, value in d.items():
-                per_dev_intf[key].extend(value)
-
         # TOTAL_INTF (svc_intf.intf.homed): Make sure that are not more defined interfaces (single and dual_homed) than there are actual interfaces on the switch
-        for switch, intf in per_dev_intf.items():
+        for switch in list(sh_per_dev_intf) + [switch for switch in dh_per_dev_intf if switch not in sh_per_dev_intf]:
+            used_intf = len(sh_per_dev_intf.get(switch, [])) + len(dh_per_dev_intf.get(switch, []))
             if dev_name['leaf'] in switch:
                 max_intf = int(num_intf['leaf'].split(',')[1])
             elif dev_name['border'] in switch:
                 max_intf = int(num_intf['border'].split(',')[1])
-            self.assert_equal_less(svc_intf_errors, len(intf), max_intf,
-                                   "-svc_intf.intf.homed Are more defined interfaces ({}) than the maximum number of interfaces ({}) on {}".format(len(intf), max_intf, switch))
+            else:
+                continue            # Not a leaf or border, is already reported as not a valid hostname
+            if used_intf > max_intf:
+                svc_intf_errors.append(SVC_INTF_RULES['max_intf'].format(used=used_intf, max_intf=max_intf, switch=switch))
 
         if len(svc_intf_errors) == 1:
             return "'services_interface.yml unittest pass'"             # For some reason ansible assert needs the inside quotes
         else:
-            return svc_intf_errors
\ No newline at end of file
+            return svc_intf_errors
+
+############ Validate IP addressing does not overlap across base.yml, service_tenant.yml, service_interface.yml and service_routing.yml ############
+    def ip_overlap(self, tenants, svc_intf, static_route, addr):
+        prefixes = PrefixIndex()
+        ip_overlap_errors = ['Check the IP addressing in base.yml and the services files for the following overlaps:']
+
+        # ADDR (bse.addr): Fabric address ranges, the management range is in its own VRF
+        for name, address in addr.items():
+            prefixes.add('management' if name == 'mgmt_net' else 'default', address, 'connected', 'bse.addr.' + name)
+        # SVI (svc_tnt.tnt.vlans.ip_addr): The SVIs are the same on all switches so each subnet is only added once
+        for tnt in tenants:
+            for vl in tnt.get('vlans') or []:
+                if vl.get('ip_addr') != None:
+                    prefixes.add(tnt['tenant_name'], vl['ip_addr'], 'connected', 'svc_tnt.tnt.{}.vlans.{}.ip_addr'.format(tnt['tenant_name'], vl['num']))
+        # L3_INTF (svc_intf.intf.single_homed.ip_vlan): Layer3 and loopback interfaces, ones without a tenant are in the default VRF
+        for homed, interfaces in svc_intf.items():
+            for intf in interfaces or []:
+                if intf.get('type') in ['layer3', 'loopback']:
+                    prefixes.add(intf.get('tenant') or 'default', intf['ip_vlan'], 'connected', "svc_intf.intf.{}.ip_vlan ({})".format(homed, intf['descr']))
+        # STATIC_ROUTE (svc_rtr.static_route.route.prefix): Each route is added to all the tenants it is created in
+        for rte_grp in static_route or []:
+            for tnt in rte_grp.get('tenant') or []:
+                for rte in rte_grp.get('route') or []:
+                    for pfx in rte.get('prefix') or []:
+                        prefixes.add(tnt, pfx, 'route', 'svc_rtr.static_route.route.prefix')
+
+        # OVERLAP: Every pair of conflicting prefixes, grouped by VRF
+        for vrf, outer, inner in prefixes.conflicts():
+            rule = 'overlap' if inner[3] == 'connected' else 'route'
+            ip_overlap_errors.append(IP_OVERLAP_RULES[rule].format(inner=inner[2], inner_src=inner[4], outer=outer[2], outer_src=outer[4], vrf=vrf))
+
+        if len(ip_overlap_errors) == 1:
+            return "'IP overlap unittest pass'"             # For some reason ansible assert needs the inside quotes
+        else:
+            return ip_overlap_errors
+
+############ Validate all the variable files at once and return the errors in one report ############
+    def validate_all(self, bse, fbc, svc_tnt, svc_intf, svc_rtr):
+        args = {'input_bse_validate': (bse['device_name'], bse['addr'], bse['users']),
+                'input_fbc_validate': (fbc['network_size'], fbc['num_intf'], fbc['route'], fbc['acast_gw_mac'], fbc['adv']['bse_intf'],
+                                       fbc['adv']['lp'], fbc['adv']['mlag'], fbc['adv']['addr_incre']),
+                'input_svc_tnt_validate': (svc_tnt['tnt'], svc_tnt['adv']),
+                'input_svc_intf_validate': (svc_intf['intf'], svc_intf['adv'], fbc['network_size'], svc_tnt['tnt'], bse['device_name'], fbc['num_intf']),
+                'input_ip_overlap_validate': (svc_tnt['tnt'], svc_intf['intf'], (svc_rtr or {}).get('static_route'), bse['addr'])}
+        keys = {name: cache_key(name, args[name]) for name in VALIDATE_ALL}
+
+        # Only the validators that dont already have a result in the cache are run
+        if any(key not in result_cache for key in keys.values()):
+            load_cache()
+        results = {name: result_cache[key] for name, key in keys.items() if key in result_cache}
+        jobs = [(name, args[name]) for name in VALIDATE_ALL if name not in results]
+        if len(jobs) != 0:
+            for (name, job_args), result in zip(jobs, run_validators(jobs)):
+                results[name] = result_cache[keys[name]] = result
+            save_cache()
+
+        # Failed results are lists (heading and errors), are merged in the same order as the var files
+        all_errors = []
+        for name in VALIDATE_ALL:
+            if isinstance(results[name], list):
+                all_errors.extend(results[name])
+        if len(all_errors) == 0:
+            return "'all var files unittest pass'"             # For some reason ansible assert needs the inside quotes
+        else:
+            return all_errors
+
+
+# Used by validate_all, runs the validator (name and arguments are JSON from stdin) and prints the result as JSON
+if __name__ == '__main__':
+    name, args = json.load(sys.stdin)
+    json.dump(FilterModule().validators()[name](*args), sys.stdout)
@@ -26,7 +26,22 @@ DOCUMENTATION = '''
         var_dicts:
             description: Dictionaries that wil be imported from the data-model
             required: True
+            type: dict
+        compact_intf:
+            description:
+                - Stores intf_fbc and intf_mlag as a shared cabling table (fbc_cabling group_var) and a per-host index (intf_idx)
+                - The host_vars are templates expanded by the fabric_intf filter plugin only when they are read
+            type: bool
+            default: False
+        fabrics:
+            description:
+                - Builds several fabrics (each with its own vars directory) in parallel and merges them into the one inventory
+                - List of dicts of name (group holding all the fabrics devices), vars_dir (relative to the current directory) and group_prefix
+                - group_prefix is prepended to the fabrics spine, border and leaf group names, defaults to the lowercase name and '_'
+                - If not set the var_files are loaded from the vars directory in the current directory
+                - Each fabric group has the group_vars fabric_vars_dir and fabric_group_prefix, the playbook is run against one fabric at a time (--limit name)
             type: list
+            default: []
 
 '''
 # What users see as a way of instructions on how to run the plugin
@@ -55,12 +70,29 @@ var_dicts:
     - lp                                # Loopback interface naming and descriptions
     - mlag                              # Holds the peer link Port-Channel number
     - addr_incre                        # Network address increment used for each device role (group)
+
+# Inventory is cached and only rebuilt when the plugin, this config file or the var_files change
+cache: True
+cache_plugin: jsonfile
+cache_connection: ~/.ansible/tmp/inv_from_vars_cache
+cache_timeout: 0
+
+# Optionally build several fabrics, the var_files are loaded from each fabrics vars_dir
+# fabrics:
+#   - name: DC1
+#     vars_dir: vars
+#     group_prefix: dc1_
+#   - name: DC2
+#     vars_dir: ../DC2/vars
+#     group_prefix: dc2_
 '''
 
 # ==================================== Plugin ==================================
 # Modules used to format date ready for creating the inventory
 import os
 import yaml
+import hashlib
+import multiprocessing
 from ipaddress import ip_network
 from collections import defaultdict
 # Ansible modules required for the features of the inventory plugin
@@ -68,6 +100,92 @@ from ansible.errors import AnsibleParserError
 from ansible.module_utils._text import to_native, to_text
 from ansible.plugins.inventory import BaseInventoryPlugin, Constructable, Cacheable
 
+# ============================ Compact fabric interfaces ==========================
+# With compact_intf the intf_fbc and intf_mlag host_vars are these templates, filter_plugins/fabric_intf.py expands them from the cabling table and intf_idx
+COMPACT_INTF_FBC = "{{ fbc_cabling | fbc_intf(intf_idx) }}"
+COMPACT_INTF_MLAG = "{{ fbc_cabling | mlag_intf(intf_idx) }}"
+
+
+# ============================ Address engine ==========================
+# Each address range is parsed once and all device addresses worked out as integer offsets from the network address.
+# Offsets are done in bulk (a list per device role) so the cost is linear to the number of devices in the fabric.
+class AddrEngine(object):
+    def __init__(self, addr):
+        lp_net = ip_network(addr['lp_net'])
+        mgmt_net = ip_network(addr['mgmt_net'], strict=False)
+        mlag_net = ip_network(addr['mlag_net'], strict=False)
+        self.addr_type = type(lp_net.network_address)
+        self.lp_base, self.lp_mask = int(lp_net.network_address), '/' + str(lp_net.prefixlen)
+        self.mgmt_base, self.mgmt_size = int(mgmt_net.network_address), mgmt_net.num_addresses
+        self.mlag_base, self.mlag_size = int(mlag_net.network_address), mlag_net.num_addresses
+        self.addr = addr
+
+    # RANGE: Checks the last offset of a range fits in the network (loopbacks are not checked as lp_net is a /32)
+    def _in_net(self, net_name, net_size, incre, count):
+        if count != 0 and incre + count > net_size:
+            raise ValueError("bse.addr.{} '{}' is too small for {} addresses starting at increment {}".format(net_name, self.addr[net_name], count, incre))
+
+    # LP: List of 'count' loopback addresses (with lp_net mask) starting at the network address plus the increment
+    def lp(self, incre, count):
+        return [str(self.addr_type(self.lp_base + offset)) + self.lp_mask for offset in range(incre, incre + count)]
+
+    # MGMT: List of 'count' management addresses starting at the network address plus the increment
+    def mgmt(self, incre, count):
+        self._in_net('mgmt_net', self.mgmt_size, incre, count)
+        return [str(self.addr_type(self.mgmt_base + offset)) for offset in range(incre, incre + count)]
+
+    # MLAG: List of 'count' MLAG peer-link addresses (/31) starting at the network address plus the increment
+    def mlag(self, incre, count):
+        self._in_net('mlag_net', self.mlag_size, incre, count)
+        return [str(self.addr_type(self.mlag_base + offset)) + '/31' for offset in range(incre, incre + count)]
+
+
+# ============================ Fabric builder ==========================
+# Builds the inventory data model of one fabric. Is module level (and uses a new plugin object) so it can be run in a worker process
+def build_inventory(var_paths, var_dicts, compact_intf, fabric_name=None):
+    fbc = InventoryModule()
+    fbc.compact_intf = compact_intf
+    fbc.load_vars(var_paths, var_dicts)
+    try:
+        fbc.create_ip()
+    except ValueError as e:
+        raise ValueError(to_native(e) if fabric_name is None else 'fabric {} - {}'.format(fabric_name, to_native(e)))
+    fbc.create_intf()
+    return fbc.create_inventory()
+
+# Builds each fabric in its own process (forked so the plugin does not need to be re-imported). The cost is that of the slowest fabric
+# rather than all of them. A single fabric (or a single CPU) is built in this process. Results are in the same order as fabric_args
+def build_fabrics(fabric_args):
+    if len(fabric_args) == 1 or multiprocessing.cpu_count() == 1:
+        return [build_inventory(*args) for args in fabric_args]
+    pool = multiprocessing.get_context('fork').Pool(min(len(fabric_args), multiprocessing.cpu_count()))
+    try:
+        results = [pool.apply_async(build_inventory, args) for args in fabric_args]
+        return [res.get() for res in results]
+    finally:
+        pool.terminate()
+
+# Merges the fabrics into one inventory. Role groups get the fabrics group_prefix and every fabric has a group (its name) of all its devices.
+# The fabric group holds the vars_dir and group_prefix (used by the playbook and templates) and any of the fabrics 'all' group_vars (compact_intf
+# cabling table) as these are different for each fabric
+def merge_fabrics(fabrics, fabric_invs):
+    inv_data = {'groups': {}, 'hostvars': {}}
+    for fbc, fbc_inv in zip(fabrics, fabric_invs):
+        fbc_group = {'hosts': [], 'vars': {'fabric_vars_dir': fbc['vars_dir'], 'fabric_group_prefix': fbc['group_prefix']}}
+        for gr, gr_data in fbc_inv['groups'].items():
+            if gr == 'all':
+                fbc_group['vars'].update(gr_data['vars'])
+            else:
+                inv_data['groups'][fbc['group_prefix'] + gr] = gr_data
+                fbc_group['hosts'].extend(gr_data['hosts'])
+        duplicate = set(fbc_inv['hostvars']).intersection(inv_data['hostvars'])
+        if len(duplicate) != 0:
+            raise AnsibleParserError("inv_from_vars fabric '{}' has hostnames already used by another fabric: {}".format(fbc['name'], ', '.join(sorted(duplicate))))
+        inv_data['hostvars'].update(fbc_inv['hostvars'])
+        inv_data['groups'][fbc['name']] = fbc_group
+    return inv_data
+
+
 # Ansible Inventory plugin class that holds pre-built methods that run automatically (verify_file, parse) without needing to be called
 class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
     NAME = 'inv_from_vars'                  # Should match name of the plugin
@@ -85,99 +203,92 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 # #3. Generates the hostname and IP addresses to be used to create the inventory using data model from config file
     def create_ip(self):
         self.all_lp, self.all_mgmt, self.mlag_peer = ({} for i in range(3))
-        self.spine, self.border, self.leaf = ([] for i in range(3))
-
-        # Create new network size variabels as will be decreasing the value
+        addr = AddrEngine(self.addr)
+        incre = self.addr_incre
         num_sp = self.network_size['num_spine']
         num_lf = self.network_size['num_leaf']
         num_bdr = self.network_size['num_border']
 
-        # 3a. SPINE: Generates name, management and Loopback IP (rtr) and adds to self.all_x dictionaries (spine_name is the key)
-        incr_num = 0
-        while num_sp != 0:
-            incr_num += 1                    # Increments by 1 for each device
-            # Creates the spine name using the incremented (double-decimal format)
-            self.spine.append(self.device_name['spine'] + str("%02d" % incr_num))
-            # Creates the mgmt IP by adding the num_incr and device_ip_incr to the the network address ({sp_name: mgmt_ip})
-            self.all_mgmt[self.spine[incr_num -1]] = str(ip_network(self.addr['mgmt_net'], strict=False)[self.addr_incre['spine_ip'] + incr_num -1])
-            # Creates the RTR loopback by adding the num_incr and device_ip_incr to the the network address and then adding subnet and adds to dict
-            rtr_ip = str(ip_network(self.addr['lp_net'])[0] + self.addr_incre['spine_ip'] + incr_num -1) + '/' + self.addr['lp_net'].split('/')[1]
-            # Creates dict in format sp_name: [{name:lp, ip:lp_ip, descr:lp_descr}) used in next method to create the inventory
-            self.all_lp[self.spine[incr_num -1]] = [{'name': self.bse_intf['lp_fmt'] + str(self.lp['rtr']['num']), 'ip': rtr_ip, 'descr': self.lp['rtr']['descr']}]
-            num_sp -= 1        # Reduces number of spines each iteration
-
-        # 3b. LEAF: Generates name, management, Loopback IPs (rtr, vtep, mlag), mlag peer IP and adds to self.all_x dictionaries (leaf_name is the key)
-        incr_num, odd_incr_num = (0 for i in range(2))
-        while num_lf != 0:
-            incr_num += 1
-            self.leaf.append(self.device_name['leaf'] + str("%02d" % incr_num))
-            # If device_name ends in an odd number makes one MLAG (loopback secondary) IP as is shared between a VPC pair
-            if int(self.leaf[incr_num -1][-2:]) % 2 != 0:
-                odd_incr_num += 1
-                mlag_ip = str(ip_network(self.addr['lp_net'])[0] + self.addr_incre['leaf_mlag_lp'] + odd_incr_num -1) + '/' + self.addr['lp_net'].split('/')[1]
-            self.all_mgmt[self.leaf[incr_num -1]] = str(ip_network(self.addr['mgmt_net'], strict=False)[self.addr_incre['leaf_ip'] + incr_num -1])
-            rtr_ip = str(ip_network(self.addr['lp_net'])[0] + self.addr_incre['leaf_ip'] + incr_num - 1) + '/' + self.addr['lp_net'].split('/')[1]
-            vtep_ip = str(ip_network(self.addr['lp_net'])[0] + self.addr_incre['leaf_vtep_lp'] + incr_num -1) + '/' + self.addr['lp_net'].split('/')[1]
-            self.all_lp[self.leaf[incr_num -1]] = [{'name': self.bse_intf['lp_fmt'] + str(self.lp['rtr']['num']), 'ip': rtr_ip, 'descr': self.lp['rtr']['descr']},
-                                                   {'name': self.bse_intf['lp_fmt'] + str(self.lp['vtep']['num']), 'ip': vtep_ip, 'descr': self.lp['vtep']['descr'],
-                                                   'mlag_lp_addr': mlag_ip}]
-            # Generates MLAG peer IP and adds to dictionary
-            self.mlag_peer[self.leaf[incr_num -1]] = str(ip_network(self.addr['mlag_net'], strict=False)[int(self.leaf[incr_num -1][-2:]) +
-                                                                    self.addr_incre['mlag_leaf_ip'] -1]) + '/31'
-            num_lf -= 1
-
-       # 3c. BORDER: Generates name, management and Loopback IPs (rtr, vtep, mlag, bgw) and adds to self.all_x dictionaries (border_name is the key)
-        incr_num, odd_incr_num = (0 for i in range(2))
-        while num_bdr != 0:
-            incr_num += 1
-            self.border.append(self.device_name['border'] + str("%02d" % incr_num))
-            if int(self.border[incr_num -1][-2:]) % 2 != 0:
-                odd_incr_num += 1
-                mlag_ip = str(ip_network(self.addr['lp_net'])[0] + self.addr_incre['border_mlag_lp'] + odd_incr_num -1) + '/' + self.addr['lp_net'].split('/')[1]
-                bgw_ip = str(ip_network(self.addr['lp_net'])[0] + self.addr_incre['border_bgw_lp'] + odd_incr_num -1) + '/' + self.addr['lp_net'].split('/')[1]
-            self.all_mgmt[self.border[incr_num -1]] = str(ip_network(self.addr['mgmt_net'], strict=False)[self.addr_incre['border_ip'] + incr_num -1])
-            rtr_ip = str(ip_network(self.addr['lp_net'])[0] + self.addr_incre['border_ip'] + incr_num - 1) + '/' + self.addr['lp_net'].split('/')[1]
-            vtep_ip = str(ip_network(self.addr['lp_net'])[0] + self.addr_incre['border_vtep_lp'] + incr_num - 1) + '/' + self.addr['lp_net'].split('/')[1]
-            self.all_lp[self.border[incr_num -1]] = [{'name': self.bse_intf['lp_fmt'] + str(self.lp['rtr']['num']), 'ip': rtr_ip, 'descr': self.lp['rtr']['descr']},
-                                                {'name': self.bse_intf['lp_fmt'] + str(self.lp['vtep']['num']), 'ip': vtep_ip, 'descr': self.lp['vtep']['descr'],
-                                                'mlag_lp_addr': mlag_ip},
-                                                {'name': self.bse_intf['lp_fmt'] + str(self.lp['bgw']['num']), 'ip': bgw_ip, 'descr': self.lp['bgw']['descr']}]
-            self.mlag_peer[self.border[incr_num -1]] = str(ip_network(self.addr['mlag_net'], strict=False)[int(self.border[incr_num -1][-2:]) +
-                                                                      self.addr_incre['mlag_border_ip'] -1]) + '/31'
-            num_bdr -= 1
+        # Device names in double-decimal format, the device number (not the name) is used for any further address offsets
+        self.spine = [self.device_name['spine'] + "%02d" % num for num in range(1, num_sp + 1)]
+        self.leaf = [self.device_name['leaf'] + "%02d" % num for num in range(1, num_lf + 1)]
+        self.border = [self.device_name['border'] + "%02d" % num for num in range(1, num_bdr + 1)]
+        # Loopback names are the same on every device so only need creating once
+        rtr_name = self.bse_intf['lp_fmt'] + str(self.lp['rtr']['num'])
+        vtep_name = self.bse_intf['lp_fmt'] + str(self.lp['vtep']['num'])
+        bgw_name = self.bse_intf['lp_fmt'] + str(self.lp['bgw']['num'])
+
+        # 3a. SPINE: Generates management and Loopback IP (rtr) and adds to self.all_x dictionaries (spine_name is the key)
+        for sp, mgmt_ip, rtr_ip in zip(self.spine, addr.mgmt(incre['spine_ip'], num_sp), addr.lp(incre['spine_ip'], num_sp)):
+            self.all_mgmt[sp] = mgmt_ip
+            self.all_lp[sp] = [{'name': rtr_name, 'ip': rtr_ip, 'descr': self.lp['rtr']['descr']}]
+
+        # 3b. LEAF: Generates management, Loopback IPs (rtr, vtep, mlag) and mlag peer IP. One MLAG IP per VPC pair so is shared by odd/even devices
+        mlag_lp = addr.lp(incre['leaf_mlag_lp'], (num_lf + 1) // 2)
+        for idx, (lf, mgmt_ip, rtr_ip, vtep_ip, peer_ip) in enumerate(zip(self.leaf, addr.mgmt(incre['leaf_ip'], num_lf), addr.lp(incre['leaf_ip'], num_lf),
+                                                                        addr.lp(incre['leaf_vtep_lp'], num_lf), addr.mlag(incre['mlag_leaf_ip'], num_lf))):
+            self.all_mgmt[lf] = mgmt_ip
+            self.all_lp[lf] = [{'name': rtr_name, 'ip': rtr_ip, 'descr': self.lp['rtr']['descr']},
+                               {'name': vtep_name, 'ip': vtep_ip, 'descr': self.lp['vtep']['descr'], 'mlag_lp_addr': mlag_lp[idx // 2]}]
+            self.mlag_peer[lf] = peer_ip
+
+        # 3c. BORDER: Generates management, Loopback IPs (rtr, vtep, mlag, bgw) and mlag peer IP. MLAG and BGW IPs are shared by the VPC pair
+        mlag_lp = addr.lp(incre['border_mlag_lp'], (num_bdr + 1) // 2)
+        bgw_lp = addr.lp(incre['border_bgw_lp'], (num_bdr + 1) // 2)
+        for idx, (bdr, mgmt_ip, rtr_ip, vtep_ip, peer_ip) in enumerate(zip(self.border, addr.mgmt(incre['border_ip'], num_bdr), addr.lp(incre['border_ip'], num_bdr),
+                                                                         addr.lp(incre['border_vtep_lp'], num_bdr), addr.mlag(incre['mlag_border_ip'], num_bdr))):
+            self.all_mgmt[bdr] = mgmt_ip
+            self.all_lp[bdr] = [{'name': rtr_name, 'ip': rtr_ip, 'descr': self.lp['rtr']['descr']},
+                                {'name': vtep_name, 'ip': vtep_ip, 'descr': self.lp['vtep']['descr'], 'mlag_lp_addr': mlag_lp[idx // 2]},
+                                {'name': bgw_name, 'ip': bgw_lp[idx // 2], 'descr': self.lp['bgw']['descr']}]
+            self.mlag_peer[bdr] = peer_ip
 
 
 # ============================ 4. Generate all the fabric interfaces  ==========================
 # 4. For the uplinks (doesnt include iPs) creates nested dicts with key the device_name and value a dict {sp_name: {intf_num: descr}, {intf_num: descr}}
+# If compact_intf is set only the shared cabling table and a per-host index are kept, the fabric_intf filter expands them when a template reads them
     def create_intf(self):
+        # COMPACT: Table of everything needed to work out any devices fabric and MLAG interfaces and a per-host index of its role and number
+        if self.compact_intf:
+            self.all_int, self.mlag_int = {}, {}
+            self.cabling = {'name': {dev_type: self.device_name[dev_type] for dev_type in ['spine', 'border', 'leaf']},
+                            'num': {'spine': len(self.spine), 'border': len(self.border), 'leaf': len(self.leaf)},
+                            'peer_po': self.mlag['peer_po']}
+            for intf_opt in ['intf_fmt', 'intf_short', 'ec_fmt', 'ec_short', 'sp_to_lf', 'sp_to_bdr', 'lf_to_sp', 'bdr_to_sp', 'mlag_peer']:
+                self.cabling[intf_opt] = self.bse_intf[intf_opt]
+            self.intf_idx = {host: {'role': dev_type, 'num': num} for dev_type, hosts in [('spine', self.spine), ('leaf', self.leaf), ('border', self.border)]
+                             for num, host in enumerate(hosts, 1)}
+            return
+
         self.all_int, self.mlag_int, mlag_ports = (defaultdict(dict) for i in range(3))
 
         # 4a. SPINE: Create nested dictionary of the devices fabric interfaces based on number of leaf and border switches
-        for sp in self.spine:
+        # The device number (sp_num, lf_num, bdr_num) is from its position in the device list (same as the name) so is not limited to 2 digits
+        for sp_num, sp in enumerate(self.spine, 1):
             for lf_num in range(self.network_size['num_leaf']):
                 # Loops through the number of leafs using the increment to create the remote device name
                 dev_name = 'UPLINK > ' + self.device_name['leaf'] + "{:02d} ".format(lf_num +1)
                 # Creates remote device port using spine number and the leaf_to_spine interfcae increment
-                dev_int = self.bse_intf['intf_short'] + "{:01d}".format(int(sp[-2:]) + self.bse_intf['lf_to_sp'] -1)
+                dev_int = self.bse_intf['intf_short'] + "{:01d}".format(sp_num + self.bse_intf['lf_to_sp'] -1)
                 # Interface number got from the starting interface increment (sp_to_lf) and the loop interation (lf_num)
                 self.all_int[sp][self.bse_intf['intf_fmt'] + (str(self.bse_intf['sp_to_lf'] + lf_num))] = dev_name + dev_int
             for bdr_num in range(self.network_size['num_border']):
                 dev_name = 'UPLINK > ' + self.device_name['border'] + "{:02d} ".format(bdr_num +1)
-                dev_int = self.bse_intf['intf_short'] + "{:01d}".format(int(sp[-2:]) + self.bse_intf['bdr_to_sp'] -1)
+                dev_int = self.bse_intf['intf_short'] + "{:01d}".format(sp_num + self.bse_intf['bdr_to_sp'] -1)
                 self.all_int[sp][self.bse_intf['intf_fmt'] + (str(self.bse_intf['sp_to_bdr'] + bdr_num))] = dev_name + dev_int
 
         # 4b. LEAF: Create nested dictionary of the devices fabric interfaces based on the number of spine switches
-        for lf in self.leaf:
+        for lf_num, lf in enumerate(self.leaf, 1):
             for sp_num in range(self.network_size['num_spine']):
                 dev_name = 'UPLINK > ' + self.device_name['spine'] + "{:02d} ".format(sp_num +1)
-                dev_int = self.bse_intf['intf_short'] + "{:01d}".format(int(lf[-2:]) + self.bse_intf['sp_to_lf'] -1)
+                dev_int = self.bse_intf['intf_short'] + "{:01d}".format(lf_num + self.bse_intf['sp_to_lf'] -1)
                 self.all_int[lf][self.bse_intf['intf_fmt'] + (str(self.bse_intf['lf_to_sp'] + sp_num))] = dev_name + dev_int
 
         # 4c. BORDER: Create nested dictionary of the devices fabric interfaces based on the number of spine switches
-        for bdr in self.border:
+        for bdr_num, bdr in enumerate(self.border, 1):
             for sp_num in range(self.network_size['num_spine']):
                 dev_name = 'UPLINK > ' + self.device_name['spine'] + "{:02d} ".format(sp_num +1)
-                dev_int = self.bse_intf['intf_short'] + "{:01d}".format(int(bdr[-2:]) + self.bse_intf['sp_to_bdr'] -1)
+                dev_int = self.bse_intf['intf_short'] + "{:01d}".format(bdr_num + self.bse_intf['sp_to_bdr'] -1)
                 self.all_int[bdr][self.bse_intf['intf_fmt'] + (str(self.bse_intf['bdr_to_sp'] + sp_num))] = dev_name + dev_int
 
         # 4d. BORDER, LEAF: Create nested dictionary for border and leaf MLAG interfaces
@@ -186,79 +297,82 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
         for intf_num in self.bse_intf['mlag_peer'].split('-'):
             mlag_ports[self.bse_intf['intf_fmt'] + intf_num] = self.bse_intf['intf_short'] + intf_num
 
-        for dev in self.leaf + self.border:
-            for intf, intf_short in mlag_ports.items():
-                # If device_name ends in an odd number increment the device_name by 1
-                if int(dev[-2:]) % 2 != 0:
-                    self.mlag_int[dev][intf] = 'MLAG peer-link > ' + dev[:-2] + "{:02d} ".format(int(dev[-2:]) +1) + intf_short
-                # If device_name ends in an even number decreases the device_name by 1
-                else:                           # If device_name ends in an even number
-                    self.mlag_int[dev][intf] = 'MLAG peer-link > ' + dev[:-2] + "{:02d} ".format(int(dev[-2:]) -1) + intf_short
+        for dev_type, hosts in [('leaf', self.leaf), ('border', self.border)]:
+            for dev_num, dev in enumerate(hosts, 1):
+                for intf, intf_short in mlag_ports.items():
+                    # If device number is odd increment the device number by 1
+                    if dev_num % 2 != 0:
+                        self.mlag_int[dev][intf] = 'MLAG peer-link > ' + self.device_name[dev_type] + "{:02d} ".format(dev_num +1) + intf_short
+                    # If device number is even decreases the device number by 1
+                    else:
+                        self.mlag_int[dev][intf] = 'MLAG peer-link > ' + self.device_name[dev_type] + "{:02d} ".format(dev_num -1) + intf_short
 
 # ============================ 5. Create the inventory ==========================
-# 5. Adds groups, hosts and host_vars to create the inventory file
+# 5. Creates a data model of the groups, hosts and host_vars. Is kept as plain dicts and lists so it can be stored in the inventory cache
     def create_inventory(self):
+        inv_data = {'groups': {}, 'hostvars': defaultdict(dict)}
         # Creates list of groups created from the device names
         groups = [self.device_name['spine'].split('-')[-1].lower(), self.device_name['border'].split('-')[-1].lower(),
                   self.device_name['leaf'].split('-')[-1].lower()]
 
-        #5a. Creates all the group, they are automatically added to the 'all' group
+        #5a. Creates all the groups with their hosts, os and num_intf group_vars. They are automatically added to the 'all' group
         for gr in groups:
-            self.inventory.add_group(gr)
-            # Creates the host entries, os and mlag_lp_addr host_var (although assigned to group in the cmd)
-            if gr in self.device_name['spine'].lower():
-                for sp in self.spine:
-                    self.inventory.add_host(sp, gr)
-                    self.inventory.set_variable(gr, 'ansible_network_os', self.device_type['spine_os'])
-                    self.inventory.set_variable(gr, 'num_intf', self.num_intf['spine'])
-            if gr in self.device_name['border'].lower():
-                for br in self.border:
-                    self.inventory.add_host(br, gr)
-                    self.inventory.set_variable(gr, 'ansible_network_os', self.device_type['border_os'])
-                    self.inventory.set_variable(gr, 'num_intf', self.num_intf['border'])
-
-            if gr in self.device_name['leaf'].lower():
-                for lf in self.leaf:
-                    self.inventory.add_host(lf, gr)
-                    self.inventory.set_variable(gr, 'ansible_network_os', self.device_type['leaf_os'])
-                    self.inventory.set_variable(gr, 'num_intf', self.num_intf['leaf'])
+            inv_data['groups'][gr] = {'hosts': [], 'vars': {}}
+            for dev_type, hosts in [('spine', self.spine), ('border', self.border), ('leaf', self.leaf)]:
+                if gr in self.device_name[dev_type].lower() and len(hosts) != 0:
+                    inv_data['groups'][gr]['hosts'].extend(hosts)
+                    inv_data['groups'][gr]['vars']['ansible_network_os'] = self.device_type[dev_type + '_os']
+                    inv_data['groups'][gr]['vars']['num_intf'] = self.num_intf[dev_type]
 
         #5b. Adds host_vars for all the IP dictionaries created in 'create_ip' method
         for host, mgmt_ip in self.all_mgmt.items():
-            self.inventory.set_variable(host, 'ansible_host', mgmt_ip)
+            inv_data['hostvars'][host]['ansible_host'] = mgmt_ip
         for host, lp in self.all_lp.items():
-            self.inventory.set_variable(host, 'intf_lp', lp)
+            inv_data['hostvars'][host]['intf_lp'] = lp
         for host, mlag_peer in self.mlag_peer.items():
-            self.inventory.set_variable(host, 'mlag_peer_ip', mlag_peer)
-
-        #5c. Adds host_vars for all the Interface dictionaries created in 'create_intf' method
+            inv_data['hostvars'][host]['mlag_peer_ip'] = mlag_peer
+
+        #5c. Adds host_vars for all the Interface dictionaries created in 'create_intf' method. If compact is a template (same string shared by all hosts)
+        if self.compact_intf:
+            inv_data['groups']['all'] = {'hosts': [], 'vars': {'fbc_cabling': self.cabling}}
+            for host, idx in self.intf_idx.items():
+                inv_data['hostvars'][host]['intf_idx'] = idx
+                inv_data['hostvars'][host]['intf_fbc'] = COMPACT_INTF_FBC
+                if idx['role'] != 'spine':
+                    inv_data['hostvars'][host]['intf_mlag'] = COMPACT_INTF_MLAG
         for host, int_details in self.all_int.items():
-            self.inventory.set_variable(host, 'intf_fbc', int_details)
+            inv_data['hostvars'][host]['intf_fbc'] = int_details
         for host, int_details in self.mlag_int.items():
-            self.inventory.set_variable(host, 'intf_mlag', int_details)
+            inv_data['hostvars'][host]['intf_mlag'] = int_details
 
+        inv_data['hostvars'] = dict(inv_data['hostvars'])
+        return inv_data
 
-# ============================ 2. Parse data from config file ==========================
-# !!!! The parse method is always auto-run, so is what starts the plugin and runs any custom methods !!!!
+# ============================ 6. Populate the inventory ==========================
+# 6. Adds the groups, hosts and host_vars from the inventory data model (newly created or from the cache) to the inventory
+    def populate(self, inv_data):
+        for gr, gr_data in inv_data['groups'].items():
+            self.inventory.add_group(gr)
+            for host in gr_data['hosts']:
+                self.inventory.add_host(host, gr)
+            for var, value in gr_data['vars'].items():
+                self.inventory.set_variable(gr, var, value)
+        for host, host_vars in inv_data['hostvars'].items():
+            for var, value in host_vars.items():
+                self.inventory.set_variable(host, var, value)
 
-# 2. This Ansible pre-defined method pulls the data from the config file and creates variables for it.
-    def parse(self, inventory, loader, path, cache=False):
-        # `Inherited methods: inventory creates inv, loader loads vars from cfg file and path is path to cfg file
-        super(InventoryModule, self).parse(inventory, loader, path)
 
-        # 2a. Read the data from the config file and create variables. !!! The options MUST be defined in DOCUMENTATION options section !!!
-        self._read_config_data(path)
-        var_files = self.get_option('var_files')           # List of the Ansible varaible files (in vars)
-        var_dicts = self.get_option('var_dicts')           # Names of the dictionaries that will be got from these files
+# ============================ 2. Parse data from config file ==========================
+# !!!! The parse method is always auto-run, so is what starts the plugin and runs any custom methods !!!!
 
-        # 2b. Loads the yaml file to makes a dictionary of dictionaires holding contents of all files in format {file_name:file_contents}
+# 2b. Loads the yaml files and creates variables of only those needed from the data model
+    def load_vars(self, var_paths, var_dicts):
+        # Makes a dictionary of dictionaires holding contents of all files in format {file_name:file_contents}
         all_vars = {}
-        mydir = os.getcwd()                 # Gets current directory
-        for dict_name, file_name in zip(var_dicts.keys(), var_files):
-            with open(os.path.join(mydir, 'vars/') + file_name, 'r') as file_content:
+        for dict_name, var_path in zip(var_dicts.keys(), var_paths):
+            with open(var_path, 'r') as file_content:
                 all_vars[dict_name] = yaml.load(file_content, Loader=yaml.FullLoader)
 
-        # 2c. Create new variables of only those needed from the dict created in the last step (all_vars)
         # As it loops through list in cfg file is easy to add more variables in the future
         for file_name, var_names in var_dicts.items():
             for each_var in var_names:
@@ -281,12 +395,62 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
                 elif each_var == 'addr_incre':
                     self.addr_incre = all_vars[file_name]['fbc']['adv'][each_var]
 
-        # 3. Creates a data model of the hostnames and device specific IP interface addresses
-        self.create_ip()
-        # 4. Creates a data model of all the fabric interfaces
-        self.create_intf()
-        # 5. Uses  the data models to create the inventory containing groups, hosts and host_vars
-        self.create_inventory()
+# 2c. HASH: Hash of the plugin, its config file and the var_files. If any of them change the cached inventory is no longer valid
+    def hash_sources(self, path, var_paths):
+        src_hash = hashlib.sha1()
+        for file_name in [__file__, path] + var_paths:
+            with open(file_name, 'rb') as file_content:
+                src_hash.update(file_content.read())
+        return src_hash.hexdigest()
+
+# 2. This Ansible pre-defined method pulls the data from the config file and creates variables for it.
+    def parse(self, inventory, loader, path, cache=True):
+        # `Inherited methods: inventory creates inv, loader loads vars from cfg file and path is path to cfg file
+        super(InventoryModule, self).parse(inventory, loader, path)
+
+        # 2a. Read the data from the config file and create variables. !!! The options MUST be defined in DOCUMENTATION options section !!!
+        self._read_config_data(path)
+        var_files = self.get_option('var_files')           # List of the Ansible varaible files (in vars)
+        var_dicts = self.get_option('var_dicts')           # Names of the dictionaries that will be got from these files
+        mydir = os.getcwd()                                 # Gets current directory
+        # Without fabrics is the one fabric using the vars directory, its groups have no prefix and there is no fabric group
+        fabrics = []
+        for fbc in self.get_option('fabrics'):
+            if not isinstance(fbc, dict) or 'name' not in fbc or 'vars_dir' not in fbc:
+                raise AnsibleParserError("inv_from_vars fabrics entries must be a dict with a 'name' and 'vars_dir', got: %s" % to_native(fbc))
+            fabrics.append({'name': fbc['name'], 'vars_dir': fbc['vars_dir'], 'group_prefix': fbc.get('group_prefix', fbc['name'].lower() + '_')})
+        fabric_dirs = [fbc['vars_dir'] for fbc in fabrics] if len(fabrics) != 0 else ['vars']
+        fabric_paths = [[os.path.join(mydir, vars_dir, file_name) for file_name in var_files] for vars_dir in fabric_dirs]
+
+        # 2d. CACHE: Only uses the cached inventory if the source hash it was stored with still matches. cache is False if --flush-cache used
+        cache_key = self.get_cache_key(path)
+        src_hash = self.hash_sources(path, [var_path for var_paths in fabric_paths for var_path in var_paths])
+        attempt_to_read_cache = self.get_option('cache') and cache
+        cache_needs_update = self.get_option('cache') and not cache
+        inv_data = None
+        if attempt_to_read_cache:
+            try:
+                if self._cache[cache_key]['src_hash'] == src_hash:
+                    inv_data = self._cache[cache_key]['inventory']
+                else:
+                    cache_needs_update = True
+            except KeyError:
+                cache_needs_update = True
+
+        # Only has to build the inventory data model if it was not got from the cache. Each fabric loads its vars (2b), creates the
+        # hostnames and device specific IP interface addresses (3), the fabric interfaces (4) and the groups, hosts and host_vars (5)
+        if inv_data is None:
+            fabric_args = [(var_paths, var_dicts, self.get_option('compact_intf'), fbc.get('name')) for fbc, var_paths in zip(fabrics or [{}], fabric_paths)]
+            try:
+                fabric_invs = build_fabrics(fabric_args)
+            except ValueError as e:
+                raise AnsibleParserError('inv_from_vars failed to create the device addresses: %s' % to_native(e))
+            inv_data = merge_fabrics(fabrics, fabric_invs) if len(fabrics) != 0 else fabric_invs[0]
+        if cache_needs_update:
+            self._cache[cache_key] = {'src_hash': src_hash, 'inventory': inv_data}
+
+        # 6. Adds the groups, hosts and host_vars to the inventory
+        self.populate(inv_data)
 
    # Example ways to test variable format is correct before running other methods
         # test = self.addr['lp_net']
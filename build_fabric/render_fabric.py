@@ -0,0 +1,310 @@
+"""
+Renders the config of every device without Ansible, creating the same config snippets and config.cfg files as the playbook (in ans.dir_path).
+The playbook renders each snippet in a separate template task, so every device pays Ansible's per-task cost and the template is compiled again
+for every device. Here the templates of all the roles are loaded once into a shared Jinja environment (with a bytecode cache so are not even
+compiled again next run) and the devices rendered across a pool of processes. Uses the same inventory (inv_from_vars), services data-models
+(svc_dm store) and interface cleanup (get_intf) as the playbook. Is only the build, the config is still deployed by the playbook (tag cfg).
+Run from the build_fabric directory using "python render_fabric.py" (-l to limit the devices, -p for the number of processes, -s to keep the
+service interface numbers of the last deploy, --profile to time each template, top-level section and loop of every device and save a report of
+them across the fabric). Needs jinja2, PyYAML and ansible (the inventory plugin imports it)
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import ipaddress
+import multiprocessing
+import yaml
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, nodes
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+for plugin_dir in ['inventory_plugins', 'filter_plugins', 'roles/services/filter_plugins', 'roles/intf_cleanup/filter_plugins']:
+    sys.path.insert(0, os.path.join(BASE_DIR, plugin_dir))
+from inv_from_vars import build_inventory
+from fabric_intf import FilterModule as FabricIntf
+from format_dm import FilterModule as FormatDm
+from get_intf import FilterModule as GetIntf
+
+# Same var files as the playbook (service_routing is optional) and the snippets (name of the .conf file) and the role and template used for each
+VAR_FILES = ['ansible.yml', 'base.yml', 'fabric.yml', 'service_tenant.yml', 'service_interface.yml', 'service_routing.yml']
+SNIPPETS = [('base', 'base', 'bse_tmpl.j2'), ('fabric', 'fabric', 'fbc_tmpl.j2'), ('svc_tnt', 'services', 'svc_tnt_tmpl.j2'),
+            ('svc_intf', 'services', 'svc_intf_tmpl.j2'), ('svc_rtr', 'services', 'svc_rtr_tmpl.j2'), ('dflt_intf', 'intf_cleanup', 'dflt_intf_tmpl.j2')]
+CACHE_DIR = os.path.expanduser(os.environ.get('RENDER_FABRIC_CACHE', '~/.ansible/tmp/render_fabric_j2'))
+# Set before the pool is created so the forked workers get the environments, variables and data-models without them being copied
+RENDER = {}
+
+
+###################################### ANSIBLE FILTERS: Those used by the templates ######################################
+# Only the forms used by the templates, ipaddr('address') is the address of address/prefix (None if it is the network address of a range
+# and False if not an address) and ipmath adds a number to an address
+def ipaddr(value, query=''):
+    try:
+        intf = ipaddress.ip_interface(value)
+    except ValueError:
+        return False
+    if query != 'address':
+        return value
+    if intf.network.num_addresses > 1 and intf.ip == intf.network.network_address:
+        return None
+    return str(intf.ip)
+
+def ipmath(value, amount):
+    return str(ipaddress.ip_address(value) + int(amount))
+
+# Like Ansible a variable of None is rendered as nothing rather than 'None'
+def finalize(value):
+    return '' if value is None else value
+
+
+###################################### PROFILE: Time of each template, top-level section and loop ######################################
+# Markers are added to the parsed template around every top-level section (for, if, with, ...) and loop and at the start of every loop body (to count
+# the iterations), macros and blocks are timed from inside their body. They are only sibling nodes so nothing about the variable scoping changes.
+# Times are inclusive (a loop includes the loops within it) and are labelled with the tag and its line in the template.
+PROFILE_TAGS = {nodes.For: 'for', nodes.If: 'if', nodes.Macro: 'macro', nodes.Block: 'block', nodes.CallBlock: 'call', nodes.FilterBlock: 'filter',
+                nodes.With: 'with'}
+
+class ProfileEnvironment(Environment):
+    def _parse(self, source, name, filename):
+        tree = super(ProfileEnvironment, self)._parse(source, name, filename)
+        self.prof_lines, self.prof_tag_cnt = source.splitlines(), {}
+        tree.body = self.instrument(name, tree.body, True)
+        tree.set_environment(self)
+        return tree
+
+    def marker(self, name, label, mark, lineno):
+        return nodes.Output([nodes.Call(nodes.Name('_render_profile', 'load'), [nodes.Const(name), nodes.Const(label), nodes.Const(mark)],
+                                        [], None, None)]).set_lineno(lineno)
+
+    # The text of the tag, is the nth tag of that type on the line as can be more than one (such as "{% for x in y %}{% for z in x %}")
+    def label(self, node):
+        tag = PROFILE_TAGS[type(node)]
+        cnt = self.prof_tag_cnt[(node.lineno, tag)] = self.prof_tag_cnt.get((node.lineno, tag), -1) + 1
+        found = re.findall(r'{%[-+]?\s*(' + tag + r'\b.*?)\s*[-+]?%}', self.prof_lines[node.lineno - 1])
+        return '{} (line {})'.format(found[cnt] if cnt < len(found) else tag, node.lineno)
+
+    def instrument(self, name, body, top_level):
+        new_body = []
+        for node in body:
+            label = self.label(node) if type(node) in PROFILE_TAGS else None
+            self.instrument_children(name, node, label)
+            if isinstance(node, nodes.For) or (top_level == True and label != None and not isinstance(node, (nodes.Macro, nodes.Block))):
+                new_body.extend([self.marker(name, label, 'start', node.lineno), node, self.marker(name, label, 'stop', node.lineno)])
+            else:
+                new_body.append(node)
+        return new_body
+
+    def instrument_children(self, name, node, label):
+        for field in ['body', 'else_']:
+            if isinstance(getattr(node, field, None), list):
+                setattr(node, field, self.instrument(name, getattr(node, field), False))
+        # elif is an If node in the list of the parent If (is the same tag so is not labelled)
+        for elif_node in getattr(node, 'elif_', []):
+            self.instrument_children(name, elif_node, None)
+        if isinstance(node, nodes.For):
+            node.body.insert(0, self.marker(name, label, 'iter', node.lineno))
+        elif isinstance(node, (nodes.Macro, nodes.Block)):
+            node.body = [self.marker(name, label, 'start', node.lineno)] + node.body + [self.marker(name, label, 'stop', node.lineno)]
+
+# Called by the markers, collects the time, runs and iterations of each section until taken (per snippet)
+class RenderProfile(object):
+    def __init__(self):
+        self.blocks, self.starts = {}, []
+
+    def __call__(self, name, label, mark):
+        if mark == 'start':
+            self.starts.append(time.perf_counter())
+        else:
+            block = self.blocks.setdefault(label, {'time': 0, 'runs': 0, 'iterations': 0})
+            if mark == 'iter':
+                block['iterations'] += 1
+            else:
+                block['time'] += time.perf_counter() - self.starts.pop()
+                block['runs'] += 1
+        return ''
+
+    def take(self):
+        blocks, self.blocks, self.starts = self.blocks, {}, []
+        return blocks
+
+# Aggregates all the devices profiles into one per template, the time and lines are totals and max of any one device
+def profile_report(profiles):
+    report = {}
+    for host, host_prof in profiles.items():
+        for snippet, snip_prof in host_prof.items():
+            tmpl = report.setdefault(snippet, {'hosts': 0, 'time': 0, 'max_time': 0, 'lines': 0, 'max_lines': 0, 'blocks': {}})
+            tmpl['hosts'] += 1
+            for stat in ['time', 'lines']:
+                tmpl[stat] += snip_prof[stat]
+                tmpl['max_' + stat] = max(tmpl['max_' + stat], snip_prof[stat])
+            for label, block in snip_prof['blocks'].items():
+                agg = tmpl['blocks'].setdefault(label, {'time': 0, 'max_time': 0, 'runs': 0, 'iterations': 0, 'max_iterations': 0})
+                for stat in ['time', 'iterations']:
+                    agg[stat] += block[stat]
+                    agg['max_' + stat] = max(agg['max_' + stat], block[stat])
+                agg['runs'] += block['runs']
+    return report
+
+def print_profile(report):
+    print('{:<55} {:>6} {:>11} {:>10} {:>6} {:>10} {:>9}'.format('template / section', 'hosts', 'time (ms)', 'max (ms)', '%', 'iters', 'max iters'))
+    for snippet, tmpl in sorted(report.items(), key=lambda x: x[1]['time'], reverse=True):
+        print('{:<55} {:>6} {:>11.1f} {:>10.2f} {:>6} {:>10} {:>9}'.format(snippet + ' ({} lines, max {})'.format(tmpl['lines'], tmpl['max_lines']),
+                                                                        tmpl['hosts'], tmpl['time'] * 1000, tmpl['max_time'] * 1000, '', '', ''))
+        for label, block in sorted(tmpl['blocks'].items(), key=lambda x: x[1]['time'], reverse=True):
+            print('  {:<53} {:>6} {:>11.1f} {:>10.2f} {:>6.1f} {:>10} {:>9}'.format(label[:53], '', block['time'] * 1000, block['max_time'] * 1000,
+                                                                               block['time'] / (tmpl['time'] or 1) * 100, block['iterations'],
+                                                                               block['max_iterations']))
+
+
+###################################### LOAD: Variables and inventory ######################################
+def load_vars(vars_dir):
+    play_vars = {}
+    for file_name in VAR_FILES:
+        if os.path.exists(os.path.join(vars_dir, file_name)):
+            with open(os.path.join(vars_dir, file_name)) as file_content:
+                play_vars.update(yaml.load(file_content, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader)))
+    return play_vars
+
+# Builds the inventory the same way as the inventory plugin (from the options in its config file). Each devices variables are the all group_vars,
+# the group_vars of its groups then its host_vars. If compact_intf is used the intf_fbc and intf_mlag templates are expanded here
+def load_inventory(vars_dir, inv_cfg):
+    with open(inv_cfg) as file_content:
+        cfg = yaml.safe_load(file_content)
+    inv_data = build_inventory([os.path.join(vars_dir, file_name) for file_name in cfg['var_files']], cfg['var_dicts'], cfg.get('compact_intf', False))
+    groups, host_vars = {'all': [], 'ungrouped': []}, {}
+    all_vars = inv_data['groups'].get('all', {}).get('vars', {})
+    for gr, gr_data in inv_data['groups'].items():
+        if gr == 'all':
+            continue
+        groups[gr] = list(gr_data['hosts'])
+        for host in gr_data['hosts']:
+            if host not in host_vars:
+                groups['all'].append(host)
+                host_vars[host] = dict(all_vars)
+            host_vars[host].update(gr_data['vars'])
+    for host, each_host_vars in inv_data['hostvars'].items():
+        host_vars[host].update(each_host_vars)
+        if 'intf_idx' in each_host_vars:
+            host_vars[host]['intf_fbc'] = FabricIntf().fbc_intf(all_vars['fbc_cabling'], each_host_vars['intf_idx'])
+            if each_host_vars['intf_idx']['role'] != 'spine':
+                host_vars[host]['intf_mlag'] = FabricIntf().mlag_intf(all_vars['fbc_cabling'], each_host_vars['intf_idx'])
+    return groups, host_vars
+
+
+###################################### RENDER: All the devices config ######################################
+# 1. SETUP: Creates a Jinja environment per OS with the templates of all the roles and the services data-models of all devices (svc_dm store).
+# If profiling the templates are instrumented so are not put in the bytecode cache (would be used by normal runs as has the same key).
+# The service interface numbers are only got from the last deploy if given the state_dir (is only read, the deploy saves it)
+def setup(play_vars, groups, host_vars, dir_path, cache_dir=CACHE_DIR, svc_dm_store=None, profile=False, state_dir=None):
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    envs = {}
+    for network_os in set(each_host_vars['ansible_network_os'] for each_host_vars in host_vars.values()):
+        envs[network_os] = (ProfileEnvironment if profile else Environment)(loader=FileSystemLoader([os.path.join(BASE_DIR, 'roles', role, 'templates', network_os) for role in
+                                                                 ['base', 'fabric', 'services', 'intf_cleanup']]),
+                                       trim_blocks=True, keep_trailing_newline=True, finalize=finalize,
+                                       bytecode_cache=None if profile else FileSystemBytecodeCache(cache_dir))
+        envs[network_os].filters.update({'ipaddr': ipaddr, 'ipmath': ipmath})
+        if profile:
+            envs[network_os].globals['_render_profile'] = RenderProfile()
+        # Loaded now so is done once rather than by each worker
+        for snippet, role, tmpl in SNIPPETS:
+            envs[network_os].get_template(tmpl)
+    if svc_dm_store == None:
+        svc_dm_store = FormatDm().svc_dm_compile(play_vars['svc_tnt'], play_vars['svc_intf'], play_vars.get('svc_rtr'), play_vars['fbc'],
+                                                 groups['all'], os.path.join(dir_path, '.svc_dm'), state_dir)
+    RENDER.update({'envs': envs, 'play_vars': play_vars, 'groups': groups, 'host_vars': host_vars, 'dir_path': dir_path, 'svc_dm_store': svc_dm_store,
+                   'profile': profile})
+
+# 2. ASSEMBLE: Joins the .conf files in name order into config.cfg, same as the Ansible assemble module (adds a newline if a file doesnt end in one)
+def assemble(config_dir):
+    config = []
+    for file_name in sorted(os.listdir(config_dir)):
+        if file_name.endswith('.conf') and os.path.isfile(os.path.join(config_dir, file_name)):
+            if len(config) != 0 and not config[-1].endswith('\n'):
+                config.append('\n')
+            with open(os.path.join(config_dir, file_name)) as file_content:
+                config.append(file_content.read())
+    with open(os.path.join(config_dir, 'config.cfg'), 'w') as file_content:
+        file_content.write(''.join(config))
+
+# 3a. CONTEXT: The variables a device's templates are rendered with (same as the playbook tasks) and the snippets it has
+def host_context(host):
+    fmt, play_vars, host_vars = FormatDm(), RENDER['play_vars'], RENDER['host_vars'][host]
+    dm_store, fbc = RENDER['svc_dm_store'], play_vars['fbc']
+    host_ctx = dict(play_vars, **host_vars)
+    host_ctx.update({'inventory_hostname': host, 'groups': RENDER['groups'], 'hostvars': RENDER['host_vars'],
+                     'flt_svc_tnt': fmt.svc_dm(dm_store, 'svc_tnt', host), 'flt_svc_intf': fmt.svc_dm(dm_store, 'svc_intf', host)})
+    host_ctx['flt_dflt_intf'] = GetIntf().get_intf(host_vars, fbc['adv']['bse_intf'], host_ctx['flt_svc_intf'])
+    if play_vars.get('svc_rtr') != None:
+        host_ctx['flt_svc_rtr'] = fmt.svc_dm(dm_store, 'svc_rtr', host)
+    # Like the playbook tasks the spines have no services snippets
+    snippets = [(snippet, tmpl) for snippet, role, tmpl in SNIPPETS if role != 'services' or (play_vars['bse']['device_name']['spine'] not in host
+                                                                                              and (snippet != 'svc_rtr' or 'flt_svc_rtr' in host_ctx))]
+    return host_ctx, snippets
+
+# 3b. HOST: Renders all the snippets of a device and assembles them, returns the number of config lines and the profile of each snippet (if profiling)
+def render_host(host):
+    host_ctx, snippets = host_context(host)
+    env = RENDER['envs'][host_ctx['ansible_network_os']]
+    config_dir = os.path.join(RENDER['dir_path'], host, 'config')
+    if not os.path.isdir(config_dir):
+        os.makedirs(config_dir)
+    profile = {}
+    for snippet, tmpl in snippets:
+        start = time.perf_counter()
+        output = env.get_template(tmpl).render(host_ctx)
+        if RENDER.get('profile') == True:
+            profile[snippet] = {'time': time.perf_counter() - start, 'lines': len(output.splitlines()), 'blocks': env.globals['_render_profile'].take()}
+        with open(os.path.join(config_dir, snippet + '.conf'), 'w') as file_content:
+            file_content.write(output)
+    assemble(config_dir)
+    with open(os.path.join(config_dir, 'config.cfg')) as file_content:
+        return host, sum(1 for line in file_content), profile
+
+# 4. ALL: Each worker gets a chunk of the devices, is done in this process if only one device or CPU. Returns the lines and profile of each device
+def render_all(hosts, processes=None):
+    processes = processes or multiprocessing.cpu_count()
+    if len(hosts) == 1 or processes == 1:
+        results = [render_host(host) for host in hosts]
+    else:
+        pool = multiprocessing.get_context('fork').Pool(min(len(hosts), processes))
+        try:
+            results = pool.map(render_host, hosts, chunksize=max(1, len(hosts) // (processes * 4)))
+        finally:
+            pool.terminate()
+    return {host: lines for host, lines, profile in results}, {host: profile for host, lines, profile in results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Renders the config snippets and config.cfg of all devices into ans.dir_path')
+    parser.add_argument('-l', '--limit', help='Comma separated list of devices to render (default all)')
+    parser.add_argument('-p', '--processes', type=int, help='Number of worker processes (default number of CPUs)')
+    parser.add_argument('-o', '--dir_path', help='Directory to create the config in (default ans.dir_path)')
+    parser.add_argument('--profile', action='store_true', help='Time each template, top-level section and loop, saved to dir_path/reports/render_profile.json')
+    parser.add_argument('-s', '--state', action='store_true', help='Keep the service interface numbers of the last deploy (read from ans.state_dir)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    play_vars = load_vars(os.path.join(BASE_DIR, 'vars'))
+    groups, host_vars = load_inventory(os.path.join(BASE_DIR, 'vars'), os.path.join(BASE_DIR, 'inv_from_vars_cfg.yml'))
+    dir_path = os.path.expanduser(args.dir_path or play_vars['ans']['dir_path'])
+    setup(play_vars, groups, host_vars, dir_path, profile=args.profile, state_dir=play_vars['ans'].get('state_dir') if args.state else None)
+    hosts = args.limit.split(',') if args.limit else groups['all']
+    lines, profiles = render_all(hosts, args.processes)
+    for host in hosts:
+        print('{:<25} {:>7} lines'.format(host, lines[host]))
+    print('Rendered {} devices into {} in {:.2f} seconds'.format(len(hosts), dir_path, time.perf_counter() - start))
+    if args.profile:
+        report = profile_report(profiles)
+        if not os.path.isdir(os.path.join(dir_path, 'reports')):
+            os.makedirs(os.path.join(dir_path, 'reports'))
+        with open(os.path.join(dir_path, 'reports', 'render_profile.json'), 'w') as file_content:
+            json.dump({'templates': report, 'hosts': profiles}, file_content, indent=4)
+        print_profile(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+'''
+Works out which devices and config snippets need re-rendering and deploying by hashing everything each snippet is built from.
+Each snippet (base, fabric, svc_tnt, svc_intf, svc_rtr, dflt_intf) is hashed from its template and the data-models and variables used by it.
+The hashes are compared to those saved for the device (state_dir/hostname/dm_hash.json) by the last successful deploy.
+They are also compared to the build manifest (dir_path/hostname/build_manifest.json) to only re-render the snippets that have changed since the last build.
+'''
+
+import os
+import json
+import hashlib
+import tempfile
+
+ROLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+# Inventory variables (created by the inv_from_vars inventory plugin) that are used by the templates
+INV_VARS = ['ansible_host', 'ansible_network_os', 'num_intf', 'intf_lp', 'mlag_peer_ip', 'intf_fbc', 'intf_mlag', 'intf_idx', 'fbc_cabling', 'fabric_group_prefix']
+# Snippet name (also the name of the .conf file) and the role and template it is created from
+SNIPPETS = {'base': ('base', 'bse_tmpl.j2'), 'fabric': ('fabric', 'fbc_tmpl.j2'), 'svc_tnt': ('services', 'svc_tnt_tmpl.j2'),
+            'svc_intf': ('services', 'svc_intf_tmpl.j2'), 'svc_rtr': ('services', 'svc_rtr_tmpl.j2'), 'dflt_intf': ('intf_cleanup', 'dflt_intf_tmpl.j2')}
+
+
+class FilterModule(object):
+    def filters(self):
+        return {
+            'change_impact': self.change_impact,
+            'build_manifest': self.build_manifest
+        }
+
+    # HASH: Dicts are hashed with sorted keys so the same data always gives the same hash, anything not JSON (Ansible strings) is made a string
+    def dm_hash(self, *data):
+        return hashlib.sha1(json.dumps(data, sort_keys=True, separators=(',', ':'), default=str).encode()).hexdigest()
+
+    def tmpl_hash(self, network_os, snippet, tmpl_cache):
+        role, tmpl = SNIPPETS[snippet]
+        tmpl_file = os.path.join(ROLES_DIR, role, 'templates', network_os, tmpl)
+        if tmpl_file not in tmpl_cache:
+            with open(tmpl_file, 'rb') as file_content:
+                tmpl_cache[tmpl_file] = hashlib.sha1(file_content.read()).hexdigest()
+        return tmpl_cache[tmpl_file]
+
+    # SVC_DM: Loads the devices service data-models from the svc_dm store, svc_tnt is in the shared svc_tnt.json unless the VLANs are pruned
+    def load_svc_dm(self, svc_dm_store, hostname, tnt_dm):
+        with open(os.path.join(svc_dm_store['store_dir'], hostname + '.json')) as file_content:
+            svc_dm = json.load(file_content)
+        svc_dm.setdefault('svc_tnt', tnt_dm)
+        return svc_dm
+
+    # File hash is None if the file doesnt exist (so never matches the manifest)
+    def file_hash(self, file_name):
+        try:
+            with open(file_name, 'rb') as file_content:
+                return hashlib.sha1(file_content.read()).hexdigest()
+        except (IOError, OSError):
+            return None
+
+    def load_manifest(self, host_dir):
+        try:
+            with open(os.path.join(host_dir, 'build_manifest.json')) as file_content:
+                return json.load(file_content)
+        except (IOError, OSError, ValueError):
+            return {'snippets': {}}
+
+    # PREV: The hashes saved by the last deploy, if there are none (first deploy or no state_dir) all the snippets are changed
+    def load_prev_hash(self, state_dir, hostname):
+        if state_dir:
+            try:
+                with open(os.path.join(os.path.expanduser(state_dir), hostname, 'dm_hash.json')) as file_content:
+                    return json.load(file_content)
+            except (IOError, OSError, ValueError):
+                pass
+        return {}
+
+    def save_report(self, report_dir, impact):
+        report_dir = os.path.expanduser(report_dir)
+        if not os.path.isdir(report_dir):
+            os.makedirs(report_dir)
+        fd, tmp_file = tempfile.mkstemp(dir=report_dir)
+        with os.fdopen(fd, 'w') as file_content:
+            json.dump({'hosts': impact['hosts'], 'snippets': impact['snippets'], 'build': impact['build']}, file_content, indent=4)
+        os.replace(tmp_file, os.path.join(report_dir, 'change_impact.json'))
+        # One host per line so can be used with '--limit @change_impact_limit.txt'
+        with open(os.path.join(report_dir, 'change_impact_limit.txt'), 'w') as file_content:
+            file_content.write(''.join(host + '\n' for host in impact['hosts']))
+
+###################################### CHANGE IMPACT: Hashes and compares the snippets of all devices ######################################
+# Returns the changed hosts, the changed snippets per host (since deployed), the snippets to build and config snippets to remove per host
+# (since built, 'config' if config.cfg needs assembling) and the new hashes (saved per device after it is deployed).
+# svc_dm_store is from create_svc_dm, if is not defined (services not run) only the base, fabric and dflt_intf snippets are hashed.
+# groups is the Ansible groups so the fabric snippets are hashed with the loopbacks of all devices in the fabric (not just those in the play)
+
+    def change_impact(self, hostvars, hosts, groups, bse, fbc, svc_rtr, svc_dm_store, state_dir=None, dir_path=None):
+        tmpl_cache, hashes, snippets, build, remove = ({} for i in range(5))
+        # 1. FABRIC_VARS: The fabric template uses the loopbacks of all the other devices in the fabric groups (same as the template gets them),
+        # so a change in any of them changes all fabric snippets even if that device is not in the play (--limit)
+        inv_vars = {host: {var: hostvars[host].get(var) for var in INV_VARS} for host in hosts}
+        fbc_hosts = set()
+        for host_vars in inv_vars.values():
+            for dev_name in bse['device_name'].values():
+                fbc_hosts.update(groups.get((host_vars['fabric_group_prefix'] or '') + dev_name.split('-')[-1].lower(), []))
+        all_lp = self.dm_hash(sorted((host, hostvars[host].get('intf_lp')) for host in fbc_hosts))
+        tnt_dm = None
+        if svc_dm_store:
+            with open(os.path.join(svc_dm_store['store_dir'], 'svc_tnt.json')) as file_content:
+                tnt_dm = json.load(file_content)
+
+        for host in hosts:
+            network_os, host_vars = inv_vars[host]['ansible_network_os'], inv_vars[host]
+            # 2. INPUTS: Everything used by each snippet (other than the template), the services use their data-model from the svc_dm store
+            inputs = {'base': [bse, host_vars], 'fabric': [bse, fbc, host_vars, all_lp]}
+            # Like the svc_tnt, svc_intf and svc_rtr tasks the spines have no services snippets
+            if svc_dm_store and bse['device_name']['spine'] not in host:
+                svc_dm = self.load_svc_dm(svc_dm_store, host, tnt_dm)
+                inputs['svc_tnt'] = [bse['device_name'], svc_dm['svc_tnt']]
+                inputs['svc_intf'] = [fbc['adv']['bse_intf'], svc_dm['svc_intf']]
+                if svc_dm.get('svc_rtr') != None:
+                    inputs['svc_rtr'] = [fbc['route']['bgp']['as_num'], svc_rtr['adv'], svc_dm['svc_rtr']]
+                inputs['dflt_intf'] = [fbc['adv']['bse_intf'], host_vars, [intf['intf_num'] for intf in svc_dm['svc_intf']]]
+            else:
+                inputs['dflt_intf'] = [fbc['adv']['bse_intf'], host_vars, None]
+            # 3. HASH: Each snippet is a hash of its template and inputs
+            hashes[host] = {snippet: self.dm_hash(self.tmpl_hash(network_os, snippet, tmpl_cache), snip_inputs)
+                            for snippet, snip_inputs in inputs.items()}
+            # 4. COMPARE: A snippet is changed if its hash is different or it no longer exists (its config needs removing)
+            prev_hash = self.load_prev_hash(state_dir, host)
+            changed = [snippet for snippet in SNIPPETS if hashes[host].get(snippet) != prev_hash.get(snippet)]
+            if len(changed) != 0:
+                snippets[host] = changed
+            # 5. BUILD: A snippet is built if its hash or the hash of its .conf file is different to the manifest (or the file was deleted)
+            build[host], remove[host] = list(SNIPPETS) + ['config'], []
+            if dir_path:
+                build[host], remove[host] = self.build_impact(os.path.join(os.path.expanduser(dir_path), host), hashes[host])
+
+        impact = {'hosts': [host for host in hosts if host in snippets], 'snippets': snippets, 'build': build, 'remove': remove, 'hashes': hashes}
+        if dir_path:
+            self.save_report(os.path.join(dir_path, 'reports'), impact)
+        return impact
+
+###################################### BUILD MANIFEST: Make-style rebuild of only the changed snippets ######################################
+# The manifest has the hash of each snippets inputs (from change_impact) and the hash of the .conf file created from them, plus the hash of config.cfg.
+# config.cfg is only re-assembled if a snippet was built or removed or it is not the file that was assembled last time
+
+    def build_impact(self, host_dir, host_hashes):
+        manifest = self.load_manifest(host_dir)
+        build = []
+        for snippet, snip_hash in host_hashes.items():
+            prev = manifest['snippets'].get(snippet, {})
+            if prev.get('input') != snip_hash or prev.get('content') != self.file_hash(os.path.join(host_dir, 'config', snippet + '.conf')):
+                build.append(snippet)
+        # Snippets no longer created (such as no svc_rtr) still have a .conf file from the last build that needs deleting
+        remove = [snippet for snippet in SNIPPETS if snippet not in host_hashes and os.path.exists(os.path.join(host_dir, 'config', snippet + '.conf'))]
+        if len(build) != 0 or len(remove) != 0 or manifest.get('config') != self.file_hash(os.path.join(host_dir, 'config', 'config.cfg')):
+            build.append('config')
+        return build, remove
+
+    # Creates the manifest of a device after its snippets are built and assembled, host_hashes is change_impact.hashes of the device
+    def build_manifest(self, host_hashes, host_dir):
+        host_dir = os.path.expanduser(host_dir)
+        return {'snippets': {snippet: {'input': snip_hash, 'content': self.file_hash(os.path.join(host_dir, 'config', snippet + '.conf'))}
+                             for snippet, snip_hash in host_hashes.items()},
+                'config': self.file_hash(os.path.join(host_dir, 'config', 'config.cfg'))}
@@ -0,0 +1,70 @@
+'''
+Splits the devices being deployed into waves, all the devices in a wave are deployed at the same time and the next wave started once it has finished.
+Both members of an MLAG pair are never in the same wave and there is never more than max_spines spines in a wave (0 is no limit). If max_size is
+set there is never more than that number of devices in a wave. The least waves possible are used with the devices spread evenly across them.
+MLAG pairs are the leafs and borders whose mlag_peer_ip (their address on the MLAG peer-link) are in the same subnet, or if there is no mlag_peer_ip
+by the odd/even device number (01 and 02, 03 and 04, etc) like the fabric template.
+'''
+
+import math
+import ipaddress
+
+
+class FilterModule(object):
+    def filters(self):
+        return {
+            'deploy_waves': self.deploy_waves
+        }
+
+    # PEERS: Returns the MLAG peer of each device, devices without a peer being deployed (such as not changed) are not in it
+    def mlag_peers(self, hostvars, hosts):
+        peer_link, peer = {}, {}
+        for host in hosts:
+            if hostvars[host].get('mlag_peer_ip'):
+                peer_link.setdefault(str(ipaddress.ip_interface(str(hostvars[host]['mlag_peer_ip'])).network), []).append(host)
+            elif host[-2:].isdigit():
+                peer_link.setdefault(host[:-2] + str((int(host[-2:]) + 1) // 2), []).append(host)
+        for members in peer_link.values():
+            if len(members) == 2:
+                peer[members[0]], peer[members[1]] = members[1], members[0]
+        return peer
+
+###################################### DEPLOY WAVES: Schedules the devices into waves ######################################
+# Returns the list of waves (list of devices), the wave of each device, the MLAG peer of each device, the spines and the max spines per wave
+
+    def deploy_waves(self, hostvars, hosts, bse, max_spines=1, max_size=0):
+        spines = [host for host in hosts if bse['device_name']['spine'] in host]
+        peer = self.mlag_peers(hostvars, [host for host in hosts if host not in spines])
+        pairs = sorted(set(tuple(sorted([host, host_peer])) for host, host_peer in peer.items()))
+        singles = [host for host in hosts if host not in spines and host not in peer]
+
+        # 1. NUM_WAVES: Needs two waves for MLAG pairs, enough for the spines and if max_size enough for all the devices
+        num_waves = max(1, 2 if len(pairs) != 0 else 1, int(math.ceil(len(spines) / float(max_spines))) if max_spines else 1,
+                        int(math.ceil(len(hosts) / float(max_size))) if max_size else 1)
+        waves, wave_spines = ([[] for i in range(num_waves)] for i in range(2))
+
+        # 2. LEAST: The wave with the least devices (first if the same) that the device can go in, adds a wave if none can take it
+        def least_wave(spine=False, not_wave=None):
+            options = [num for num, wave in enumerate(waves) if num != not_wave and (not max_size or len(wave) < max_size) and
+                       (not spine or not max_spines or len(wave_spines[num]) < max_spines)]
+            if len(options) == 0:
+                waves.append([])
+                wave_spines.append([])
+                return len(waves) - 1
+            return min(options, key=lambda num: (len(waves[num]), num))
+
+        # 3. ASSIGN: Spines are spread across the waves, then each MLAG pairs members put in different waves and lastly the single devices
+        for host in spines:
+            num = least_wave(spine=True)
+            waves[num].append(host)
+            wave_spines[num].append(host)
+        for host, host_peer in pairs:
+            num = least_wave()
+            waves[num].append(host)
+            waves[least_wave(not_wave=num)].append(host_peer)
+        for host in singles:
+            waves[least_wave()].append(host)
+
+        waves = [sorted(wave) for wave in waves if len(wave) != 0]
+        return {'waves': waves, 'wave': {host: num for num, wave in enumerate(waves) for host in wave}, 'peer': peer, 'spines': spines,
+                'max_spines': max_spines}
@@ -1,11 +1,205 @@
+import os
+import re
+import copy
+import json
+import tempfile
+from functools import lru_cache
 from collections import defaultdict
 
+# Splits a device name into its name and number (all the trailing digits)
+RE_DEV_NUM = re.compile(r'^(.*?)(\d+)$')
+
+
+###################################### VLAN RANGES: Used by vlan_seq ######################################
+# Works on (first, last) ranges so the VLANs are never expanded. The ranges are sorted and any that overlap or are next to each other merged,
+# so '1-4094' is one range whatever its size. Is cached as the same trunk VLANs are normally used on many interfaces and devices
+
+@lru_cache(maxsize=4096)
+def vlan_ranges(vlans):
+    # 1. Creates a list of (first, last) ranges, vlans is a string of VLANs and ranges spilt by ',' and '-' or a tuple of VLANs
+    ranges, vlan_seq = [], []
+    for vl in (vlans.split(',') if isinstance(vlans, str) else vlans):
+        if isinstance(vl, str) and '-' in vl:
+            ranges.append((int(vl.split('-')[0]), int(vl.split('-')[1])))
+        else:
+            ranges.append((int(vl), int(vl)))
+    # 2. Order the ranges and merge any that overlap or are sequential
+    for first, last in sorted(ranges):
+        if first > last:
+            continue
+        if len(vlan_seq) != 0 and first <= vlan_seq[-1][1] + 1:
+            vlan_seq[-1][1] = max(vlan_seq[-1][1], last)
+        else:
+            vlan_seq.append([first, last])
+    # 3. Return it as one big string
+    return ','.join(str(first) if first == last else '{}-{}'.format(first, last) for first, last in vlan_seq)
+
+
+###################################### INTF ALLOCATOR: Free interface, loopback and port-channel numbers ######################################
+# The free numbers in a reserved range are held as a bitmap (bit 0 is the first number), so taking a number or getting the lowest free number is O(1).
+# Assign gives each key (interface) the number it had before (prev) if that is still free, then the lowest free numbers to the rest in order
+
+class IntfAllocator(object):
+    def __init__(self, first, last, used=()):
+        self.first = first
+        self.free = (1 << (last - first + 1)) - 1 if last >= first else 0
+        for num in used:
+            self.take(num)
+
+    # TAKE: Marks the number as used, returns False if it is outside the range or already used
+    def take(self, num):
+        if not isinstance(num, int) or num < self.first or not (self.free >> (num - self.first)) & 1:
+            return False
+        self.free &= ~(1 << (num - self.first))
+        return True
+
+    # NEXT_FREE: Lowest free number (lowest set bit), None if there are no free numbers left
+    def next_free(self):
+        if self.free == 0:
+            return None
+        lowest = self.free & -self.free
+        self.free ^= lowest
+        return self.first + lowest.bit_length() - 1
+
+    def assign(self, keys, prev):
+        nums = [num if self.take(num) else None for num in (prev.get(key) for key in keys)]
+        return [num if num != None else self.next_free() for num in nums]
+
+
+###################################### PREFIX-LIST OPTIMISER: Used by svc_rtr_dm if adv.optimise_pl is True ######################################
+# Each entry is held as (network, length, ge, le) integers, so '10.1.1.0/24' is 10.1.1.0/24 ge 24 le 24 and '0.0.0.0/0 le 32' is 0.0.0.0/0 ge 0 le 32.
+# An entry is dropped if an earlier entry in the same prefix-list matches everything it does (found using a binary trie of the earlier entries).
+# Entries next to each other with the same action can be in any order, so within them prefixes with the same ge/le that are inside another are
+# dropped and sibling prefixes (10.1.1.0/25 and 10.1.1.128/25) joined into their parent (10.1.1.0/24 ge 25 le 25). It matches the same routes,
+# the entries are kept in the same order and renumbered from 5 in steps of 5
+
+def pfx_range(pfx):
+    # Returns None if is not a valid prefix (is kept as it is and not optimised)
+    pfx = str(pfx).split()
+    options = dict(zip(pfx[1::2], pfx[2::2]))
+    try:
+        addr, length = pfx[0].split('/')
+        octets, length = [int(octet) for octet in addr.split('.')], int(length)
+        ge = int(options['ge']) if 'ge' in options else length
+        le = int(options['le']) if 'le' in options else (32 if 'ge' in options else length)
+    except ValueError:
+        return None
+    if len(pfx) % 2 == 0 or not set(options) <= {'ge', 'le'} or len(octets) != 4 or not all(0 <= octet <= 255 for octet in octets):
+        return None
+    net = (octets[0] << 24) + (octets[1] << 16) + (octets[2] << 8) + octets[3]
+    if not 0 <= length <= ge <= le <= 32 or net >> (32 - length) << (32 - length) != net:
+        return None
+    return (net, length, ge, le)
+
+
+def pfx_str(net, length, ge, le):
+    pfx = '{}.{}.{}.{}/{}'.format(net >> 24, (net >> 16) & 255, (net >> 8) & 255, net & 255, length)
+    if ge > length:
+        return pfx + ' ge {}'.format(ge) + (' le {}'.format(le) if le != 32 else '')
+    elif le > length:
+        return pfx + ' le {}'.format(le)
+    return pfx
+
+
+class PfxTrie(object):
+    def __init__(self):
+        self.root = {}
+
+    def add(self, net, length, ge, le):
+        node = self.root
+        for bit in range(length):
+            node = node.setdefault((net >> (31 - bit)) & 1, {})
+        node.setdefault('range', []).append((ge, le))
+
+    # COVERS: True if an entry for this prefix or one it is inside has a ge/le range that includes this ge/le range
+    def covers(self, net, length, ge, le):
+        node = self.root
+        for bit in range(length + 1):
+            if any(node_ge <= ge and le <= node_le for node_ge, node_le in node.get('range', [])):
+                return True
+            if bit == length:
+                return False
+            node = node.get((net >> (31 - bit)) & 1)
+            if node == None:
+                return False
+
+
+def merge_pfx(entries):
+    # Entries is {(ge, le): {(net, length): position}}, the joined prefixes keep the position of the first prefix in them so the order only changes if needed
+    merged = []
+    for (ge, le), group in entries.items():
+        # 1. INSIDE: Drops any prefixes that are inside another prefix with the same ge/le
+        pfx_len = defaultdict(dict)
+        for (net, length), pos in group.items():
+            if not any((net >> (32 - anc_len) << (32 - anc_len), anc_len) in group for anc_len in range(length)):
+                pfx_len[length][net] = pos
+        # 2. SIBLINGS: Joins siblings into their parent, starting at the longest prefixes so the parents can then be joined
+        for length in range(32, 0, -1):
+            for net in sorted(pfx_len[length]):
+                sibling = net ^ (1 << (32 - length))
+                if net in pfx_len[length] and sibling in pfx_len[length]:
+                    pos = min(pfx_len[length].pop(net), pfx_len[length].pop(sibling))
+                    pfx_len[length - 1][net & ~(1 << (32 - length))] = pos
+        merged.extend((pos, (net, length, ge, le)) for length, nets in pfx_len.items() for net, pos in nets.items())
+    return [rng for pos, rng in sorted(merged)]
+
+
+def optimise_pfx_lst(all_pfx_lst):
+    # 1. Splits into prefix-lists (in the order first seen) with the entries in sequence number order
+    pfx_lst = defaultdict(list)
+    for pl_name, seq, action, pfx in all_pfx_lst:
+        pfx_lst[pl_name].append((seq, action, pfx))
+    optimised = []
+    for pl_name, entries in pfx_lst.items():
+        # 2. SHADOW: Drops entries that an earlier entry matches all of, invalid prefixes are kept and end a run of the same action
+        trie, runs = PfxTrie(), []
+        for seq, action, pfx in sorted(entries):
+            rng = pfx_range(pfx)
+            if rng == None:
+                runs.append((action, pfx))
+            elif not trie.covers(*rng):
+                trie.add(*rng)
+                if len(runs) == 0 or not isinstance(runs[-1], list) or runs[-1][0] != action:
+                    runs.append([action, defaultdict(dict)])
+                runs[-1][1][rng[2:]].setdefault(rng[:2], seq)
+        # 3. MERGE: Joins the prefixes in each run of the same action and numbers the entries from 5 in steps of 5
+        pl_seq = 0
+        for run in runs:
+            for pfx in ([run[1]] if isinstance(run, tuple) else [pfx_str(*rng) for rng in merge_pfx(run[1])]):
+                pl_seq += 5
+                optimised.append((pl_name, pl_seq, run[0], pfx))
+    return optimised
+
+
+###################################### SVC DM STORE: Tenant, interface and routing data-models of all devices ######################################
+# The data-models are created for all devices in one go (run_once) and saved as files in the store (a directory in ans.dir_path so is per run).
+# The fact is just a handle of {store_dir, hosts}, templates load that devices data-models with the svc_dm filter (each file is only read once per process)
+
+def save_json(file_name, data):
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(file_name))
+    with os.fdopen(fd, 'w') as file_content:
+        json.dump(data, file_content)
+    os.replace(tmp_file, file_name)
+
+
+@lru_cache(maxsize=16)
+def load_json(file_name, mtime):
+    with open(file_name) as file_content:
+        return json.load(file_content)
+
+
 class FilterModule(object):
     def filters(self):
         return {
             'create_svc_tnt_dm': self.svc_tnt_dm,
+            'create_svc_intf_idx': self.svc_intf_idx,
             'create_svc_intf_dm': self.svc_intf_dm,
-            'create_svc_rtr_dm': self.svc_rtr_dm
+            'create_svc_rtr_idx': self.svc_rtr_idx,
+            'create_svc_rtr_host_dm': self.svc_rtr_host_dm,
+            'create_svc_rtr_dm': self.svc_rtr_dm,
+            'create_svc_dm': self.svc_dm_compile,
+            'svc_dm': self.svc_dm,
+            'vlan_seq': self.vlan_seq
         }
 
 
@@ -86,59 +280,91 @@ class FilterModule(object):
 
         return [leaf_tnt, border_tnt, self.vlan_seq(lf_vlan_numb), self.vlan_seq(bdr_vlan_numb)]
 
+###################################### TNT VLAN PRUNING: Uses the TNT DATA-MODEL and INTF INDEX ######################################
+# Optional (svc_tnt.adv.prune_vlans), each switch only gets the tenant VLANs (and so VNIs and SVIs) used by the access and trunk interfaces on it or its
+# MLAG peer (both need the same VLANs). The VRFs and L3VNI VLANs are kept on all switches as can also be used by layer3 interfaces and routing
+
+    # VLAN_SWITCH: Index of {vlan: [switches]} for the tenant VLANs, made from the VLANs allowed on each switches layer2 interfaces
+    def vlan_switch_idx(self, svc_tnt_dm, svc_intf_idx):
+        vlan_switch = defaultdict(list)
+        tnt_vlans = sorted(set(vl['num'] for flt_tnt in svc_tnt_dm[0] + svc_tnt_dm[1] for vl in flt_tnt['vlans'] if vl['num'] != flt_tnt['tnt_vlan']))
+        for switch, all_intf in svc_intf_idx['switch_intf'].items():
+            switch_vlans = ','.join(str(intf['ip_vlan']) for intf in all_intf if intf['type'] not in ['layer3', 'loopback'])
+            if switch_vlans == '':
+                continue
+            # Ranges are merged so is [(first, last)] of the VLANs, moves through them with the tenant VLANs (both are in order)
+            all_range = [(int(vl.split('-')[0]), int(vl.split('-')[-1])) for vl in vlan_ranges(switch_vlans).split(',')]
+            rng_idx = 0
+            for vlan in tnt_vlans:
+                while rng_idx < len(all_range) and all_range[rng_idx][1] < vlan:
+                    rng_idx += 1
+                if rng_idx < len(all_range) and all_range[rng_idx][0] <= vlan:
+                    vlan_switch[vlan].append(switch)
+        return dict(vlan_switch)
+
+    # MLAG_PEER: Odd numbered switches are paired with the next switch number, even with the one before. The number is all the trailing
+    # digits (same as the inventory names them, device_name + at least 2 digits) so LEAF100 is paired with LEAF99 not LEAF1-1
+    def mlag_peer(self, switch):
+        switch_name, switch_num = RE_DEV_NUM.match(switch).groups()
+        switch_num = int(switch_num)
+        return switch_name + "{:02d}".format(switch_num + 1 if switch_num % 2 == 1 else switch_num - 1)
+
+    def prune_svc_tnt_dm(self, svc_tnt_dm, vlan_switch, hostname, vpc_peer_vlan):
+        switches = {hostname, self.mlag_peer(hostname)}
+        host_tnt_dm = []
+        for all_tnt in svc_tnt_dm[:2]:
+            host_tnt, vlan_numb = [], [1, vpc_peer_vlan]
+            for flt_tnt in all_tnt:
+                # L3VNI VLAN is always kept, it is only in the VLAN list (vlan_numb) if is a L3 tenant
+                vlans = [vl for vl in flt_tnt['vlans'] if vl['num'] == flt_tnt['tnt_vlan'] or not switches.isdisjoint(vlan_switch.get(vl['num'], []))]
+                vlan_numb.extend(vl['num'] for vl in vlans if vl['num'] != flt_tnt['tnt_vlan'] or flt_tnt['l3_tnt'] == True)
+                host_tnt.append(dict(flt_tnt, vlans=vlans))
+            host_tnt_dm.append((host_tnt, self.vlan_seq(vlan_numb)))
+        return [host_tnt_dm[0][0], host_tnt_dm[1][0], host_tnt_dm[0][1], host_tnt_dm[1][1]]
+
 
 
 ################################################## DRY Functions used by INTF DATA-MODEL ##################################################
 
     #VLAN SEQ: Method used by main ' svc_intf_dm' method to change sequental vlans so that they are separated by '-' as per the "trunk allowed vlans" config syntax
+    # Is also the vlan_seq filter so can be used in templates. Lists are made into tuples so the result can be cached (by vlan_ranges)
     def vlan_seq(self, vlans):
-        # 1. Creates a list of all vlans, doesnt matter if int, or str spilt by ',' or '-'
-        vlan_list, vlan_seq_lists, vlan_seq = ([] for i in range(3))
         if isinstance(vlans, int) == True:
-            vlan_list.append(vlans)
+            vlans = (vlans,)
         elif isinstance(vlans, list) == True:
-            vlan_list = vlans
-        else:
-            for vl in vlans.split(','):
-                if '-' in vl:
-                    for each_vl in range(int(vl.split('-')[0]), int(vl.split('-')[1]) +1):
-                        vlan_list.append(each_vl)
-                else:
-                    vlan_list.append(int(vl))
-        # 2. Order the list and create mini lists of sequnetial vlans
-        for vlan in sorted(vlan_list):
-            if not vlan_seq_lists:
-                vlan_seq_lists.append([vlan])
-                continue
-            if vlan_seq_lists[-1][-1] == vlan - 1:
-                    vlan_seq_lists[-1].append(vlan)
-            else:
-                vlan_seq_lists.append([vlan])
-        # 3. Join the mini lists together
-        for vlan in vlan_seq_lists:
-            if len(vlan) == 1:
-                vlan_seq.extend(vlan)
-            else:
-                vlan_seq.append('{}-{}'.format(vlan[0], vlan[-1]))
-        # Return it as one big string
-        return ','.join([str(elem) for elem in vlan_seq])
-
-###################################### INTF DATA-MODEL: Uses input from service_interface.yml ######################################
-# Creates a per-device data model of all interfaces to be configured on that device
-
-    def svc_intf_dm(self, all_homed, hostname, intf_adv, bse_intf):
-        sl_hmd = intf_adv['single_homed']
-        dl_hmd = intf_adv['dual_homed']
-        intf_fmt = bse_intf['intf_fmt']
-        lp_fmt = bse_intf['lp_fmt']
-        ec_fmt = bse_intf['ec_fmt']
-        tmp_all_intf, have_intf, sl_need_intf, dl_need_intf, all_intf_num, sl_range, dl_range, need_po, all_po_num, po_range = ([] for i in range(10))
-        all_lp_num, lp_need_intf, lp_range = ([] for i in range(3))
-
-        # 1. DEFAULTS: Fill out default values and change the nested dict into a list
+            vlans = tuple(vlans)
+        return vlan_ranges(vlans)
+
+    # INTF_KEYS: Identity of each interface used in the state file (homed or loopback and the description), a number is added to any duplicate descriptions
+    def intf_keys(self, host_intf):
+        intf_key, seen = {}, defaultdict(int)
+        for intf in host_intf:
+            key = ('loopback' if intf['type'] == 'loopback' else 'dual_homed' if intf['dual_homed'] else 'single_homed') + ':' + str(intf['descr'])
+            seen[key] += 1
+            intf_key[id(intf)] = key if seen[key] == 1 else key + '#' + str(seen[key])
+        return intf_key
+
+    # INTF_STATE: Interface, loopback and PO numbers assigned to each interface last time, are kept in the state_dir (if set) per device
+    def load_intf_state(self, state_dir, hostname):
+        intf_state = {'lp': {}, 'intf': {}, 'po': {}}
+        if state_dir:
+            try:
+                with open(os.path.join(os.path.expanduser(state_dir), hostname, 'svc_intf_alloc.json')) as file_content:
+                    intf_state.update(json.load(file_content))
+            except (IOError, OSError, ValueError):
+                pass
+        return intf_state
+
+###################################### INTF INDEX: Uses input from service_interface.yml ######################################
+# Run once for all devices, splits the interfaces up per-switch so each device only has to look up its own interfaces rather than go through all of them.
+# Single-homed and loopback interfaces are added to each switch in the switch list, dual-homed to each switch and its MLAG peer (the next switch number)
+
+    def svc_intf_idx(self, all_homed):
+        switch_intf = defaultdict(list)
         for homed, interfaces in all_homed.items():
             for intf in interfaces:
-                # Adds homed as a dict and adds some default value dicts
+                # 1. DEFAULTS: Copies the interface (the input is left as it was) and adds homed and some default value dicts
+                intf = dict(intf)
                 intf.setdefault('intf_num', None)
                 if homed == 'single_homed':
                     intf['dual_homed'] = False
@@ -157,12 +383,41 @@ class FilterModule(object):
                     intf['stp'] = 'normal'
                 elif intf['type'] == 'non_stp_trunk':
                     intf['stp'] = 'edge'
-                tmp_all_intf.append(intf)
-        a = []
+
+                # 2. SWITCH: Adds the interface to each switch it is created on (only once if both MLAG peers are in the switch list)
+                switches = intf.pop('switch')
+                if isinstance(switches, str):
+                    switches = [switches]
+                intf_switch = []
+                for switch in switches:
+                    intf_switch.append(switch)
+                    if intf['dual_homed'] == True:
+                        intf_switch.append(self.mlag_peer(switch))
+                for switch in sorted(set(intf_switch), key=intf_switch.index):
+                    switch_intf[switch].append(intf)
+        return {'switch_intf': dict(switch_intf)}
+
+###################################### INTF DATA-MODEL: Uses input from service_interface.yml ######################################
+# Creates a per-device data model of all interfaces to be configured on that device. Uses the index from svc_intf_idx (created once and used by all
+# devices), if given the service_interface.yml interfaces instead the index is created first
+
+    def svc_intf_dm(self, all_homed, hostname, intf_adv, bse_intf, state_dir=None):
+        sl_hmd = intf_adv['single_homed']
+        dl_hmd = intf_adv['dual_homed']
+        intf_fmt = bse_intf['intf_fmt']
+        lp_fmt = bse_intf['lp_fmt']
+        ec_fmt = bse_intf['ec_fmt']
+        have_intf, sl_need_intf, dl_need_intf, all_intf_num, need_po, all_po_num, all_lp_num, lp_need_intf = ([] for i in range(8))
+
+        # 1. INDEX: Gets only this devices interfaces, copied as the interface numbers are added to them
+        if 'switch_intf' not in all_homed:
+            all_homed = self.svc_intf_idx(all_homed)
+        host_intf = [dict(intf) for intf in all_homed['switch_intf'].get(hostname, [])]
+
         # 2. FILTER:Creates new lists of all interfaces (all_intf_num, all_lp_num), intf with defined port (have_intf) and intf with non-defined ports (lp_need_intf, sl_need_intf, dh_need_intf)
-        for intf in tmp_all_intf:
-            # SH: Single-homed to be created if hostname is in the list of switches
-            if intf['dual_homed'] == False and hostname in intf['switch']:
+        for intf in host_intf:
+            # SH: Single-homed interfaces on this switch
+            if intf['dual_homed'] == False:
                 # LP: Loopback interfaces to be created on this deivce
                 if intf['type'] == 'loopback':
                     if intf['intf_num'] == None:
@@ -179,53 +434,32 @@ class FilterModule(object):
                         all_intf_num.append(intf['intf_num'])                       # List of all used interface numbers
                         intf['intf_num'] = intf_fmt + str(intf['intf_num'])         # Adds the interface name to the number
                         have_intf.append(intf)                                      # List of interfaces that have an interface number
-            # DH: Dual-homed interfaces need to be created on both MLAG pairs so logic matches both hostnames
+            # DH: Dual-homed interfaces, the index has them on both MLAG pairs
             elif intf['dual_homed'] == True:
-                if hostname in intf['switch'] or hostname[:-2] + "{:02d}".format(int(hostname[-2:]) -1) in intf['switch']:
-                    if intf['intf_num'] == None:
-                        dl_need_intf.append(intf)
-                    else:
-                        all_intf_num.append(intf['intf_num'])
-                        intf['intf_num'] = intf_fmt + str(intf['intf_num'])
-                        have_intf.append(intf)
-            del intf['switch']                                                  # Removes as no longer needed
-
-        # 3. INTF_RANGES: Adjust interface assignment ranges to remove any already used interfaces
-        # Loopback
-        for intf_num in range(sl_hmd['first_lp'], sl_hmd['last_lp'] + 1):
-            lp_range.append(intf_num)
-        lp_range = set(lp_range) - set(all_lp_num)
-        lp_range = list(lp_range)
-        lp_range.sort()
-        # Single-homed
-        for intf_num in range(sl_hmd['first_intf'], sl_hmd['last_intf'] + 1):
-            sl_range.append(intf_num)
-        sl_range = set(sl_range) - set(all_intf_num)
-        sl_range = list(sl_range)
-        sl_range.sort()
-       # Dual-homed
-        for intf_num in range(dl_hmd['first_intf'], dl_hmd['last_intf'] + 1):
-            dl_range.append(intf_num)
-        dl_range = set(dl_range) - set(all_intf_num)
-        dl_range = list(dl_range)
-        dl_range.sort()
-
-        # 4. INTF_ASSIGN:  Assigns an interface number and adds that number to the existing interface DM
-        # Loopback
-        for intf, int_num in zip(lp_need_intf, lp_range):
-            if intf['type'] == 'loopback':
-                intf['intf_num'] = lp_fmt + str(int_num)
-                have_intf.append(intf)
-        # Single-homed
-        for intf, int_num in zip(sl_need_intf, sl_range):
-            if intf['dual_homed'] == False:
-                intf['intf_num'] = intf_fmt + str(int_num)
-                have_intf.append(intf)
-        # Dual-homed
-        for intf, int_num in zip(dl_need_intf, dl_range):
-            if intf['dual_homed'] == True:
-                intf['intf_num'] = intf_fmt + str(int_num)
-                have_intf.append(intf)
+                if intf['intf_num'] == None:
+                    dl_need_intf.append(intf)
+                else:
+                    all_intf_num.append(intf['intf_num'])
+                    intf['intf_num'] = intf_fmt + str(intf['intf_num'])
+                    have_intf.append(intf)
+
+        # 3. ALLOCATORS: Free numbers of the reserved ranges minus any already used interfaces, previous assignments are got from the state file
+        lp_pool = IntfAllocator(sl_hmd['first_lp'], sl_hmd['last_lp'], all_lp_num)
+        sl_pool = IntfAllocator(sl_hmd['first_intf'], sl_hmd['last_intf'], all_intf_num)
+        dl_pool = IntfAllocator(dl_hmd['first_intf'], dl_hmd['last_intf'], all_intf_num)
+        prev_state = self.load_intf_state(state_dir, hostname)
+        intf_state = {'lp': {}, 'intf': {}, 'po': {}}
+        intf_key = self.intf_keys(host_intf)
+
+        # 4. INTF_ASSIGN: Interfaces keep the number they had last time if it is still free, new ones get the lowest free number. Any that dont fit are dropped
+        for need_intf, pool, fmt, pool_name in [(lp_need_intf, lp_pool, lp_fmt, 'lp'), (sl_need_intf, sl_pool, intf_fmt, 'intf'),
+                                                (dl_need_intf, dl_pool, intf_fmt, 'intf')]:
+            keys = [intf_key[id(intf)] for intf in need_intf]
+            for intf, key, int_num in zip(need_intf, keys, pool.assign(keys, prev_state[pool_name])):
+                if int_num != None:
+                    intf_state[pool_name][key] = int_num
+                    intf['intf_num'] = fmt + str(int_num)
+                    have_intf.append(intf)
 
         # 5. PO: Adds PO to interface and adds a port-channel interface with the VPC number
         all_intf = []
@@ -243,18 +477,18 @@ class FilterModule(object):
             else:
                 all_intf.append(intf)
 
-        # Adjust PO assignment ranges to remove any already used POs
-        for po_num in range(dl_hmd['first_po'], dl_hmd['last_po'] + 1):
-            po_range.append(po_num)
-        po_range = set(po_range) - set(all_po_num)
-        po_range = list(po_range)
-        po_range.sort()
-        # Adds PO to interface and adds a port-channel interface with the VPC number
-        for intf, po_num in zip(need_po, po_range):
-            intf['po_num'] = po_num
-            all_intf.append(intf)
-            all_intf.append({'intf_num': ec_fmt + str(intf['po_num']), 'descr': intf['descr'], 'type': intf['type'],
-                             'ip_vlan': intf['ip_vlan'], 'vpc_num': intf['po_num'], 'stp': intf['stp']})
+        # POs keep the number they had last time if still free (not used by a static PO), new POs get the lowest free number
+        po_pool = IntfAllocator(dl_hmd['first_po'], dl_hmd['last_po'], all_po_num)
+        keys = [intf_key[id(intf)] for intf in need_po]
+        for intf, key, po_num in zip(need_po, keys, po_pool.assign(keys, prev_state['po'])):
+            if po_num != None:
+                intf_state['po'][key] = po_num
+                intf['po_num'] = po_num
+                all_intf.append(intf)
+                all_intf.append({'intf_num': ec_fmt + str(intf['po_num']), 'descr': intf['descr'], 'type': intf['type'],
+                                 'ip_vlan': intf['ip_vlan'], 'vpc_num': intf['po_num'], 'stp': intf['stp']})
+        # The new assignments are not saved here (the data-model is also built by check-mode and render only runs), they are saved once deployed
+        self.intf_alloc = intf_state
 
         # Adjusts allowed VLAN ranges if sequential (is only needed for post_val, config would automatically do it anyway)
         for intf in all_intf:
@@ -415,10 +649,111 @@ class FilterModule(object):
         return rm_name
 
 
+# DEDUP_NAMES: Returns a dict of {name: name_to_use}, names with the same content (list of entries) all use the first of the names alphabetically
+    def dedup_names(self, all_entries):
+        content_name = {}
+        for name in sorted(all_entries):
+            content_name.setdefault(tuple(sorted(all_entries[name])), name)
+        return {name: content_name[tuple(sorted(entries))] for name, entries in all_entries.items()}
+
+# DEDUP PL/RM: Identical prefix-lists and BGP group/peer route-maps are only created once and used by all of the groups/peers that have them.
+# Redist route-maps are left as they are as the connected ones are also part created by svc_tnt. Returns the number of config lines saved
+    def dedup_pfx_lst_rm(self, group, peer):
+        # 1. PFX_LST: Removes the duplicate prefix-lists and changes any route-maps that used them to use the one that is kept
+        pl_entries = defaultdict(list)
+        for pl_name, seq, action, pfx in self.all_pfx_lst:
+            pl_entries[pl_name].append((seq, action, pfx))
+        pl_dedup = self.dedup_names(pl_entries)
+        num_pl = len(self.all_pfx_lst)
+        self.all_pfx_lst = [pl for pl in self.all_pfx_lst if pl_dedup[pl[0]] == pl[0]]
+        self.all_rm = [(rm[0], rm[1], pl_dedup.get(rm[2], rm[2]), rm[3]) for rm in self.all_rm]
+
+        # 2. RM: Removes the duplicate BGP route-maps and changes the groups and peers that used them to use the one that is kept
+        bgp_peers = list(group.values()) + [pr for all_pr in peer.values() for pr in all_pr]
+        bgp_rm = set(bgp[direction] for bgp in bgp_peers for direction in ['inbound_rm', 'outbound_rm'] if bgp.get(direction) != None)
+        rm_entries = defaultdict(list)
+        for rm in self.all_rm:
+            if rm[0] in bgp_rm:
+                rm_entries[rm[0]].append(rm[1:])
+        rm_dedup = self.dedup_names(rm_entries)
+        rm_lines = 0
+        for rm in self.all_rm:
+            if rm_dedup.get(rm[0], rm[0]) != rm[0]:
+                # Route-map line and the match and set lines (if used)
+                rm_lines += 1 + (rm[2] != None) + (rm[3][0] != None)
+        self.all_rm = [rm for rm in self.all_rm if rm_dedup.get(rm[0], rm[0]) == rm[0]]
+        for bgp in bgp_peers:
+            for direction in ['inbound_rm', 'outbound_rm']:
+                if bgp.get(direction) != None:
+                    bgp[direction] = rm_dedup[bgp[direction]]
+        return {'pfx_lst': num_pl - len(self.all_pfx_lst), 'rm': rm_lines}
+
+
+###################################### RTR INDEX: Uses input from service_routing.yml ######################################
+# Run once for all devices, splits the BGP groups, BGP tenants, OSPF processes and static routes up per-switch so each device only has to go through its own.
+# Each switch gets a copy of the group, tenant or process with only the peers, networks, summaries, redists, interfaces or routes on that switch
+# (the input is left as it was). A peer, interface, etc uses the switch of the group, tenant or process it is in if it doesnt have its own switch
+
+    def rtr_switches(self, element, parent_switch):
+        switch = element.get('switch', parent_switch)
+        return {switch} if isinstance(switch, str) else set(switch)
+
+    def svc_rtr_idx(self, bgp_grps, bgp_tnt, ospf, static_route):
+        switch_rtr = defaultdict(lambda: {'bgp_grp': [], 'bgp_tnt': {}, 'ospf': [], 'static_route': []})
+        # 1. BGP_GRP: Group is only added to the switches it has peers on
+        for grp in bgp_grps:
+            grp_peer = defaultdict(list)
+            for each_peer in grp['peer']:
+                for switch in self.rtr_switches(each_peer, grp.get('switch', [])):
+                    grp_peer[switch].append(each_peer)
+            for switch, peers in grp_peer.items():
+                switch_rtr[switch]['bgp_grp'].append(dict(grp, peer=peers))
+        # 2. BGP_TNT: The tenant names are kept seperately as all tenants are in every devices data-model (even if it has no network, summary or redist)
+        for tnt in bgp_tnt:
+            tnt_elem = defaultdict(lambda: {'network': [], 'summary': [], 'redist': []})
+            for elem_type in ['network', 'summary', 'redist']:
+                for each_elem in tnt.get(elem_type) or []:
+                    for switch in self.rtr_switches(each_elem, tnt.get('switch', [])):
+                        tnt_elem[switch][elem_type].append(each_elem)
+            for switch, elems in tnt_elem.items():
+                switch_rtr[switch]['bgp_tnt'][tnt['name']] = dict(tnt, **elems)
+        # 3. OSPF: Process is only added to the switches it has interfaces on
+        for proc in ospf:
+            proc_elem = defaultdict(lambda: {'interface': [], 'summary': [], 'redist': []})
+            for elem_type in ['interface', 'summary', 'redist']:
+                for each_elem in proc.get(elem_type) or []:
+                    for switch in self.rtr_switches(each_elem, proc.get('switch', [])):
+                        proc_elem[switch][elem_type].append(each_elem)
+            for switch, elems in proc_elem.items():
+                if len(elems['interface']) != 0:
+                    switch_rtr[switch]['ospf'].append(dict(proc, **elems))
+        # 4. STATIC_ROUTE: Group is only added to the switches it has routes on
+        for grp in static_route:
+            grp_rte = defaultdict(list)
+            for each_route in grp['route']:
+                for switch in self.rtr_switches(each_route, grp.get('switch', [])):
+                    grp_rte[switch].append(each_route)
+            for switch, routes in grp_rte.items():
+                switch_rtr[switch]['static_route'].append(dict(grp, route=routes))
+        return {'switch_rtr': dict(switch_rtr), 'bgp_tnt': [tnt['name'] for tnt in bgp_tnt]}
+
+###################################### RTR HOST DATA-MODEL: Uses the RTR INDEX ######################################
+# Creates the per-device data-model from the devices entry in the index. The entry is copied as creating the data-model changes it
+
+    def svc_rtr_host_dm(self, svc_rtr_idx, hostname, adv, fbc):
+        host_rtr = copy.deepcopy(svc_rtr_idx['switch_rtr'].get(hostname, {}))
+        host_tnt = host_rtr.get('bgp_tnt', {})
+        bgp_tnt = [host_tnt.get(name, {'name': name}) for name in svc_rtr_idx['bgp_tnt']]
+        return self.build_svc_rtr_dm(hostname, host_rtr.get('bgp_grp', []), bgp_tnt, host_rtr.get('ospf', []), host_rtr.get('static_route', []), adv, fbc)
+
+    # Creates the per-device data-model straight from the service_routing.yml input (builds the index first)
+    def svc_rtr_dm(self, hostname, bgp_grps, bgp_tnt, ospf, static_route, adv, fbc):
+        return self.svc_rtr_host_dm(self.svc_rtr_idx(bgp_grps, bgp_tnt, ospf, static_route), hostname, adv, fbc)
+
 ###################################### RTR DATA MODEL: Uses input from service_routing.yml ######################################
 # Creates 7 data models for Prefix-lists, Route-maps, BGP groups, BGP peers, BGP tenants (network, summary, redist), OSPF processes, OSPF interfaces and static routes
 
-    def svc_rtr_dm(self, hostname, bgp_grps, bgp_tnt, ospf, static_route, adv, fbc):
+    def build_svc_rtr_dm(self, hostname, bgp_grps, bgp_tnt, ospf, static_route, adv, fbc):
         # These hold ALL prefix-lists and route-maps created by the external methods for all elements of BGP and OSPF (filtering, path manipulation & redistribution)
         self.all_pfx_lst, self.all_rm = ([] for i in range(2))
 
@@ -642,5 +977,62 @@ class FilterModule(object):
                     each_route['interface'] = each_route['interface'].replace(bse_intf['intf_short'], bse_intf['intf_fmt'])
 
 
+#### Optimise the prefix-lists (drops shadowed entries and joins prefixes) and share identical prefix-lists and route-maps (returns config lines saved)
+        if adv.get('optimise_pl') == True:
+            self.all_pfx_lst = optimise_pfx_lst(self.all_pfx_lst)
+        lines_saved = {'pfx_lst': 0, 'rm': 0}
+        if adv.get('dedup_pl_rm') == True:
+            lines_saved = self.dedup_pfx_lst_rm(group, peer)
+
 #### Output returned back to asnible to be used in the jinja2 template
-        return [self.all_pfx_lst, self.all_rm, dict(group), dict(peer), dict(tenant), ospf_proc, ospf_intf, dict(stc_rte)]
+        return [self.all_pfx_lst, self.all_rm, dict(group), dict(peer), dict(tenant), ospf_proc, ospf_intf, dict(stc_rte), lines_saved]
+
+
+###################################### SVC DM STORE: Creates and loads the data-models of all devices ######################################
+# Creates the tenant data-model and the interface and routing indexes once, then uses them to create the per-device data-models of all the hosts.
+# The tenant data-model is the same for all devices so is saved once (svc_tnt.json), the interface and routing data-models are saved per-device.
+# The devices file also has the interface numbers assigned to its service interfaces (svc_intf_alloc), the deploy role saves them to the state_dir
+
+    def svc_dm_compile(self, svc_tnt, svc_intf, svc_rtr, fbc, hosts, store_dir, state_dir=None):
+        store_dir = os.path.expanduser(store_dir)
+        if not os.path.isdir(store_dir):
+            os.makedirs(store_dir)
+        # 1. TNT: Input is copied as svc_tnt_dm adds to it. Uses the redist RM name from svc_rtr if it has one
+        svc_rtr = svc_rtr or {}
+        rm_name = svc_rtr.get('adv', {}).get('redist', {}).get('rm_name')
+        if rm_name == None:
+            rm_name = svc_tnt['adv']['redist']['rm_name']
+        tnt_dm = self.svc_tnt_dm(copy.deepcopy(svc_tnt['tnt']), svc_tnt['adv']['bse_vni'], svc_tnt['adv']['vni_incre'], fbc['adv']['mlag']['peer_vlan'],
+                                 rm_name, fbc['route']['bgp']['as_num'])
+        save_json(os.path.join(store_dir, 'svc_tnt.json'), tnt_dm)
+        # 2. INTF_RTR: Indexes are created once and used for the data-models of every device
+        intf_idx = self.svc_intf_idx(svc_intf['intf'])
+        bgp = svc_rtr.get('bgp', {})
+        rtr_idx = self.svc_rtr_idx(bgp.get('group', []), bgp.get('tenant', []), svc_rtr.get('ospf', []), svc_rtr.get('static_route', []))
+        # 3. PRUNE: If pruning the tenant VLANs each device gets its own tenant data-model
+        prune_vlans = svc_tnt['adv'].get('prune_vlans') == True
+        if prune_vlans:
+            vlan_switch = self.vlan_switch_idx(tnt_dm, intf_idx)
+        intf_alloc = []
+        for host in hosts:
+            host_dm = {'svc_intf': self.svc_intf_dm(intf_idx, host, svc_intf['adv'], fbc['adv']['bse_intf'], state_dir)}
+            # ALLOC: The interface numbers assigned to devices with service interfaces, saved to the state_dir by the deploy role once deployed
+            if len(intf_idx['switch_intf'].get(host, [])) != 0:
+                host_dm['svc_intf_alloc'] = self.intf_alloc
+                intf_alloc.append(host)
+            if prune_vlans:
+                host_dm['svc_tnt'] = self.prune_svc_tnt_dm(tnt_dm, vlan_switch, host, fbc['adv']['mlag']['peer_vlan'])
+            if svc_rtr.get('adv') != None:
+                host_dm['svc_rtr'] = self.svc_rtr_host_dm(rtr_idx, host, svc_rtr['adv'], fbc)
+            save_json(os.path.join(store_dir, host + '.json'), host_dm)
+        return {'store_dir': store_dir, 'hosts': list(hosts), 'intf_alloc': intf_alloc}
+
+    # Name is svc_tnt, svc_intf or svc_rtr. svc_tnt is the same for all devices (svc_tnt.json) unless the VLANs are pruned (is in the devices file)
+    def svc_dm(self, svc_dm_store, name, hostname=None):
+        if hostname != None:
+            file_name = os.path.join(svc_dm_store['store_dir'], hostname + '.json')
+            host_dm = load_json(file_name, os.path.getmtime(file_name))
+            if name in host_dm:
+                return host_dm[name]
+        file_name = os.path.join(svc_dm_store['store_dir'], name + '.json')
+        return load_json(file_name, os.path.getmtime(file_name))
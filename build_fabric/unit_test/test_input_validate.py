@@ -0,0 +1,149 @@
+"""Checks of the input_validate filter plugin error paths, uses small inputs made here rather than the unit_test var files (used by the playbook).
+Run from the build_fabric directory using "python -m pytest unit_test"
+"""
+
+import os
+import sys
+import copy
+import tempfile
+import yaml
+
+# Result cache is in a temp directory so it starts empty and does not touch the real cache
+os.environ['INPUT_VALIDATE_CACHE'] = os.path.join(tempfile.mkdtemp(), 'input_validate_cache.json')
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(BASE_DIR, 'filter_plugins'))
+from input_validate import FilterModule, VlanSet, PrefixIndex, SVC_INTF_RULES, check
+
+DEV_NAME = {'spine': 'DC1-N9K-SPINE', 'border': 'DC1-N9K-BORDER', 'leaf': 'DC1-N9K-LEAF'}
+NETWORK_SIZE = {'num_spine': 2, 'num_border': 2, 'num_leaf': 4}
+NUM_INTF = {'spine': '1,64', 'border': '1,128', 'leaf': '1,128'}
+ADDR = {'lp_net': '192.168.100.0/32', 'mgmt_net': '10.10.108.0/24', 'mlag_net': '10.255.255.0/28', 'srv_ospf_net': '10.255.255.16/28'}
+TNT_ADV = {'bse_vni': {'tnt_vlan': 3001, 'l3vni': 3001, 'l2vni': 10000}, 'bgp': {'ipv4_redist_rm_name': 'RM_CONN_vrf>>BGPas'}}
+INTF_ADV = {'single_homed': {'first_intf': 1, 'last_intf': 60, 'first_lp': 11, 'last_lp': 20},
+            'dual_homed': {'first_intf': 61, 'last_intf': 120, 'first_po': 1, 'last_po': 100}}
+
+
+def tenants():
+    return [{'tenant_name': 'BLU', 'l3_tenant': True, 'vlans': [{'num': 10, 'name': 'data', 'ip_addr': '10.10.10.1/24'},
+                                                                 {'num': 20, 'name': 'dev', 'ip_addr': '10.10.20.1/24', 'create_on_border': True}]},
+            {'tenant_name': 'GRN', 'l3_tenant': False, 'vlans': [{'num': 30, 'name': 'grn_data'}]}]
+
+# Switch is a list as in service_interface.yml, SRV01 is on two leafs
+def svc_intf():
+    return {'single_homed': [{'descr': 'SRV01 eth1', 'type': 'access', 'ip_vlan': 10, 'switch': ['DC1-N9K-LEAF01', 'DC1-N9K-LEAF04']},
+                             {'descr': 'FW01 eth1', 'type': 'layer3', 'tenant': 'BLU', 'ip_vlan': '10.99.99.1/30', 'switch': ['DC1-N9K-LEAF02']}],
+            'dual_homed': [{'descr': 'ESX01', 'type': 'stp_trunk', 'ip_vlan': '10,20,30', 'switch': ['DC1-N9K-LEAF01', 'DC1-N9K-LEAF03']}]}
+
+def load_vars():
+    with open(os.path.join(BASE_DIR, 'vars', 'base.yml')) as file_content:
+        bse = yaml.safe_load(file_content)['bse']
+    with open(os.path.join(BASE_DIR, 'vars', 'fabric.yml')) as file_content:
+        fbc = yaml.safe_load(file_content)['fbc']
+    fbc['network_size'] = NETWORK_SIZE
+    return bse, fbc
+
+def validate_all(tnt=None, intf=None):
+    bse, fbc = load_vars()
+    return FilterModule().validate_all(bse, fbc, {'tnt': tnt or tenants(), 'adv': TNT_ADV}, {'intf': intf or svc_intf(), 'adv': INTF_ADV}, None)
+
+
+# TNT_VLANS: A tenant with no VLANs is reported by the tenant validator, the interface and IP overlap validators (run at the same time) skip it
+def test_tenant_no_vlans():
+    tnt = tenants()
+    tnt[1]['vlans'] = None
+    validate = FilterModule()
+    assert validate.svc_tnt(tnt, TNT_ADV)[1:] == ["-svc_tnt.tnt.vlans 'GRN' tenant has no VLANs, must be at least 1 VLAN to create the tenant"]
+    assert isinstance(validate.svc_intf(svc_intf(), INTF_ADV, NETWORK_SIZE, tnt, DEV_NAME, NUM_INTF), list)
+    assert validate.ip_overlap(tnt, svc_intf(), None, ADDR) == "'IP overlap unittest pass'"
+    assert "-svc_tnt.tnt.vlans 'GRN' tenant has no VLANs, must be at least 1 VLAN to create the tenant" in validate_all(tnt=tnt)
+
+
+# RULE_TABLE: A rule only adds its error (formatted with the value and any other arguments) if the check fails
+def test_check_rule():
+    errors = []
+    check(errors, SVC_INTF_RULES['vlan'], 10, homed='single_homed')
+    check(errors, SVC_INTF_RULES['vlan'], 'ten', homed='single_homed')
+    assert errors == ["-svc_intf.intf.single_homed.ip_vlan VLAN 'ten' should be an integrer numerical value"]
+
+
+# SWITCH: Switch can be a list or a single switch, each switch in the list is checked
+def test_svc_intf_switch():
+    validate = FilterModule()
+    assert validate.svc_intf(svc_intf(), INTF_ADV, NETWORK_SIZE, tenants(), DEV_NAME, NUM_INTF) == "'services_interface.yml unittest pass'"
+    intf = svc_intf()
+    intf['single_homed'][1]['switch'] = 'DC1-N9K-LEAF02'
+    assert validate.svc_intf(intf, INTF_ADV, NETWORK_SIZE, tenants(), DEV_NAME, NUM_INTF) == "'services_interface.yml unittest pass'"
+    intf['single_homed'][0]['switch'] = ['DC1-N9K-LEAF01', 'DC1-N9K-LEAF09']
+    intf['dual_homed'][0]['switch'] = ['DC1-N9K-LEAF01', 'DC1-N9K-LEAF04']
+    assert validate.svc_intf(intf, INTF_ADV, NETWORK_SIZE, tenants(), DEV_NAME, NUM_INTF)[1:] == [
+        "-svc_intf.intf.single_homed.switch 'DC1-N9K-LEAF09' is not a valid hostname within the inventory",
+        "-svc_intf.intf.dual_homed.switch 'DC1-N9K-LEAF04' should be an odd numbered MLAG switch"]
+
+
+# SVC_INTF: The errors worked out from the whole file (VLANs and VRFs on each switch type) and for each record
+def test_svc_intf_errors():
+    intf = svc_intf()
+    intf['single_homed'].append({'descr': 'FW02 eth1', 'type': 'layer3', 'tenant': 'RED', 'ip_vlan': '10.99.99.5/30', 'switch': ['DC1-N9K-BORDER01']})
+    intf['single_homed'].append({'descr': 'SRV02 eth1', 'type': 'access', 'ip_vlan': 10, 'switch': ['DC1-N9K-BORDER01']})
+    intf['dual_homed'].append({'descr': 'ESX02', 'type': 'stp_trunk', 'ip_vlan': '10,20-25,24', 'switch': ['DC1-N9K-LEAF03']})
+    intf['dual_homed'].append({'descr': 'FW03', 'type': 'layer3', 'tenant': 'BLU', 'ip_vlan': '10.99.99.9/30', 'switch': ['DC1-N9K-LEAF01']})
+    assert FilterModule().svc_intf(intf, INTF_ADV, NETWORK_SIZE, tenants(), DEV_NAME, NUM_INTF)[1:] == [
+        "-svc_intf.intf.dual_homed.ip_vlan trunk contains duplicate VLANs 24",
+        "-svc_intf.intf.dual_homed.type 'FW03' is a Layer3 dual-homed port, it must be single-homed",
+        "-svc_intf.intf.single_homed.tenant VRFs ['RED'] are not on border switches but are in border interface configurations",
+        "-svc_intf.intf.homed.ip_vlan VLANs 21-25 are not on leaf switches but are in leaf interface configurations",
+        "-svc_intf.intf.homed.ip_vlan VLANs 10 are not on border switches but are in border interface configurations"]
+
+
+# VLANSET: Set operations work on the ranges, overlapping ranges it is created from are held in dup
+def test_vlan_set():
+    vlans, other = VlanSet([(1, 10), (20, 30)]), VlanSet([(5, 25)])
+    assert (vlans | other).ranges == [(1, 30)]
+    assert (vlans & other).ranges == [(5, 10), (20, 25)]
+    assert (vlans - other).ranges == [(1, 4), (26, 30)]
+    assert (other - vlans).ranges == [(11, 19)]
+    assert vlans.overlaps(other) and not vlans.overlaps(VlanSet([(11, 19)]))
+    assert 7 in vlans and 15 not in vlans and 31 not in vlans
+    assert len(vlans) == 21 and str(vlans) == '1-10,20-30'
+    assert list(VlanSet([(3, 4), (1, 1)])) == [1, 3, 4]
+    dup_vlans = VlanSet([(1, 5), (6, 8), (3, 4), (10, 9)])
+    assert dup_vlans.ranges == [(1, 8)] and dup_vlans.dup == [(3, 4)]
+    assert VlanSet([(1, 5)]) == VlanSet([(1, 3), (4, 5)])
+
+
+# PREFIXINDEX: Connected prefixes must not overlap anything, routes only conflict if within a connected subnet. Each VRF is separate
+def test_prefix_index():
+    prefixes = PrefixIndex()
+    prefixes.add('BLU', '10.1.0.0/16', 'connected', 'a')
+    prefixes.add('BLU', '10.1.1.1/24', 'connected', 'b')
+    prefixes.add('BLU', '10.1.2.0/24', 'route', 'c')
+    prefixes.add('BLU', '10.2.0.0/16', 'route', 'd')
+    prefixes.add('BLU', '10.2.1.0/24', 'route', 'e')
+    prefixes.add('BLU', 'not_an_ip', 'connected', 'f')
+    prefixes.add('RED', '10.1.1.1/24', 'connected', 'g')
+    assert [(vrf, outer[4], inner[4]) for vrf, outer, inner in prefixes.conflicts()] == [('BLU', 'a', 'b'), ('BLU', 'a', 'c')]
+    tnt = tenants()
+    intf = svc_intf()
+    intf['single_homed'][1]['ip_vlan'] = '10.10.20.5/30'
+    static_route = [{'tenant': ['BLU'], 'route': [{'prefix': ['10.10.10.0/25', '20.1.1.0/24']}]}]
+    assert FilterModule().ip_overlap(tnt, intf, static_route, ADDR)[1:] == [
+        "-svc_rtr.static_route.route.prefix '10.10.10.0/25' is within the connected subnet svc_tnt.tnt.BLU.vlans.10.ip_addr '10.10.10.1/24' in VRF BLU",
+        "-svc_intf.intf.single_homed.ip_vlan (FW01 eth1) '10.10.20.5/30' overlaps svc_tnt.tnt.BLU.vlans.20.ip_addr '10.10.20.1/24' in VRF BLU"]
+
+
+# VALIDATE_ALL: The errors of each validator are merged in the same order as the var files
+def test_validate_all():
+    bse, fbc = load_vars()
+    tnt, intf = tenants(), svc_intf()
+    tnt[0]['vlans'][0]['num'] = 'ten'
+    intf['single_homed'][0]['switch'] = ['DC1-N9K-LEAF09']
+    validate = FilterModule()
+    results = [validate.base(bse['device_name'], bse['addr'], bse['users']),
+               validate.fabric(fbc['network_size'], fbc['num_intf'], fbc['route'], fbc['acast_gw_mac'], fbc['adv']['bse_intf'],
+                               fbc['adv']['lp'], fbc['adv']['mlag'], fbc['adv']['addr_incre']),
+               validate.svc_tnt(tnt, TNT_ADV), validate.svc_intf(intf, INTF_ADV, NETWORK_SIZE, tnt, DEV_NAME, NUM_INTF),
+               validate.ip_overlap(tnt, intf, None, ADDR)]
+    assert isinstance(results[2], list) and isinstance(results[3], list)
+    assert validate_all(tnt=tnt, intf=intf) == [error for result in results if isinstance(result, list) for error in result]
+    # Second run is got from the result cache
+    assert validate_all(tnt=tnt, intf=intf) == [error for result in results if isinstance(result, list) for error in result]
@@ -0,0 +1,56 @@
+"""Times cold (no snapshot, inventory is built) and warm (snapshot for these var files already exists) runs of dyn_inv_script.py.
+Each fabric size is run with its own snapshot directory (DYN_INV_CACHE) and vars, a warm --host should take the same time whatever the size.
+Run from the data_model directory using "python benchmarks/bench_dyn_inv.py"
+"""
+
+import os
+import sys
+import time
+import yaml
+import shutil
+import tempfile
+import subprocess
+
+DATA_MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SCRIPT = os.path.join(DATA_MODEL, 'dyn_inv_script.py')
+
+
+# Copies the vars with the number of leafs changed and address ranges big enough to hold all the devices
+def create_vars(tmp_dir, num_leafs):
+    os.makedirs(os.path.join(tmp_dir, 'vars'))
+    for var_file in ['ansible.yml', 'base.yml', 'fabric.yml']:
+        with open(os.path.join(DATA_MODEL, 'vars', var_file)) as file_content:
+            var_data = yaml.load(file_content, Loader=yaml.FullLoader)
+        if var_file == 'base.yml':
+            var_data['addressing']['mgmt_ip_subnet'] = '10.10.0.0/16'
+        elif var_file == 'fabric.yml':
+            var_data['network_size']['num_leafs'] = num_leafs
+            var_data['address_incre'].update({'leaf_ip': 100, 'sec_leaf_lp': 10000, 'sec_border_lp': 20000})
+        with open(os.path.join(tmp_dir, 'vars', var_file), 'w') as file_content:
+            yaml.dump(var_data, file_content)
+
+
+# Runs the script (in the same way Ansible does) and returns the time taken in ms
+def run(tmp_dir, *args):
+    env = dict(os.environ, DYN_INV_CACHE=os.path.join(tmp_dir, 'cache'))
+    start = time.perf_counter()
+    subprocess.run([sys.executable, SCRIPT] + list(args), cwd=tmp_dir, env=env, stdout=subprocess.DEVNULL, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    print('{:>7} {:>16} {:>16} {:>16}'.format('hosts', 'cold --list (ms)', 'warm --list (ms)', 'warm --host (ms)'))
+    for num_leafs in [2, 100, 1000, 5000]:
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            create_vars(tmp_dir, num_leafs)
+            cold = min(run(tmp_dir, '--list', '--refresh') for i in range(3))
+            warm = min(run(tmp_dir, '--list') for i in range(3))
+            host = min(run(tmp_dir, '--host', 'DC1-N9K-LEAF01') for i in range(3))
+            print('{:>7} {:>16.1f} {:>16.1f} {:>16.1f}'.format(num_leafs + 4, cold, warm, host))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
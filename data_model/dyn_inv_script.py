@@ -3,8 +3,12 @@
 import yaml
 from ipaddress import ip_network
 import argparse
-from pprint import pprint
 import os
+import sys
+import glob
+import shutil
+import hashlib
+import tempfile
 
 try:
     import json
@@ -16,6 +20,13 @@ except ImportError:
 # ./dyn_inv_script.py --list                               Print to screen all groups, members and vars
 # ./dyn_inv_script.py --host DC1-N9K-BORDER02              Print to screen all host_vars for a specific host
 # ansible-playbook playbook.yml -i dyn_inv_script.py	    Run the playbook using the dynamic inventory
+# ./dyn_inv_script.py --list --refresh                     Rebuild the inventory snapshot even if the var files have not changed
+
+# The built inventory is saved as a snapshot (JSON of the inventory and of each hosts host_vars) named after a hash of this script and the var files,
+# so is only rebuilt when they change.
+# Snapshots are stored in DYN_INV_CACHE (defaults to ~/.ansible/tmp/dyn_inv_script)
+VAR_FILES = ['ansible.yml', 'base.yml', 'fabric.yml']
+CACHE_DIR = os.path.expanduser(os.environ.get('DYN_INV_CACHE', '~/.ansible/tmp/dyn_inv_script'))
 
 
 # ============================ Generates host details from data models ==========================
@@ -127,26 +138,71 @@ def host_info(inventory, hostnames, hosts_mgmt):
 def empty_inventory():
     return {'_meta': {'hostvars': {}}}
 
+
+# ============================ Inventory snapshot ==========================
+# 5a. Hash of this script and the var files, if any of them change the snapshot is no longer valid
+def hash_sources():
+    src_hash = hashlib.sha1()
+    for file_name in [os.path.abspath(__file__)] + [os.path.join(os.getcwd(), 'vars', var_file) for var_file in VAR_FILES]:
+        with open(file_name, 'rb') as file_content:
+            src_hash.update(file_content.read())
+    return src_hash.hexdigest()
+
+# 5b. Saves the inventory as compact JSON (streamed to file in chunks) and each hosts host_vars in its own file (hosts/<host>.json) so --host only
+# has to read that one file. Is written to a temp directory first so a half written snapshot is never read. Any old snapshots are deleted as they
+# can no longer be used
+def save_snapshot(snapshot, inventory):
+    if not os.path.isdir(CACHE_DIR):
+        os.makedirs(CACHE_DIR)
+    tmp_dir = tempfile.mkdtemp(dir=CACHE_DIR)
+    with open(os.path.join(tmp_dir, 'inventory.json'), 'w') as file_content:
+        for chunk in json.JSONEncoder(separators=(',', ':')).iterencode(inventory):
+            file_content.write(chunk)
+    os.mkdir(os.path.join(tmp_dir, 'hosts'))
+    for host, host_vars in inventory['_meta']['hostvars'].items():
+        with open(os.path.join(tmp_dir, 'hosts', host + '.json'), 'w') as file_content:
+            json.dump(host_vars, file_content, separators=(',', ':'))
+    if os.path.isdir(snapshot):
+        shutil.rmtree(snapshot)
+    os.replace(tmp_dir, snapshot)
+    for old_snapshot in glob.glob(os.path.join(CACHE_DIR, 'inventory_*')):
+        if old_snapshot != snapshot:
+            shutil.rmtree(old_snapshot) if os.path.isdir(old_snapshot) else os.remove(old_snapshot)
+
+# 5c. Returns the path of the snapshot for the current var files, only building the inventory (2, 3 and 4) if it does not already exist
+def get_snapshot(refresh=False):
+    snapshot = os.path.join(CACHE_DIR, 'inventory_' + hash_sources())
+    if refresh or not os.path.exists(os.path.join(snapshot, 'inventory.json')):
+        gather_details()            # 2. Generates group_var & host_var inputs from data models
+        group_info(groups, spine, border, leaf, hosts_mgmt, os)     # 3. Generate group_var
+        host_info(inventory, hostnames, hosts_mgmt)                  # 4. Generate host_var
+        save_snapshot(snapshot, inventory)
+    return snapshot
+
 # ============================ Runs the script ==========================
 # 1. Takes input args and either prints group_var (list), prints host_var (host) or feeds inventory into Ansoble
 def main():
     parser = argparse.ArgumentParser()      # Arguments it accepts
     parser.add_argument("--list", help="Ansible inventory of all of the groups", action="store_true"),
     parser.add_argument("--host", help="Ansible inventory of a particular host", action="store")
+    parser.add_argument("--refresh", help="Rebuild the inventory snapshot", action="store_true")
     cli_args = parser.parse_args()          # Variable that represents th eargse entered arg
 
-    gather_details()            # 2. Generates group_var & host_var inputs from data models
-    group_info(groups, spine, border, leaf, hosts_mgmt, os)     # 3. Generate group_var
-    host_info(inventory, hostnames, hosts_mgmt)                  # 4. Generate host_var
-
-    if cli_args.list:           # if list print group_vars
-        pprint(inventory)
-        pass
-    elif cli_args.host:         # if host print that hosts host_var
-        pprint(inventory['_meta']['hostvars'][cli_args.host])
-        pass
+    snapshot = get_snapshot(cli_args.refresh)      # 5. Inventory built (2, 3, 4) only if no snapshot for these var files
+
+    if cli_args.list:           # if list streams the snapshot (already compact JSON with _meta) straight to stdout
+        with open(os.path.join(snapshot, 'inventory.json'), 'r') as file_content:
+            shutil.copyfileobj(file_content, sys.stdout)
+    elif cli_args.host:         # if host streams that hosts host_var file, only that file is read (empty if host not in inventory)
+        host_file = os.path.join(snapshot, 'hosts', cli_args.host + '.json')
+        if os.path.basename(cli_args.host) == cli_args.host and os.path.isfile(host_file):
+            with open(host_file, 'r') as file_content:
+                shutil.copyfileobj(file_content, sys.stdout)
+        else:
+            sys.stdout.write('{}')
     else:                       # if no input return group_var and host_var as a JSON
-        return(json.dumps(inventory))
+        with open(os.path.join(snapshot, 'inventory.json'), 'r') as file_content:
+            return(file_content.read())
 
 if __name__ == "__main__":
     main()
@@ -1,20 +1,69 @@
 # From http://networkbit.ch/python-jinja-template/
 # Used to render a yaml file with a jinja2 template and print the output - good for testing Ansible
 # Run the script using "python3 render_jinja.py input.yml template.j2"
+# Batch mode renders all the input/template pairs in a manifest file to files and prints the time taken and size of each
+# Run the script using "python3 render_jinja.py --batch manifest.yml [output_dir]", the manifest is a list of input, template and optional output:
+# - input: input.yml
+#   template: template.j2
+#   output: template.txt            # Default is the template and input name (template_input.txt) in the output_dir (default ./output)
 
+import os
+import time
 from sys import argv            #Imports argv so that can enter values when run the script
-from jinja2 import Environment, FileSystemLoader    #Imports from Jinja2
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache    #Imports from Jinja2
 import yaml                                         #Import YAML from PyYAML
 
-#Variables created when the script is run
-script, yaml_input, jinja_template = argv
+# Batch mode uses the C YAML loader (libyaml) if PyYAML was built with it as is a lot faster with big input files. Single mode keeps the FullLoader
+# so still accepts any input files with python tags
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+# Compiled templates are cached here so are only compiled again if the template changes
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.ansible', 'tmp', 'render_jinja_cache')
 
-#Loads data from YAML file into Python dictionary
-config = yaml.load(open(yaml_input))
 
-#Loads the Jinja2 template
-env = Environment(loader=FileSystemLoader('./'), trim_blocks=True, lstrip_blocks=True)
-template = env.get_template(jinja_template)
+#Loads the Jinja2 environment, in batch mode the one environment is used for all templates so each template is only loaded once
+def create_env(cache=False):
+    if cache and not os.path.isdir(CACHE_DIR):
+        os.makedirs(CACHE_DIR)
+    return Environment(loader=FileSystemLoader('./'), trim_blocks=True, lstrip_blocks=True,
+                       bytecode_cache=FileSystemBytecodeCache(CACHE_DIR) if cache else None)
 
-#Render template using data and prints the output to screen
-print(template.render(config))
\ No newline at end of file
+def load_yaml(yaml_input, loader=YAML_LOADER):
+    with open(yaml_input) as file_content:
+        return yaml.load(file_content, Loader=loader)
+
+
+#Renders each input/template pair in the manifest to file, an input used by many templates is only loaded once
+def batch(manifest_file, output_dir='output'):
+    env, inputs = create_env(cache=True), {}
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    print('{:<30} {:<25} {:>10} {:>10} {:>8}'.format('template', 'input', 'time (ms)', 'size (KB)', 'lines'))
+    total_time = total_size = 0
+    for pair in load_yaml(manifest_file):
+        if pair['input'] not in inputs:
+            inputs[pair['input']] = load_yaml(pair['input'])
+        output_file = pair.get('output', os.path.join(output_dir, '{}_{}.txt'.format(os.path.splitext(os.path.basename(pair['template']))[0],
+                                                                                     os.path.splitext(os.path.basename(pair['input']))[0])))
+        #Time includes loading the template (from the bytecode cache if it hasnt changed) the first time it is used
+        start = time.perf_counter()
+        output = env.get_template(pair['template']).render(inputs[pair['input']])
+        render_time = time.perf_counter() - start
+        with open(output_file, 'w') as file_content:
+            file_content.write(output)
+        total_time, total_size = total_time + render_time, total_size + len(output)
+        print('{:<30} {:<25} {:>10.1f} {:>10.1f} {:>8}'.format(pair['template'], pair['input'], render_time * 1000, len(output) / 1024, len(output.splitlines())))
+    print('{:<56} {:>10.1f} {:>10.1f}'.format('Total', total_time * 1000, total_size / 1024))
+
+
+if __name__ == '__main__':
+    if argv[1] == '--batch':
+        batch(*argv[2:])
+    else:
+        #Variables created when the script is run
+        script, yaml_input, jinja_template = argv
+        #Loads data from YAML file into Python dictionary
+        config = load_yaml(yaml_input, yaml.FullLoader)
+        #Loads the Jinja2 template
+        template = create_env().get_template(jinja_template)
+        #Render template using data and prints the output to screen
+        print(template.render(config))